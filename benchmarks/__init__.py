@@ -0,0 +1,3 @@
+"""
+Бенчмарки и нагрузочные тесты (запуск: python -m benchmarks.load_test или python benchmarks/load_test.py)
+"""
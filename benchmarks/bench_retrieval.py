@@ -0,0 +1,206 @@
+"""
+Сравнение бэкендов векторного поиска: Chroma, NumpyBackend и MmapBackend
+
+Коллекция строится из синтетических единичных векторов (без вызовов OpenAI),
+каждый бэкенд запускается в отдельном процессе, чтобы честно измерить
+потребление памяти. Для каждого бэкенда печатаются время загрузки, задержка
+одиночного поиска (p50/p95), пропускная способность пакетного поиска и RSS.
+В конце проверяется совпадение top-k и расстояний между бэкендами.
+
+Запуск из корня проекта:
+    python benchmarks/bench_retrieval.py --docs 5000 --dim 1536 --queries 300
+    python -m benchmarks.bench_retrieval --docs 5000 --dim 1536 --queries 300
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.common import rss_mb
+
+COLLECTION_NAME = "bench_retrieval"
+BACKENDS = ("chroma", "numpy", "mmap-float16", "mmap-int8")
+
+
+def random_unit_vectors(count: int, dim: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build_collection(directory: str, docs: int, dim: int):
+    """Создает коллекцию Chroma с синтетическими эмбеддингами"""
+    import chromadb
+
+    client = chromadb.PersistentClient(path=directory)
+    collection = client.get_or_create_collection(COLLECTION_NAME)
+    vectors = random_unit_vectors(docs, dim, seed=1)
+    batch = 1000
+    for start in range(0, docs, batch):
+        end = min(start + batch, docs)
+        collection.add(
+            ids=[f"doc-{index}" for index in range(start, end)],
+            embeddings=vectors[start:end].tolist(),
+            documents=[f"doc-{index}" for index in range(start, end)],
+            metadatas=[{"position": index} for index in range(start, end)],
+        )
+
+
+def store_path(directory: str, dtype: str) -> str:
+    return os.path.join(directory, f"vectors-{dtype}.bin")
+
+
+def export_stores(directory: str):
+    """Выгружает коллекцию в файлы для mmap (float16 и int8)"""
+    import chromadb
+    from langchain_community.vectorstores import Chroma
+    from rag.backends import NumpyBackend
+    from rag.mmap_store import write_vector_store
+
+    vectorstore = Chroma(client=chromadb.PersistentClient(path=directory), collection_name=COLLECTION_NAME)
+    documents, matrix = NumpyBackend._load(vectorstore)
+    for dtype in ("float16", "int8"):
+        write_vector_store(store_path(directory, dtype), documents, matrix, dtype=dtype)
+
+
+def make_queries(docs: int, dim: int, count: int) -> np.ndarray:
+    """Запросы — зашумленные документы, чтобы у top-1 был явный победитель"""
+    base = random_unit_vectors(docs, dim, seed=1)
+    rng = np.random.default_rng(2)
+    picked = base[rng.integers(0, docs, size=count)]
+    noisy = picked + 0.3 * random_unit_vectors(count, dim, seed=3)
+    return noisy / np.linalg.norm(noisy, axis=1, keepdims=True)
+
+
+def run_worker(backend_name: str, directory: str, queries_path: str, k: int) -> dict:
+    """Замеры одного бэкенда (выполняется в отдельном процессе)"""
+    from rag.backends import ChromaBackend, MmapBackend, NumpyBackend
+
+    rss_start = rss_mb()
+    queries = np.load(queries_path).tolist()
+
+    started = time.perf_counter()
+    if backend_name.startswith("mmap-"):
+        # Chroma не нужна: только файл хранилища
+        backend = MmapBackend.open(store_path(directory, backend_name.split("-", 1)[1]))
+        load_seconds = time.perf_counter() - started
+        return measure(backend, backend_name, queries, k, load_seconds, rss_start)
+
+    import chromadb
+    from langchain_community.vectorstores import Chroma
+
+    client = chromadb.PersistentClient(path=directory)
+    vectorstore = Chroma(client=client, collection_name=COLLECTION_NAME)
+    if backend_name == "numpy":
+        backend = NumpyBackend.from_vectorstore(vectorstore, version="bench")
+    else:
+        backend = ChromaBackend(vectorstore)
+        backend.search(queries[0], k)  # прогрев: загрузка HNSW-индекса
+    load_seconds = time.perf_counter() - started
+    return measure(backend, backend_name, queries, k, load_seconds, rss_start)
+
+
+def measure(backend, backend_name: str, queries: list, k: int, load_seconds: float, rss_start: float) -> dict:
+    """Задержка одиночных запросов, пакетный поиск и RSS после прогона"""
+    latencies = []
+    results = []
+    for query in queries:
+        started = time.perf_counter()
+        found = backend.search(query, k)
+        latencies.append(time.perf_counter() - started)
+        results.append([[doc.page_content, score] for doc, score in found])
+
+    started = time.perf_counter()
+    backend.search_batch(queries, k)
+    batch_seconds = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "backend": backend_name,
+        "load_s": load_seconds,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "batch_qps": len(queries) / batch_seconds,
+        "rss_start_mb": rss_start,
+        "rss_mb": rss_mb(),
+        "results": results,
+    }
+
+
+def compare(reference: list, candidate: list) -> tuple[float, float]:
+    """Доля совпавших top-k и максимальное расхождение расстояний"""
+    overlap, total, max_delta = 0, 0, 0.0
+    for expected, actual in zip(reference, candidate):
+        expected_ids = {doc for doc, _ in expected}
+        overlap += sum(1 for doc, _ in actual if doc in expected_ids)
+        total += len(expected)
+        scores = {doc: score for doc, score in expected}
+        for doc, score in actual:
+            if doc in scores:
+                max_delta = max(max_delta, abs(scores[doc] - score))
+    return overlap / total if total else 1.0, max_delta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    parser.add_argument("--queries-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.dir, args.queries_path, args.k)))
+        return
+
+    with tempfile.TemporaryDirectory(prefix="bench_retrieval_") as workdir:
+        directory = os.path.join(workdir, "chroma")
+        queries_path = os.path.join(workdir, "queries.npy")
+
+        print(f"📦 Коллекция: {args.docs} документов × {args.dim}, запросов: {args.queries}")
+        build_collection(directory, args.docs, args.dim)
+        export_stores(directory)
+        np.save(queries_path, make_queries(args.docs, args.dim, args.queries))
+
+        reports = {}
+        for backend_name in BACKENDS:
+            output = subprocess.run(
+                [
+                    sys.executable, os.path.abspath(__file__),
+                    "--worker", backend_name,
+                    "--dir", directory,
+                    "--queries-path", queries_path,
+                    "-k", str(args.k),
+                ],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            reports[backend_name] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"\n{'backend':<13} {'load, s':>8} {'p50, ms':>8} {'p95, ms':>8} {'batch q/s':>10} {'RSS, MB':>8}")
+    for name, report in reports.items():
+        print(
+            f"{name:<13} {report['load_s']:>8.2f} {report['p50_ms']:>8.3f} {report['p95_ms']:>8.3f} "
+            f"{report['batch_qps']:>10.0f} {report['rss_mb']:>8.0f}"
+        )
+
+    print()
+    for name in BACKENDS:
+        if name == "numpy":
+            continue
+        overlap, max_delta = compare(reports["numpy"]["results"], reports[name]["results"])
+        print(f"🔎 {name} vs numpy: совпадение top-{args.k} {overlap:.1%}, расхождение расстояний до {max_delta:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+Общие утилиты бенчмарков
+"""
+
+
+def rss_mb() -> float:
+    """Текущий RSS процесса в МБ (Linux, /proc/self/status)"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
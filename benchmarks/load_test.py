@@ -0,0 +1,566 @@
+"""
+Нагрузочный тест бота с локальными заглушками OpenAI и Telegram Bot API
+
+Заглушки запускаются в отдельном процессе (чтобы не влиять на RSS и GIL
+бота) и отвечают как настоящие API: chat completions (в том числе потоком
+и с изображениями), эмбеддинги, Whisper, а также sendMessage /
+editMessageText / deleteMessage / getFile и скачивание файлов. Задержку и
+долю ошибок OpenAI можно задать. Приложение собирается тем же
+bot.build_application(), что и в проде, а синтетические апдейты (текст,
+голос, фото) подаются с заданной частотой через его update processor —
+без polling и без сети.
+
+В конце печатаются пропускная способность, p50/p95/p99 по каждому
+обработчику и RSS; с --max-p95 / --min-throughput скрипт завершается с
+кодом 1 при превышении порога (для CI).
+
+Запуск из корня проекта:
+    python benchmarks/load_test.py --rate 20 --duration 30 --mix text=0.7,voice=0.2,photo=0.1
+    python -m benchmarks.load_test --rate 20 --duration 30
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.common import rss_mb
+
+FAKE_TOKEN = "123456:LOADTEST"
+EMBEDDING_DIM = 64
+HANDLERS = ("text", "voice", "photo")
+# Запросы пользователей: русские слова и слова Elenya вперемешку
+TEXTS = [
+    "дерево", "вода", "звезда", "лес", "луна", "солнце", "ветер", "река", "свет", "дом",
+    "друг", "песня", "небо", "огонь", "путь", "Привет, как дела?", "Спасибо за помощь",
+    "navi", "sera", "mera-dor", "navi sera", "elen", "lome",
+]
+OBJECTS = ["дерево", "кошка", "цветок", "гора", "море", "птица", "книга", "чашка"]
+PHRASES = ["привет друг", "где находится лес", "доброе утро", "какая красивая звезда"]
+
+
+# ---------------------------------------------------------------------------
+# Заглушки API (работают в отдельном процессе)
+# ---------------------------------------------------------------------------
+
+def _pick(options: list, seed: str) -> str:
+    return options[int(hashlib.md5(seed.encode("utf-8")).hexdigest(), 16) % len(options)]
+
+
+def _fake_embedding(text) -> list:
+    """Детерминированный вектор: хэши слов раскладываются по EMBEDDING_DIM координатам"""
+    if not isinstance(text, str):
+        text = " ".join(map(str, text))
+    vector = [0.0] * EMBEDDING_DIM
+    for word in text.lower().split() or [""]:
+        digest = hashlib.md5(word.encode("utf-8")).digest()
+        for position in range(0, len(digest), 2):
+            vector[digest[position] % EMBEDDING_DIM] += 1.0 if digest[position + 1] & 1 else -1.0
+    norm = sum(value * value for value in vector) ** 0.5 or 1.0
+    return [value / norm for value in vector]
+
+
+def _fake_media(path: str) -> bytes:
+    """Содержимое файла по пути из getFile: JPEG для фото, случайные байты для голоса"""
+    rng = random.Random(path)
+    if path.startswith("photos/"):
+        try:
+            from PIL import Image, ImageDraw
+        except ImportError:
+            return bytes(rng.getrandbits(8) for _ in range(40_000))
+        size = (800, 600) if "_large" not in path else (1280, 960)
+        image = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+        draw = ImageDraw.Draw(image)
+        for _ in range(6):
+            x, y = rng.randrange(size[0]), rng.randrange(size[1])
+            draw.ellipse((x, y, x + 200, y + 150), fill=tuple(rng.randrange(256) for _ in range(3)))
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=85)
+        return output.getvalue()
+    return bytes(rng.getrandbits(8) for _ in range(16_000))
+
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    options: dict = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _send_json(self, payload, status: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_bytes(self, body: bytes):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay(self, latency: float):
+        if latency > 0:
+            time.sleep(latency * random.uniform(0.75, 1.25))
+
+
+class FakeOpenAIHandler(_FakeHandler):
+    """Chat completions (текст, изображения, поток), эмбеддинги, Whisper"""
+
+    def do_POST(self):
+        body = self._read_body()
+        path = urlparse(self.path).path
+        latency, error_rate = self.options["openai_latency"], self.options["openai_error_rate"]
+        if path.endswith("/chat/completions"):
+            # Задержка и доля ошибок могут быть заданы отдельно для модели
+            model = json.loads(body).get("model")
+            latency = self.options["model_latency"].get(model, latency)
+            error_rate = self.options["model_error_rate"].get(model, error_rate)
+        self._delay(latency)
+        if random.random() < error_rate:
+            self._send_json({"error": {"message": "fake upstream error", "type": "server_error"}}, 500)
+            return
+
+        if path.endswith("/chat/completions"):
+            self._chat(json.loads(body))
+        elif path.endswith("/embeddings"):
+            self._embeddings(json.loads(body))
+        elif path.endswith("/audio/transcriptions"):
+            self._send_json({
+                "text": _pick(PHRASES, hashlib.md5(body).hexdigest()),
+                "usage": {"type": "duration", "seconds": 3},
+            })
+        else:
+            self._send_json({"error": {"message": f"unknown path {path}"}}, 404)
+
+    def _chat(self, request: dict):
+        messages = request.get("messages", [])
+        last = messages[-1]["content"] if messages else ""
+        if isinstance(last, list):
+            # Vision: название объекта
+            answer = _pick(OBJECTS, json.dumps(last)[-64:])
+        else:
+            answer = f"Elenya: {_pick(TEXTS, last)}\nПеревод: {_pick(OBJECTS, last)}\nПояснение: Тестовый ответ."
+        prompt_tokens = sum(len(str(message["content"])) for message in messages) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(answer) // 4,
+            "total_tokens": prompt_tokens + len(answer) // 4,
+        }
+        model = request.get("model", "fake")
+
+        if not request.get("stream"):
+            self._send_json({
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = answer.split(" ")
+        for position, word in enumerate(words):
+            piece = word if position == 0 else " " + word
+            self._sse({
+                "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": 0, "model": model,
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+            })
+            self._delay(self.options["stream_chunk_latency"])
+        if (request.get("stream_options") or {}).get("include_usage"):
+            self._sse({
+                "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": 0, "model": model,
+                "choices": [], "usage": usage,
+            })
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def _sse(self, payload: dict):
+        self._chunk(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _embeddings(self, request: dict):
+        inputs = request["input"]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        data = []
+        for index, text in enumerate(inputs):
+            vector = _fake_embedding(text)
+            if request.get("encoding_format") == "base64":
+                vector = base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+            data.append({"object": "embedding", "index": index, "embedding": vector})
+        self._send_json({
+            "object": "list", "data": data, "model": request.get("model", "fake"),
+            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+        })
+
+
+class FakeTelegramHandler(_FakeHandler):
+    """Методы Bot API, которые вызывают обработчики, и скачивание файлов"""
+
+    lock = threading.Lock()
+    counters = {"requests": 0, "errors_shown": 0}
+    next_message_id = [1_000_000]
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/stats":
+            with self.lock:
+                self._send_json(dict(self.counters))
+            return
+        self._delay(self.options["telegram_latency"])
+        # /file/bot<token>/<file_path>
+        self._send_bytes(_fake_media(path.split("/", 3)[-1]))
+
+    def do_POST(self):
+        body = self._read_body()
+        self._delay(self.options["telegram_latency"])
+        method = urlparse(self.path).path.rsplit("/", 1)[-1]
+        params = self._params(body)
+        with self.lock:
+            self.counters["requests"] += 1
+            if "❌" in params.get("text", ""):
+                self.counters["errors_shown"] += 1
+
+        if method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Elenya", "username": "elenya_loadtest_bot"}
+        elif method in ("sendMessage", "editMessageText"):
+            result = self._message(params)
+        elif method == "getFile":
+            file_id = params["file_id"]
+            folder = "photos" if file_id.startswith("photo") else "voice"
+            result = {
+                "file_id": file_id,
+                "file_unique_id": "u" + file_id,
+                "file_size": 20_000,
+                "file_path": f"{folder}/{file_id}.bin",
+            }
+        else:
+            result = True
+        self._send_json({"ok": True, "result": result})
+
+    def _message(self, params: dict) -> dict:
+        with self.lock:
+            self.next_message_id[0] += 1
+            message_id = int(params.get("message_id") or self.next_message_id[0])
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+            "text": params.get("text", ""),
+        }
+
+    def _params(self, body: bytes) -> dict:
+        content_type = self.headers.get("Content-Type", "")
+        if "json" in content_type:
+            return json.loads(body or b"{}")
+        if "multipart" in content_type:
+            return {}
+        return {key: values[0] for key, values in parse_qs(body.decode("utf-8")).items()}
+
+
+def serve_fakes(options: dict, ports: "multiprocessing.Queue"):
+    """Точка входа процесса с заглушками: сообщает порты и работает до завершения"""
+    servers = []
+    for handler in (FakeOpenAIHandler, FakeTelegramHandler):
+        handler.options = options
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        servers.append(server)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    ports.put([server.server_address[1] for server in servers])
+    threading.Event().wait()
+
+
+# ---------------------------------------------------------------------------
+# Генерация нагрузки
+# ---------------------------------------------------------------------------
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in HANDLERS:
+            raise argparse.ArgumentTypeError(f"неизвестный тип апдейта: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+def parse_per_model(value: str) -> dict:
+    """MODEL=ЧИСЛО[,MODEL=ЧИСЛО...]"""
+    values = {}
+    for part in value.split(","):
+        model, _, number = part.partition("=")
+        values[model.strip()] = float(number)
+    return values
+
+
+def make_update(update_id: int, kind: str, chat_id: int, rng: random.Random, unique_media: int) -> dict:
+    """Апдейт Telegram в виде JSON, как его прислал бы getUpdates"""
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": "Load"},
+    }
+    media = rng.randrange(unique_media)
+    if kind == "text":
+        message["text"] = rng.choice(TEXTS)
+    elif kind == "voice":
+        message["voice"] = {"file_id": f"voice{media}", "file_unique_id": f"uvoice{media}", "duration": 3}
+    else:
+        message["photo"] = [
+            {"file_id": f"photo{media}_small", "file_unique_id": f"uphoto{media}_small", "width": 320, "height": 240},
+            {"file_id": f"photo{media}", "file_unique_id": f"uphoto{media}", "width": 800, "height": 600},
+            {"file_id": f"photo{media}_large", "file_unique_id": f"uphoto{media}_large", "width": 1280, "height": 960},
+        ]
+    return {"update_id": update_id, "message": message}
+
+
+def percentile(values: list, share: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))]
+
+
+async def run_load(args, telegram_port: int) -> dict:
+    """Собирает приложение бота и подает апдейты с частотой args.rate"""
+    import bot
+    from telegram import Update
+    from handlers import admin
+    from services.metrics import startup
+    from services.readiness import dictionary_readiness
+
+    # Журнал каждого HTTP-запроса (INFO) заглушил бы отчет
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    started = time.perf_counter()
+    application = bot.build_application()
+    await application.initialize()
+    # Как при run_polling: post_init запускает фоновую загрузку словаря
+    await application.post_init(application)
+    if not args.during_warmup:
+        await dictionary_readiness.wait()
+    startup_seconds = time.perf_counter() - started
+    rss_after_start = rss_mb()
+
+    rng = random.Random(args.seed)
+    kinds = list(args.mix)
+    weights = [args.mix[kind] for kind in kinds]
+    latencies = {kind: [] for kind in kinds}
+    failures = {kind: 0 for kind in kinds}
+    tasks = []
+
+    async def process(kind: str, update: Update, sent_at: float):
+        try:
+            await application.update_processor.process_update(update, application.process_update(update))
+        except Exception as e:
+            failures[kind] += 1
+            print(f"❌ {kind}: {e}")
+        latencies[kind].append(time.perf_counter() - sent_at)
+
+    total = int(args.rate * args.duration)
+    load_started = time.perf_counter()
+    for number in range(total):
+        # Открытая модель нагрузки: апдейты приходят по расписанию, не дожидаясь ответов
+        send_at = load_started + number / args.rate
+        delay = send_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        kind = rng.choices(kinds, weights)[0]
+        data = make_update(number + 1, kind, rng.randrange(args.chats) + 1, rng, args.unique_media)
+        update = Update.de_json(data, application.bot)
+        tasks.append(asyncio.create_task(process(kind, update, time.perf_counter())))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - load_started
+
+    await application.shutdown()
+    await bot.close_openai_clients(application)
+
+    import urllib.request
+    with urllib.request.urlopen(f"http://127.0.0.1:{telegram_port}/stats") as response:
+        telegram_stats = json.load(response)
+
+    completed = sum(len(values) for values in latencies.values())
+    return {
+        "startup_s": startup_seconds,
+        "startup_phases": startup.stats(),
+        "dictionary": dictionary_readiness.stats(),
+        "models": admin.stats_providers["models"](),
+        "updates": completed,
+        "elapsed_s": elapsed,
+        "throughput_rps": completed / elapsed if elapsed else 0.0,
+        "handlers": {
+            kind: {
+                "count": len(values),
+                "failures": failures[kind],
+                "p50_s": percentile(values, 0.50),
+                "p95_s": percentile(values, 0.95),
+                "p99_s": percentile(values, 0.99),
+            }
+            for kind, values in latencies.items()
+        },
+        "error_replies": telegram_stats["errors_shown"],
+        "telegram_requests": telegram_stats["requests"],
+        "rss_after_start_mb": rss_after_start,
+        "rss_mb": rss_mb(),
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def configure_environment(args, openai_port: int, telegram_port: int, workdir: str):
+    """Переменные окружения для config.py: заглушки вместо API, временные каталоги"""
+    environment = {
+        "TELEGRAM_TOKEN": FAKE_TOKEN,
+        "OPENAI_API_KEY": "sk-loadtest",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+        "TELEGRAM_BASE_URL": f"http://127.0.0.1:{telegram_port}/bot",
+        "TELEGRAM_BASE_FILE_URL": f"http://127.0.0.1:{telegram_port}/file/bot",
+        "EMBEDDING_CHECK_CTX_LENGTH": "0",
+        "ANONYMIZED_TELEMETRY": "False",
+        "CHROMA_PERSIST_DIR": os.path.join(workdir, "chroma"),
+        "VECTOR_STORE_PATH": os.path.join(workdir, "vectors.bin"),
+        "TRANSLATION_TABLE_PATH": os.path.join(workdir, "translations.json.gz"),
+        "CONCURRENT_UPDATES": str(args.concurrency),
+        "STREAM_RESPONSES": "1" if args.stream else "0",
+        "METRICS_PORT": "0",
+    }
+    if not args.cache:
+        # По умолчанию меряем худший случай: каждый запрос доходит до API
+        for name in ("RESPONSE_CACHE_SIZE", "SEMANTIC_CACHE_SIZE", "EMBEDDING_CACHE_SIZE", "MEDIA_CACHE_SIZE"):
+            environment[name] = "0"
+    os.environ.update(environment)
+
+
+def print_report(report: dict):
+    print()
+    print(f"Запуск приложения: {report['startup_s']:.2f} с")
+    phases = ", ".join(f"{phase} {seconds:.2f} с" for phase, seconds in report["startup_phases"].items())
+    print(f"Этапы старта: {phases}")
+    dictionary = report["dictionary"]
+    print(f"Словарь: ждали {dictionary['waited']}, без словаря {dictionary['degraded']}")
+    for tier, stats in report["models"].items():
+        latency = f"{stats['avg_latency_s'] * 1000:.0f} мс" if stats["avg_latency_s"] is not None else "—"
+        cost = f"${stats['cost_usd']:.4f}" if stats["cost_usd"] is not None else "—"
+        print(
+            f"Модель {tier} ({stats['model']}): запросов {stats['requests']}, ошибок {stats['errors']}, "
+            f"переключений {stats['failovers']}, средняя задержка {latency}, стоимость {cost}"
+        )
+    print(
+        f"Апдейтов: {report['updates']} за {report['elapsed_s']:.1f} с "
+        f"→ {report['throughput_rps']:.1f} апдейтов/с"
+    )
+    print(f"{'обработчик':<10} {'кол-во':>7} {'сбои':>5} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9}")
+    for kind, stats in report["handlers"].items():
+        print(
+            f"{kind:<10} {stats['count']:>7} {stats['failures']:>5} "
+            f"{stats['p50_s'] * 1000:>9.1f} {stats['p95_s'] * 1000:>9.1f} {stats['p99_s'] * 1000:>9.1f}"
+        )
+    print(f"Ответов с ошибкой: {report['error_replies']}, запросов к Bot API: {report['telegram_requests']}")
+    print(
+        f"RSS после запуска: {report['rss_after_start_mb']:.1f} МБ, в конце: {report['rss_mb']:.1f} МБ, "
+        f"пик: {report['max_rss_mb']:.1f} МБ"
+    )
+
+
+def check_thresholds(args, report: dict) -> list:
+    """Нарушенные пороги (для CI)"""
+    problems = []
+    if args.max_p95 is not None:
+        for kind, stats in report["handlers"].items():
+            if stats["p95_s"] > args.max_p95:
+                problems.append(f"p95 {kind} = {stats['p95_s']:.3f} с > {args.max_p95} с")
+    if args.min_throughput is not None and report["throughput_rps"] < args.min_throughput:
+        problems.append(f"пропускная способность {report['throughput_rps']:.1f} < {args.min_throughput} апдейтов/с")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=10.0, help="апдейтов в секунду")
+    parser.add_argument("--duration", type=float, default=20.0, help="длительность подачи нагрузки, с")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("text=0.7,voice=0.2,photo=0.1"),
+                        help="доли типов апдейтов, например text=0.7,voice=0.2,photo=0.1")
+    parser.add_argument("--chats", type=int, default=200, help="число разных чатов")
+    parser.add_argument("--unique-media", type=int, default=1000, help="число разных голосовых и фото")
+    parser.add_argument("--concurrency", type=int, default=32, help="CONCURRENT_UPDATES")
+    parser.add_argument("--stream", action="store_true", help="STREAM_RESPONSES=1")
+    parser.add_argument("--cache", action="store_true", help="оставить кэши включенными")
+    parser.add_argument("--during-warmup", action="store_true",
+                        help="подавать нагрузку сразу, не дожидаясь загрузки словаря")
+    parser.add_argument("--openai-latency", type=float, default=0.3, help="задержка ответа OpenAI, с")
+    parser.add_argument("--openai-error-rate", type=float, default=0.0, help="доля ответов 500 от OpenAI")
+    parser.add_argument("--model-latency", type=parse_per_model, default={},
+                        help="задержка чата по моделям, например gpt-4o-mini=0.1,gpt-4-turbo=0.8")
+    parser.add_argument("--model-error-rate", type=parse_per_model, default={},
+                        help="доля ошибок чата по моделям, например gpt-4o-mini=1")
+    parser.add_argument("--stream-chunk-latency", type=float, default=0.01, help="пауза между фрагментами потока, с")
+    parser.add_argument("--telegram-latency", type=float, default=0.03, help="задержка ответа Bot API, с")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="сохранить отчет в JSON")
+    parser.add_argument("--max-p95", type=float, help="порог p95 любого обработчика, с (код выхода 1)")
+    parser.add_argument("--min-throughput", type=float, help="минимальная пропускная способность, апдейтов/с")
+    args = parser.parse_args()
+
+    options = {
+        "openai_latency": args.openai_latency,
+        "openai_error_rate": args.openai_error_rate,
+        "model_latency": args.model_latency,
+        "model_error_rate": args.model_error_rate,
+        "stream_chunk_latency": args.stream_chunk_latency,
+        "telegram_latency": args.telegram_latency,
+    }
+    context = multiprocessing.get_context("spawn")
+    ports = context.Queue()
+    fakes = context.Process(target=serve_fakes, args=(options, ports), daemon=True)
+    fakes.start()
+    openai_port, telegram_port = ports.get(timeout=30)
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            configure_environment(args, openai_port, telegram_port, workdir)
+            report = asyncio.run(run_load(args, telegram_port))
+    finally:
+        fakes.terminate()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, ensure_ascii=False, indent=2)
+
+    problems = check_thresholds(args, report)
+    for problem in problems:
+        print(f"❌ {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
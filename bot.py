@@ -1,7 +1,14 @@
 """
 Главный файл Telegram-бота для изучения языка Elenya
 """
+import time
+
+# Отсчет времени старта — до импорта зависимостей
+STARTED_AT = time.perf_counter()
+
+import asyncio
 import logging
+from typing import Optional
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -14,13 +21,28 @@ from telegram.ext import (
 import config
 from services.mode_manager import ModeManager
 from services.router import OpenAIRouter
+from services.concurrency import ChatOrderedUpdateProcessor, openai_limiter
+from services.cache import ResponseCache
+from services.media_cache import MediaCache
+from services.metrics import InstrumentedRequest, start_http_server, startup
+from services.prompt_builder import get_encoding
+from services.readiness import dictionary_readiness
+from services.semantic_cache import SemanticCache
+from services.singleflight import singleflight
+from services.translation_table import TranslationTable
 from utils.stt import SpeechToText
 from utils.vision import VisionProcessor
+from utils.openai_client import aclose_clients, http2_available
 from rag.loader import DictionaryLoader
 from rag.query import DictionaryQuery
+from rag.embedding_cache import EmbeddingCache
+from rag.backends import MmapBackend, NumpyBackend
 
 # Импорты handlers
-from handlers import start, text, voice, image
+from handlers import start, text, voice, image, admin
+
+startup.origin = STARTED_AT
+startup.mark("imports")
 
 
 # Настройка логирования
@@ -31,38 +53,170 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def main():
-    """Главная функция запуска бота"""
-    
-    print("🚀 Запуск бота Elenya...")
+async def close_openai_clients(application: Application):
+    """Закрывает общие HTTP-клиенты OpenAI при остановке бота"""
+    await aclose_clients()
+
+
+def load_dictionary() -> tuple[DictionaryLoader, DictionaryQuery, Optional[TranslationTable]]:
+    """
+    Загружает словарь: индекс, бэкенд поиска и таблицу переводов
     
-    # 1. Инициализация RAG системы
+    Блокирующая операция (PDF, Chroma, эмбеддинги) — выполняется в отдельном
+    потоке, пока бот уже принимает сообщения.
+    """
     print("📚 Загрузка словаря Elenya...")
-    dictionary_loader = DictionaryLoader()
-    vectorstore = dictionary_loader.load_dictionary()
-    dictionary_query = DictionaryQuery(vectorstore)
+    backend = None
+    if config.RETRIEVAL_BACKEND == "mmap":
+        # Воркеры делят один файл эмбеддингов; Chroma открывается, только если он устарел
+        dictionary_loader = DictionaryLoader(
+            vector_store_path=config.VECTOR_STORE_PATH,
+            vector_store_dtype=config.VECTOR_STORE_DTYPE
+        )
+        backend = MmapBackend(dictionary_loader.open_vector_store())
+        vectorstore = dictionary_loader.vectorstore
+    else:
+        dictionary_loader = DictionaryLoader()
+        vectorstore = dictionary_loader.load_dictionary()
+    embedding_cache = None
+    if config.EMBEDDING_CACHE_SIZE > 0:
+        embedding_cache = EmbeddingCache(
+            model=config.EMBEDDING_MODEL,
+            max_size=config.EMBEDDING_CACHE_SIZE,
+            db_path=config.EMBEDDING_CACHE_PATH or None
+        )
+        admin.register_stats("embedding_cache", embedding_cache.stats)
+    if config.RETRIEVAL_BACKEND == "numpy":
+        backend = NumpyBackend.from_vectorstore(vectorstore, dictionary_loader.dictionary_version)
+        print(f"🧮 Векторный поиск в памяти: {len(backend.documents)} документов")
+    dictionary_query = DictionaryQuery(
+        vectorstore,
+        dictionary_loader.headword_index,
+        embedding_cache,
+        backend=backend,
+        embeddings=dictionary_loader.embeddings,
+        lexical_index=dictionary_loader.lexical_index
+    )
+    
+    translation_table = TranslationTable.load(config.TRANSLATION_TABLE_PATH)
+    if translation_table is not None:
+        if translation_table.version == dictionary_query.version:
+            print(f"📖 Таблица переводов: {len(translation_table)} слов")
+        else:
+            print("⚠️  Таблица переводов собрана для другой версии словаря — пересоберите: python build_translations.py")
+        admin.register_stats("translation_table", translation_table.stats)
+    return dictionary_loader, dictionary_query, translation_table
+
+
+async def warm_up_dictionary(router: OpenAIRouter):
+    """Фоновая загрузка словаря: по готовности подключает его к роутеру и /reload"""
+    try:
+        dictionary_loader, dictionary_query, translation_table = await asyncio.to_thread(load_dictionary)
+    except Exception as e:
+        print(f"❌ Не удалось загрузить словарь, отвечаем без него: {e}")
+        logger.exception("Ошибка загрузки словаря")
+        dictionary_readiness.set_failed(e)
+        return
     
-    # 2. Инициализация сервисов
+    router.dictionary_query = dictionary_query
+    router.translation_table = translation_table
+    admin.set_dependencies(dictionary_loader)
+    dictionary_readiness.set_ready()
+    startup.mark("dictionary_ready")
+
+
+def build_application() -> Application:
+    """
+    Создает сервисы и приложение с зарегистрированными handlers
+    
+    Словарь здесь не загружается: это делает warm_up_dictionary в фоне после
+    старта (post_init), поэтому бот отвечает сразу, а запросы в режиме
+    словаря до его готовности обрабатываются по DICTIONARY_WARMUP_POLICY.
+    Отдельно от main(), чтобы то же самое приложение можно было запустить без
+    polling (benchmarks/load_test.py передает апдейты напрямую).
+    """
+    # 1. Инициализация сервисов
     print("⚙️  Инициализация сервисов...")
     mode_manager = ModeManager()
-    router = OpenAIRouter(dictionary_query)
+    response_cache = None
+    if config.RESPONSE_CACHE_SIZE > 0:
+        response_cache = ResponseCache(
+            max_size=config.RESPONSE_CACHE_SIZE,
+            ttl=config.RESPONSE_CACHE_TTL,
+            db_path=config.RESPONSE_CACHE_PATH or None
+        )
+        admin.register_stats("response_cache", response_cache.stats)
+    semantic_cache = None
+    if config.SEMANTIC_CACHE_SIZE > 0:
+        semantic_cache = SemanticCache(
+            threshold=config.SEMANTIC_CACHE_THRESHOLD,
+            max_size=config.SEMANTIC_CACHE_SIZE
+        )
+        admin.register_stats("semantic_cache", semantic_cache.stats)
+    # Словарь подключится к роутеру после фоновой загрузки
+    router = OpenAIRouter(None, response_cache, semantic_cache)
     stt = SpeechToText()
     vision = VisionProcessor()
+    # Результаты Whisper / Vision для повторных (пересланных) голосовых и фото
+    media_cache = MediaCache(
+        max_size=config.MEDIA_CACHE_SIZE,
+        ttl=config.MEDIA_CACHE_TTL,
+        db_path=config.MEDIA_CACHE_PATH or None
+    )
+    if config.MEDIA_CACHE_SIZE > 0:
+        admin.register_stats("media_cache", media_cache.stats)
     
-    # 3. Передаем зависимости в handlers
+    # 2. Передаем зависимости в handlers
     start.set_mode_manager(mode_manager)
     text.set_dependencies(router, mode_manager)
-    voice.set_dependencies(router, mode_manager, stt)
-    image.set_dependencies(router, mode_manager, vision)
+    voice.set_dependencies(router, mode_manager, stt, media_cache)
+    image.set_dependencies(router, mode_manager, vision, media_cache)
+    
+    # 3. Создаем приложение
+    async def start_warm_up(application: Application):
+        # Вызывается перед началом polling: словарь грузится, пока бот уже отвечает
+        startup.mark("polling")
+        dictionary_readiness.start(warm_up_dictionary(router))
+        # Токенизатор для бюджета контекста грузится в фоновом потоке (при первом
+        # запуске файл кодировки скачивается) — polling его не ждет
+        get_encoding()
     
-    # 4. Создаем приложение
-    application = Application.builder().token(config.TELEGRAM_TOKEN).build()
+    builder = Application.builder().token(config.TELEGRAM_TOKEN).post_init(start_warm_up)
+    # Общий пул соединений к OpenAI закрывается вместе с приложением
+    builder = builder.post_shutdown(close_openai_clients)
+    # Запросы к Bot API (отправка, правки, скачивание файлов) замеряются для /metrics;
+    # размер пула — как у клиента PTB по умолчанию
+    builder = builder.request(InstrumentedRequest(connection_pool_size=256))
+    if config.TELEGRAM_BASE_URL:
+        builder = builder.base_url(config.TELEGRAM_BASE_URL)
+    if config.TELEGRAM_BASE_FILE_URL:
+        builder = builder.base_file_url(config.TELEGRAM_BASE_FILE_URL)
+    print(f"🔌 Пул соединений к OpenAI: {config.OPENAI_POOL_SIZE}, HTTP/2: {'да' if http2_available() else 'нет'}")
     
-    # 5. Регистрируем handlers
+    # Параллельная обработка разных чатов (порядок внутри чата сохраняется)
+    if config.CONCURRENT_UPDATES > 0:
+        update_processor = ChatOrderedUpdateProcessor(config.CONCURRENT_UPDATES)
+        builder = builder.concurrent_updates(update_processor)
+        admin.register_stats("updates", update_processor.stats)
+        print(f"⚡ Параллельная обработка: до {config.CONCURRENT_UPDATES} апдейтов")
+    elif config.DICTIONARY_WARMUP_POLICY == "wait":
+        print("⚠️  DICTIONARY_WARMUP_POLICY=wait без CONCURRENT_UPDATES: пока грузится словарь, ожидание задерживает все чаты")
+    admin.register_stats("openai", openai_limiter.stats)
+    admin.register_stats("singleflight", singleflight.stats)
+    admin.register_stats("dictionary", dictionary_readiness.stats)
+    admin.register_stats("prompt", router.prompts.stats)
+    admin.register_stats("models", router.models.stats)
+    admin.register_stats("startup", startup.stats)
+    
+    application = builder.build()
+    
+    # 4. Регистрируем handlers
     
     # Команды
     application.add_handler(CommandHandler("start", start.start_handler))
     application.add_handler(CommandHandler("mode", start.mode_handler))
+    application.add_handler(CommandHandler("reload", admin.reload_handler))
+    application.add_handler(CommandHandler("stats", admin.stats_handler))
     
     # Callback queries (нажатия на кнопки)
     application.add_handler(CallbackQueryHandler(start.callback_query_handler))
@@ -76,7 +230,20 @@ def main():
     # Текстовые сообщения (должны быть последними)
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, text.text_handler))
     
-    # 6. Запуск бота
+    return application
+
+
+def main():
+    """Главная функция запуска бота"""
+    
+    print("🚀 Запуск бота Elenya...")
+    application = build_application()
+    
+    if config.METRICS_PORT > 0:
+        start_http_server(config.METRICS_PORT, config.METRICS_HOST)
+        print(f"📈 Метрики: http://{config.METRICS_HOST}:{config.METRICS_PORT}/metrics")
+    
+    # 5. Запуск бота
     print("✅ Бот запущен и готов к работе!")
     print("Нажмите Ctrl+C для остановки")
     
@@ -0,0 +1,89 @@
+"""
+Офлайн-сборка таблицы переводов для всех слов словаря Elenya
+
+Каждое слово прогоняется в обе стороны (Elenya → русский и русский → Elenya)
+через тот же промпт, что и живые запросы в режиме словаря. Результат
+сохраняется в TRANSLATION_TABLE_PATH и привязывается к версии словаря.
+Повторный запуск для той же версии досчитывает только недостающие ответы.
+
+Запуск:
+    python build_translations.py [--force]
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+import config
+from rag.loader import DictionaryLoader
+from rag.query import DictionaryQuery
+from services.model_router import ModelRouter
+from services.router import ERROR_ANSWER, OpenAIRouter
+from services.translation_table import TranslationTable
+
+
+def collect_queries(loader: DictionaryLoader) -> List[str]:
+    """Запросы для таблицы: слово на Elenya, перевод и его варианты через "/" """
+    queries, seen = [], set()
+    for entry in loader.headword_index.entries():
+        variants = [entry.headword, entry.translation] + entry.translation.split("/")
+        for variant in variants:
+            variant = variant.strip()
+            key = TranslationTable.key_for(variant)
+            if key and key not in seen:
+                seen.add(key)
+                queries.append(variant)
+    return queries
+
+
+async def build(force: bool = False):
+    print("📚 Загрузка словаря Elenya...")
+    loader = DictionaryLoader()
+    vectorstore = loader.load_dictionary()
+    dictionary_query = DictionaryQuery(
+        vectorstore,
+        loader.headword_index,
+        lexical_index=loader.lexical_index
+    )
+    # Только основная модель: таблица записывает, какой моделью получены ответы,
+    # а слова словаря иначе ушли бы на быстрый уровень (OPENAI_FAST_MODEL)
+    router = OpenAIRouter(dictionary_query, models=ModelRouter(fast_model=""))
+
+    table = TranslationTable.load(config.TRANSLATION_TABLE_PATH)
+    if force or table is None or table.version != dictionary_query.version:
+        table = TranslationTable(version=dictionary_query.version, model=config.OPENAI_MODEL)
+
+    queries = [query for query in collect_queries(loader) if table.key_for(query) not in table.answers]
+    print(f"🔄 Запросов к LLM: {len(queries)} (уже в таблице: {len(table)})")
+
+    started = time.perf_counter()
+    failed = 0
+
+    async def translate(query: str):
+        nonlocal failed
+        answer, found_in_dictionary = await router.atranslate(query, use_dictionary=True)
+        if answer == ERROR_ANSWER:
+            failed += 1
+            return
+        table.add(query, answer, found_in_dictionary)
+
+    # Одновременность ограничивает общий лимит OPENAI_MAX_CONCURRENCY
+    await asyncio.gather(*(translate(query) for query in queries))
+
+    table.save(config.TRANSLATION_TABLE_PATH)
+    print(
+        f"✅ Таблица переводов: {len(table)} ответов за {time.perf_counter() - started:.1f} с "
+        f"→ {config.TRANSLATION_TABLE_PATH}"
+    )
+    if failed:
+        print(f"⚠️  Ошибок: {failed} — запустите еще раз, чтобы досчитать")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="пересобрать таблицу целиком")
+    args = parser.parse_args()
+    asyncio.run(build(force=args.force))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,13 +10,126 @@ load_dotenv()
 # Telegram (поддерживаем оба названия переменной)
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN") or os.getenv("BOT_TOKEN")
 
+# Адрес Bot API (локальный сервер Bot API или заглушка из benchmarks/load_test.py);
+# пусто — api.telegram.org
+TELEGRAM_BASE_URL = os.getenv("TELEGRAM_BASE_URL", "")  # например, http://localhost:8081/bot
+TELEGRAM_BASE_FILE_URL = os.getenv("TELEGRAM_BASE_FILE_URL", "")  # например, http://localhost:8081/file/bot
+
+# Чаты, которым доступны служебные команды (/reload), через запятую
+ADMIN_CHAT_IDS = {
+    int(chat_id) for chat_id in os.getenv("ADMIN_CHAT_IDS", "").split(",") if chat_id.strip()
+}
+# Сколько апдейтов обрабатывать параллельно (разные чаты; порядок внутри чата
+# сохраняется). 0 — последовательная обработка
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "0"))
+
 # OpenAI
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_MODEL = "gpt-4-turbo"  # используем gpt-4-turbo как актуальную версию
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4-turbo")  # используем gpt-4-turbo как актуальную версию
+# Быстрая модель для коротких запросов с сильным совпадением в словаре
+# (services/model_router.py), например "gpt-4o-mini". По умолчанию выключено:
+# пусто — все запросы к OPENAI_MODEL
+OPENAI_FAST_MODEL = os.getenv("OPENAI_FAST_MODEL", "")
+FAST_MODEL_MAX_WORDS = int(os.getenv("FAST_MODEL_MAX_WORDS", "2"))
+# Модель, у которой скользящее среднее задержки или доли ошибок превысило
+# порог, не получает запросы MODEL_COOLDOWN секунд (запросы идут на другую)
+MODEL_EWMA_ALPHA = float(os.getenv("MODEL_EWMA_ALPHA", "0.2"))
+MODEL_MAX_LATENCY = float(os.getenv("MODEL_MAX_LATENCY", "20"))  # секунд
+MODEL_MAX_ERROR_RATE = float(os.getenv("MODEL_MAX_ERROR_RATE", "0.5"))
+MODEL_COOLDOWN = float(os.getenv("MODEL_COOLDOWN", "60"))  # секунд
+# Цены для отчета о стоимости в /stats: $ за 1M токенов (вход, выход)
+MODEL_PRICES = {
+    "gpt-4-turbo": (10.0, 30.0),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+# Максимум одновременных запросов к OpenAI (общий лимит на все сервисы)
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+# Общий пул HTTP-соединений к OpenAI (utils/openai_client.py)
+OPENAI_POOL_SIZE = int(os.getenv("OPENAI_POOL_SIZE", "20"))  # соединений в пуле
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))  # секунд простоя
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))  # секунд
+OPENAI_READ_TIMEOUT = float(os.getenv("OPENAI_READ_TIMEOUT", "60"))  # секунд
+# Vision: фото уменьшается до VISION_MAX_SIDE по длинной стороне (нужен Pillow)
+# и отправляется с детализацией VISION_DETAIL ("low" — фиксированные 85 токенов);
+# если ответ пустой — повтор с "high" по самой большой версии фото, уменьшенной
+# до VISION_HIGH_MAX_SIDE (для 4:3 это 1024×768 — больше Vision API все равно не берет)
+VISION_DETAIL = os.getenv("VISION_DETAIL", "low")
+VISION_MAX_SIDE = int(os.getenv("VISION_MAX_SIDE", "512"))  # пикселей
+VISION_HIGH_MAX_SIDE = int(os.getenv("VISION_HIGH_MAX_SIDE", "1024"))  # пикселей
+VISION_JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", "85"))
+# Эндпоинт метрик в формате Prometheus (задержки этапов, токены): http://METRICS_HOST:METRICS_PORT/metrics
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 — эндпоинт выключен
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# Потоковый вывод ответа: сообщение "⏳ Ищу перевод..." редактируется по мере генерации
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "0") == "1"
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))  # секунд между правками
+# Точное совпадение со словом из словаря (режим словаря) отвечается по шаблону
+# "Elenya: / Перевод: / Пояснение:" прямо из статьи, без запроса к LLM
+DICTIONARY_FAST_PATH = os.getenv("DICTIONARY_FAST_PATH", "0") == "1"
+
+# Кэш ответов (ключ: нормализованный текст + режим + контекст + версия словаря)
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "5000"))  # 0 — кэш выключен
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))  # секунд
+# Путь к SQLite-файлу, чтобы кэш переживал перезапуск (пусто — только память)
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "")
+
+# Семантический кэш: ответ на почти такой же запрос ("дерево" / "Деревья!")
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "2000"))  # 0 — кэш выключен
+# Минимальная косинусная близость эмбеддингов запросов для попадания
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.97"))
+# В свободном режиме эмбеддинг нужен только кэшу (словарь не ищется), и каждый
+# промах стоит лишний запрос к API эмбеддингов — поэтому по умолчанию выключено
+SEMANTIC_CACHE_FREE_MODE = os.getenv("SEMANTIC_CACHE_FREE_MODE", "0") == "1"
+
+# Кэш результатов Whisper / Vision (ключ: file_unique_id, затем хэш содержимого)
+MEDIA_CACHE_SIZE = int(os.getenv("MEDIA_CACHE_SIZE", "2000"))  # 0 — кэш выключен
+MEDIA_CACHE_TTL = float(os.getenv("MEDIA_CACHE_TTL", str(30 * 24 * 3600)))  # секунд
+MEDIA_CACHE_PATH = os.getenv("MEDIA_CACHE_PATH", "")  # SQLite; пусто — только память
+
+# Кэш эмбеддингов запросов (ключ: нормализованный текст + модель эмбеддингов)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))  # 0 — кэш выключен
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")  # SQLite; пусто — только память
+EMBEDDING_MODEL = "text-embedding-ada-002"  # модель эмбеддингов для словаря
+# Проверять длину текстов токенизатором tiktoken перед запросом эмбеддингов
+# (файлы кодировок скачиваются из сети; словарные статьи короткие — можно выключить)
+EMBEDDING_CHECK_CTX_LENGTH = os.getenv("EMBEDDING_CHECK_CTX_LENGTH", "1") == "1"
+# Контекст из словаря в промпте: не больше стольких токенов (tiktoken; без сети — оценка)
+PROMPT_CONTEXT_TOKENS = int(os.getenv("PROMPT_CONTEXT_TOKENS", "500"))
+# Лимит длины ответа LLM: перевод одного слова и фразы
+MAX_TOKENS_WORD = int(os.getenv("MAX_TOKENS_WORD", "250"))
+MAX_TOKENS_PHRASE = int(os.getenv("MAX_TOKENS_PHRASE", "500"))
+# Векторный поиск по словарю: "chroma", "numpy" (матрица эмбеддингов в памяти процесса)
+# или "mmap" (общий для всех воркеров файл эмбеддингов, см. VECTOR_STORE_PATH)
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "chroma")
+# Лексический поиск (BM25 + n-граммы слов Elenya), объединяется с векторным.
+# Релевантность — доля веса запроса, найденная в статье (0..1)
+LEXICAL_MIN_RELEVANCE = float(os.getenv("LEXICAL_MIN_RELEVANCE", "0.6"))  # считать найденным
+LEXICAL_STRONG_RELEVANCE = float(os.getenv("LEXICAL_STRONG_RELEVANCE", "0.9"))  # не считать эмбеддинг
+# Тип эмбеддингов в файле для mmap: "float16" или "int8" (с масштабом на вектор)
+VECTOR_STORE_DTYPE = os.getenv("VECTOR_STORE_DTYPE", "float16")
+
+# Словарь загружается в фоне после старта. Запросы в режиме словаря до его
+# готовности: "wait" — ждут до DICTIONARY_WARMUP_WAIT секунд, "free" — сразу
+# отвечаются без словаря (с пометкой для пользователя). При последовательной
+# обработке (CONCURRENT_UPDATES=0) ожидание задержало бы апдейты всех чатов,
+# поэтому по умолчанию "wait" — только при параллельной
+DICTIONARY_WARMUP_POLICY = os.getenv(
+    "DICTIONARY_WARMUP_POLICY", "wait" if CONCURRENT_UPDATES > 0 else "free"
+)
+DICTIONARY_WARMUP_WAIT = float(os.getenv("DICTIONARY_WARMUP_WAIT", "20"))  # секунд
 
 # Пути к файлам
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 DICTIONARY_PATH = os.path.join(PROJECT_ROOT, "rag", "data", "elenya_dict.pdf")
+# Каталог с сохраненным индексом ChromaDB (пересобирается при смене словаря)
+CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", os.path.join(PROJECT_ROOT, "chroma"))
+# Заранее посчитанные переводы слов словаря (собираются build_translations.py);
+# если файла нет — все запросы идут в LLM как обычно
+TRANSLATION_TABLE_PATH = os.getenv(
+    "TRANSLATION_TABLE_PATH", os.path.join(PROJECT_ROOT, "translations", "elenya_translations.json.gz")
+)
+# Файл эмбеддингов для RETRIEVAL_BACKEND=mmap (вне каталога Chroma: тот удаляется при пересборке)
+VECTOR_STORE_PATH = os.getenv("VECTOR_STORE_PATH", os.path.join(PROJECT_ROOT, "vectors", "elenya_vectors.bin"))
 
 # Проверка наличия токенов
 if not TELEGRAM_TOKEN:
@@ -0,0 +1,73 @@
+"""
+Служебные команды для администраторов бота
+"""
+import asyncio
+from typing import Callable, Dict
+from telegram import Update
+from telegram.ext import ContextTypes
+import config
+from rag.loader import DictionaryLoader
+
+
+# Глобальные объекты (будут инициализированы в bot.py)
+dictionary_loader: DictionaryLoader = None
+# Источники статистики для /stats: название → функция, возвращающая dict
+stats_providers: Dict[str, Callable[[], dict]] = {}
+
+
+def set_dependencies(loader: DictionaryLoader):
+    """Устанавливает зависимости"""
+    global dictionary_loader
+    dictionary_loader = loader
+
+
+def register_stats(name: str, provider: Callable[[], dict]):
+    """Добавляет источник статистики в вывод /stats"""
+    stats_providers[name] = provider
+
+
+def is_admin(chat_id: int) -> bool:
+    """Проверяет, разрешены ли служебные команды в этом чате"""
+    return chat_id in config.ADMIN_CHAT_IDS
+
+
+async def reload_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик команды /reload - обновление словаря без перезапуска"""
+    chat_id = update.effective_chat.id
+    if not is_admin(chat_id):
+        return
+
+    if dictionary_loader is None:
+        await update.message.reply_text("⏳ Словарь еще загружается, попробуй позже.")
+        return
+
+    processing_msg = await update.message.reply_text("🔄 Обновляю словарь...")
+
+    try:
+        # Чтение PDF и эмбеддинги — блокирующие операции, уводим их из event loop
+        report = await asyncio.to_thread(dictionary_loader.reload_dictionary)
+        await processing_msg.edit_text(f"✅ Словарь обновлен: {report}")
+    except Exception as e:
+        print(f"❌ Ошибка обновления словаря: {e}")
+        await processing_msg.edit_text("❌ Не удалось обновить словарь.")
+
+
+async def stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик команды /stats - очереди, кэши и прочие счетчики"""
+    chat_id = update.effective_chat.id
+    if not is_admin(chat_id):
+        return
+
+    if not stats_providers:
+        await update.message.reply_text("Статистика не собирается.")
+        return
+
+    lines = []
+    for name, provider in stats_providers.items():
+        values = ", ".join(
+            f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in provider().items()
+        )
+        lines.append(f"📊 {name}: {values}")
+
+    await update.message.reply_text("\n".join(lines))
@@ -1,11 +1,18 @@
 """
 Обработчик изображений
 """
+import asyncio
+from typing import Optional
 from telegram import Update
 from telegram.ext import ContextTypes
-import os
+import config
 from services.router import OpenAIRouter
+from services.media_cache import MediaCache
+from services.metrics import instrument_handler, tag
 from services.mode_manager import ModeManager
+from services.readiness import dictionary_readiness
+from services.streaming import stream_to_message
+from utils.image_prep import largest_photo, prepare_image, select_photo
 from utils.vision import VisionProcessor
 
 
@@ -13,42 +20,71 @@ from utils.vision import VisionProcessor
 router: OpenAIRouter = None
 mode_manager: ModeManager = None
 vision_processor: VisionProcessor = None
+media_cache: MediaCache = None
 
 
 def set_dependencies(
     openai_router: OpenAIRouter, 
     mode_mgr: ModeManager, 
-    vision: VisionProcessor
+    vision: VisionProcessor,
+    cache: MediaCache
 ):
     """Устанавливает зависимости"""
-    global router, mode_manager, vision_processor
+    global router, mode_manager, vision_processor, media_cache
     router = openai_router
     mode_manager = mode_mgr
     vision_processor = vision
+    media_cache = cache
 
 
+@instrument_handler("image")
 async def image_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик изображений"""
     chat_id = update.effective_chat.id
     
+    # Проверяем режим работы
+    use_dictionary = mode_manager.is_dictionary_mode(chat_id)
+    tag(mode=mode_manager.get_mode(chat_id))
+    
     # Отправляем сообщение о начале обработки
     processing_msg = await update.message.reply_text("🖼 Анализирую изображение...")
     
     try:
-        # Получаем файл изображения (самого большого размера)
-        photo = update.message.photo[-1]  # берем самое большое разрешение
-        photo_file = await context.bot.get_file(photo.file_id)
+        # Берем самую маленькую версию фото, достаточную для VISION_MAX_SIDE
+        photo = select_photo(update.message.photo, config.VISION_MAX_SIDE)
         
-        # Сохраняем временно
-        temp_path = f"/tmp/photo_{chat_id}_{photo.file_id}.jpg"
-        await photo_file.download_to_drive(temp_path)
+        async def download() -> bytes:
+            # Скачиваем в память: без временных файлов и их уборки
+            photo_file = await context.bot.get_file(photo.file_id)
+            return bytes(await photo_file.download_as_bytearray())
         
-        # Анализируем изображение
-        detected_object = vision_processor.analyze_image(temp_path)
+        async def analyze(image_data: bytes) -> Optional[str]:
+            # Декодирование и пересжатие (Pillow) — в отдельном потоке, не в event loop
+            image_data = await asyncio.to_thread(
+                prepare_image, image_data, config.VISION_MAX_SIDE, config.VISION_JPEG_QUALITY
+            )
+            detected = await vision_processor.aanalyze_image(
+                image_data, key=photo.file_unique_id, detail=config.VISION_DETAIL
+            )
+            
+            # Модель ответила, но ничего не распознала — повторяем с детализацией
+            # high по самой большой версии (после ошибки API — None — не повторяем)
+            if detected == "" and config.VISION_DETAIL != "high":
+                largest = largest_photo(update.message.photo)
+                largest_file = await context.bot.get_file(largest.file_id)
+                largest_data = await asyncio.to_thread(
+                    prepare_image,
+                    bytes(await largest_file.download_as_bytearray()),
+                    config.VISION_HIGH_MAX_SIDE,
+                    config.VISION_JPEG_QUALITY
+                )
+                detected = await vision_processor.aanalyze_image(
+                    largest_data, key=largest.file_unique_id, detail="high"
+                )
+            return detected
         
-        # Удаляем временный файл
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        # Анализируем изображение (повторное фото — из кэша, без скачивания)
+        detected_object = await media_cache.resolve("image", photo.file_unique_id, download, analyze)
         
         if not detected_object:
             await processing_msg.edit_text("❌ Не удалось определить объект на изображении.")
@@ -59,26 +95,44 @@ async def image_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"👁 Определено: {detected_object}\n\n⏳ Ищу перевод на Elenya..."
         )
         
-        # Проверяем режим работы
-        use_dictionary = mode_manager.is_dictionary_mode(chat_id)
+        # Пока словарь загружается — ждем его или отвечаем без него
+        use_dictionary, warmup_note = await dictionary_readiness.resolve_mode(use_dictionary)
+        
+        def format_answer(answer: str, found_in_dictionary: bool) -> str:
+            """Формирует финальный ответ"""
+            final_answer = f"👁 На изображении: {detected_object}\n\n{answer}"
+            
+            # Если используем словарь и слово не найдено - предупреждаем
+            if use_dictionary and not found_in_dictionary:
+                final_answer += "\n\n⚠️ Слово не найдено в словаре Elenya, перевод дан по общему контексту."
+            if warmup_note:
+                final_answer += f"\n\n{warmup_note}"
+            
+            return final_answer
+        
+        # Потоковый режим: перевод появляется в сообщении о обработке по мере генерации
+        if config.STREAM_RESPONSES:
+            await stream_to_message(
+                processing_msg,
+                router.astream_translate(
+                    text=detected_object,
+                    use_dictionary=use_dictionary,
+                    context=f"Это объект на изображении: {detected_object}"
+                ),
+                format_answer
+            )
+            return
         
         # Получаем перевод через роутер
-        answer, found_in_dictionary = router.translate(
+        answer, found_in_dictionary = await router.atranslate(
             text=detected_object,
             use_dictionary=use_dictionary,
             context=f"Это объект на изображении: {detected_object}"
         )
         
-        # Формируем финальный ответ
-        final_answer = f"👁 На изображении: {detected_object}\n\n{answer}"
-        
-        # Если используем словарь и слово не найдено - предупреждаем
-        if use_dictionary and not found_in_dictionary:
-            final_answer += "\n\n⚠️ Слово не найдено в словаре Elenya, перевод дан по общему контексту."
-        
         # Отправляем результат
         await processing_msg.delete()
-        await update.message.reply_text(final_answer)
+        await update.message.reply_text(format_answer(answer, found_in_dictionary))
         
     except Exception as e:
         print(f"❌ Ошибка обработки изображения: {e}")
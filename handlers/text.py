@@ -3,8 +3,12 @@
 """
 from telegram import Update
 from telegram.ext import ContextTypes
+import config
 from services.router import OpenAIRouter
+from services.metrics import instrument_handler, tag
 from services.mode_manager import ModeManager
+from services.readiness import dictionary_readiness
+from services.streaming import stream_to_message
 
 
 # Глобальные объекты (будут инициализированы в bot.py)
@@ -19,6 +23,7 @@ def set_dependencies(openai_router: OpenAIRouter, mode_mgr: ModeManager):
     mode_manager = mode_mgr
 
 
+@instrument_handler("text")
 async def text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик текстовых сообщений"""
     chat_id = update.effective_chat.id
@@ -26,23 +31,41 @@ async def text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Проверяем режим работы
     use_dictionary = mode_manager.is_dictionary_mode(chat_id)
+    tag(mode=mode_manager.get_mode(chat_id))
     
     # Отправляем сообщение о начале обработки
     processing_msg = await update.message.reply_text("⏳ Ищу перевод...")
     
+    # Пока словарь загружается — ждем его или отвечаем без него
+    use_dictionary, warmup_note = await dictionary_readiness.resolve_mode(use_dictionary)
+    
+    def format_answer(answer: str, found_in_dictionary: bool) -> str:
+        """Формирует финальный ответ"""
+        final_answer = answer
+        
+        # Если используем словарь и слово не найдено - предупреждаем
+        if use_dictionary and not found_in_dictionary:
+            final_answer += "\n\n⚠️ Слово не найдено в словаре Elenya, перевод дан по общему контексту."
+        if warmup_note:
+            final_answer += f"\n\n{warmup_note}"
+        
+        return final_answer
+    
+    # Потоковый режим: ответ появляется в сообщении о обработке по мере генерации
+    if config.STREAM_RESPONSES:
+        await stream_to_message(
+            processing_msg,
+            router.astream_translate(text=user_text, use_dictionary=use_dictionary),
+            format_answer
+        )
+        return
+    
     # Получаем перевод через роутер
-    answer, found_in_dictionary = router.translate(
+    answer, found_in_dictionary = await router.atranslate(
         text=user_text,
         use_dictionary=use_dictionary
     )
     
-    # Формируем финальный ответ
-    final_answer = answer
-    
-    # Если используем словарь и слово не найдено - предупреждаем
-    if use_dictionary and not found_in_dictionary:
-        final_answer += "\n\n⚠️ Слово не найдено в словаре Elenya, перевод дан по общему контексту."
-    
     # Удаляем сообщение о обработке и отправляем результат
     await processing_msg.delete()
-    await update.message.reply_text(final_answer)
+    await update.message.reply_text(format_answer(answer, found_in_dictionary))
@@ -3,9 +3,13 @@
 """
 from telegram import Update
 from telegram.ext import ContextTypes
-import os
+import config
 from services.router import OpenAIRouter
+from services.media_cache import MediaCache
+from services.metrics import instrument_handler, tag
 from services.mode_manager import ModeManager
+from services.readiness import dictionary_readiness
+from services.streaming import stream_to_message
 from utils.stt import SpeechToText
 
 
@@ -13,38 +17,49 @@ from utils.stt import SpeechToText
 router: OpenAIRouter = None
 mode_manager: ModeManager = None
 stt_processor: SpeechToText = None
+media_cache: MediaCache = None
 
 
-def set_dependencies(openai_router: OpenAIRouter, mode_mgr: ModeManager, stt: SpeechToText):
+def set_dependencies(
+    openai_router: OpenAIRouter,
+    mode_mgr: ModeManager,
+    stt: SpeechToText,
+    cache: MediaCache
+):
     """Устанавливает зависимости"""
-    global router, mode_manager, stt_processor
+    global router, mode_manager, stt_processor, media_cache
     router = openai_router
     mode_manager = mode_mgr
     stt_processor = stt
+    media_cache = cache
 
 
+@instrument_handler("voice")
 async def voice_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик голосовых сообщений"""
     chat_id = update.effective_chat.id
     
+    # Проверяем режим работы
+    use_dictionary = mode_manager.is_dictionary_mode(chat_id)
+    tag(mode=mode_manager.get_mode(chat_id))
+    
     # Отправляем сообщение о начале обработки
     processing_msg = await update.message.reply_text("🎤 Распознаю голосовое сообщение...")
     
     try:
         # Получаем файл голосового сообщения
         voice = update.message.voice
-        voice_file = await context.bot.get_file(voice.file_id)
         
-        # Сохраняем временно
-        temp_path = f"/tmp/voice_{chat_id}_{voice.file_id}.ogg"
-        await voice_file.download_to_drive(temp_path)
+        async def download() -> bytes:
+            # Скачиваем в память: без временных файлов и их уборки
+            voice_file = await context.bot.get_file(voice.file_id)
+            return bytes(await voice_file.download_as_bytearray())
         
-        # Распознаем речь
-        recognized_text = stt_processor.transcribe(temp_path)
+        async def recognize(audio: bytes) -> str:
+            return await stt_processor.atranscribe(audio, key=voice.file_unique_id)
         
-        # Удаляем временный файл
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        # Распознаем речь (повторное голосовое — из кэша, без скачивания)
+        recognized_text = await media_cache.resolve("voice", voice.file_unique_id, download, recognize)
         
         if not recognized_text:
             await processing_msg.edit_text("❌ Не удалось распознать речь. Попробуй еще раз.")
@@ -53,25 +68,39 @@ async def voice_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Показываем распознанный текст
         await processing_msg.edit_text(f"📝 Распознано: {recognized_text}\n\n⏳ Ищу перевод...")
         
-        # Проверяем режим работы
-        use_dictionary = mode_manager.is_dictionary_mode(chat_id)
+        # Пока словарь загружается — ждем его или отвечаем без него
+        use_dictionary, warmup_note = await dictionary_readiness.resolve_mode(use_dictionary)
+        
+        def format_answer(answer: str, found_in_dictionary: bool) -> str:
+            """Формирует финальный ответ"""
+            final_answer = f"📝 Распознано: {recognized_text}\n\n{answer}"
+            
+            # Если используем словарь и слово не найдено - предупреждаем
+            if use_dictionary and not found_in_dictionary:
+                final_answer += "\n\n⚠️ Слово не найдено в словаре Elenya, перевод дан по общему контексту."
+            if warmup_note:
+                final_answer += f"\n\n{warmup_note}"
+            
+            return final_answer
+        
+        # Потоковый режим: перевод появляется в сообщении о обработке по мере генерации
+        if config.STREAM_RESPONSES:
+            await stream_to_message(
+                processing_msg,
+                router.astream_translate(text=recognized_text, use_dictionary=use_dictionary),
+                format_answer
+            )
+            return
         
         # Получаем перевод через роутер
-        answer, found_in_dictionary = router.translate(
+        answer, found_in_dictionary = await router.atranslate(
             text=recognized_text,
             use_dictionary=use_dictionary
         )
         
-        # Формируем финальный ответ
-        final_answer = f"📝 Распознано: {recognized_text}\n\n{answer}"
-        
-        # Если используем словарь и слово не найдено - предупреждаем
-        if use_dictionary and not found_in_dictionary:
-            final_answer += "\n\n⚠️ Слово не найдено в словаре Elenya, перевод дан по общему контексту."
-        
         # Отправляем результат
         await processing_msg.delete()
-        await update.message.reply_text(final_answer)
+        await update.message.reply_text(format_answer(answer, found_in_dictionary))
         
     except Exception as e:
         print(f"❌ Ошибка обработки голосового сообщения: {e}")
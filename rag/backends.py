@@ -0,0 +1,183 @@
+"""
+Бэкенды векторного поиска для DictionaryQuery
+"""
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from rag.mmap_store import MmapVectorStore
+
+if TYPE_CHECKING:
+    import numpy as np
+    from langchain_core.documents import Document
+
+
+# Результат поиска: (документ, расстояние); меньше — ближе
+SearchResults = List[Tuple["Document", float]]
+
+
+class ChromaBackend:
+    """Поиск через Chroma (исходный вариант)"""
+
+    name = "chroma"
+
+    def __init__(self, vectorstore):
+        self.vectorstore = vectorstore
+
+    def search(self, embedding: List[float], k: int) -> SearchResults:
+        """Top-k документов по эмбеддингу запроса"""
+        return self.vectorstore.similarity_search_by_vector_with_relevance_scores(
+            embedding, k=k
+        )
+
+    def search_batch(self, embeddings: List[List[float]], k: int) -> List[SearchResults]:
+        """Top-k для нескольких запросов"""
+        return [self.search(embedding, k) for embedding in embeddings]
+
+    def refresh(self, version: Optional[str]):
+        """Chroma обновляется на месте — делать ничего не нужно"""
+
+
+class NumpyBackend:
+    """
+    Поиск в памяти процесса: нормированная матрица эмбеддингов и одно
+    векторизованное скалярное произведение на запрос
+
+    Расстояние совпадает с тем, что возвращает Chroma (квадрат L2): для
+    единичных векторов это 2 - 2·cos, поэтому порог релевантности 1.5 в
+    DictionaryQuery работает без изменений.
+    """
+
+    name = "numpy"
+
+    def __init__(self, documents: List["Document"], matrix: "np.ndarray", version: Optional[str] = None):
+        import numpy as np
+
+        self.documents = documents
+        self.matrix = self._normalize_rows(np.asarray(matrix, dtype=np.float32))
+        self.version = version
+        self._vectorstore = None
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, version: Optional[str] = None) -> "NumpyBackend":
+        """Забирает готовые эмбеддинги из Chroma (без вызовов API)"""
+        backend = cls(*cls._load(vectorstore), version=version)
+        backend._vectorstore = vectorstore
+        return backend
+
+    def search(self, embedding: List[float], k: int) -> SearchResults:
+        """Top-k документов по эмбеддингу запроса"""
+        return self.search_batch([embedding], k)[0]
+
+    def search_batch(self, embeddings: List[List[float]], k: int) -> List[SearchResults]:
+        """Top-k для нескольких запросов одним матричным умножением"""
+        import numpy as np
+
+        if not self.documents:
+            return [[] for _ in embeddings]
+
+        queries = self._normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        distances = 2.0 - 2.0 * (queries @ self.matrix.T)
+        return _top_k(self.documents, distances, k)
+
+    def refresh(self, version: Optional[str]):
+        """Перечитывает эмбеддинги из Chroma, если словарь обновился (/reload)"""
+        if version == self.version or self._vectorstore is None:
+            return
+        documents, matrix = self._load(self._vectorstore)
+        # Подменяем обе ссылки сразу, без промежуточного состояния
+        self.documents, self.matrix = documents, self._normalize_rows(matrix)
+        self.version = version
+
+    @staticmethod
+    def _load(vectorstore) -> Tuple[List["Document"], "np.ndarray"]:
+        import numpy as np
+        from langchain_core.documents import Document
+
+        data = vectorstore.get(include=["embeddings", "documents", "metadatas"])
+        documents = [
+            Document(page_content=text, metadata=metadata or {})
+            for text, metadata in zip(data["documents"], data["metadatas"])
+        ]
+        matrix = np.asarray(data["embeddings"], dtype=np.float32)
+        if not documents:
+            matrix = np.zeros((0, 1), dtype=np.float32)
+        return documents, matrix
+
+    @staticmethod
+    def _normalize_rows(matrix: "np.ndarray") -> "np.ndarray":
+        return _normalize_rows(matrix)
+
+
+class MmapBackend:
+    """
+    Поиск по файлу хранилища эмбеддингов (rag/mmap_store.py), открытому через mmap
+
+    Векторы лежат в page cache и общие для всех процессов-воркеров, поэтому
+    память на воркер не растет с их числом, а старт не требует ни Chroma, ни
+    копирования матрицы. Расстояния — в той же шкале, что у Chroma.
+    """
+
+    name = "mmap"
+
+    def __init__(self, store: MmapVectorStore):
+        self.store = store
+        self.version = store.version
+
+    @classmethod
+    def open(cls, path: str) -> "MmapBackend":
+        """Открывает файл хранилища"""
+        return cls(MmapVectorStore(path))
+
+    def search(self, embedding: List[float], k: int) -> SearchResults:
+        """Top-k документов по эмбеддингу запроса"""
+        return self.search_batch([embedding], k)[0]
+
+    def search_batch(self, embeddings: List[List[float]], k: int) -> List[SearchResults]:
+        """Top-k для нескольких запросов"""
+        import numpy as np
+
+        store = self.store
+        if not len(store):
+            return [[] for _ in embeddings]
+
+        queries = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        distances = 2.0 - 2.0 * store.similarities(queries)
+        return _top_k(store.documents, distances, k)
+
+    def refresh(self, version: Optional[str]):
+        """Переоткрывает файл, если словарь обновился и файл уже перезаписан"""
+        if version == self.version:
+            return
+        try:
+            store = MmapVectorStore(self.store.path)
+        except ValueError:
+            return
+        if store.version == version:
+            # Старое отображение освободится, когда на него не останется ссылок
+            self.store, self.version = store, version
+
+
+def _top_k(documents: List["Document"], distances: "np.ndarray", k: int) -> List[SearchResults]:
+    """k ближайших документов для каждой строки матрицы расстояний"""
+    import numpy as np
+
+    k = min(k, len(documents))
+
+    # argpartition находит k лучших за O(n), сортируем только их
+    top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    results = []
+    for row, candidates in enumerate(top):
+        order = candidates[np.argsort(distances[row, candidates])]
+        results.append([
+            (documents[index], float(max(distances[row, index], 0.0)))
+            for index in order
+        ])
+    return results
+
+
+def _normalize_rows(matrix: "np.ndarray") -> "np.ndarray":
+    import numpy as np
+
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
@@ -0,0 +1,180 @@
+"""
+Кэш эмбеддингов поисковых запросов
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from rag.normalize import normalize_text
+
+
+class EmbeddingCache:
+    """
+    Ограниченный LRU-кэш "нормализованный запрос → эмбеддинг"
+
+    Эмбеддинги зависят только от текста и модели, поэтому время жизни у
+    записей нет. Если задан db_path, векторы (float32) сохраняются в SQLite и
+    переживают перезапуск (WAL с synchronous=NORMAL, диск — под отдельной
+    блокировкой, запись отложенная в фоновом потоке, из асинхронного кода —
+    aget() и amissing(): как в ResponseCache).
+    """
+
+    def __init__(self, model: str, max_size: int, db_path: Optional[str] = None):
+        self.model = model
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._writer: Optional[ThreadPoolExecutor] = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if db_path:
+            self._open_db(db_path)
+
+    @staticmethod
+    def key_for(text: str) -> str:
+        """Ключ запроса: нормализованный текст"""
+        return normalize_text(text)
+
+    def get(self, text: str) -> Optional[List[float]]:
+        """Возвращает эмбеддинг запроса или None"""
+        key = self.key_for(text)
+        embedding = self._memory_get(key)
+        if embedding is not None:
+            return embedding
+        return self._disk_result(key, self._db_get(key))
+
+    async def aget(self, text: str) -> Optional[List[float]]:
+        """Асинхронный get: SQLite читается в отдельном потоке"""
+        key = self.key_for(text)
+        embedding = self._memory_get(key)
+        if embedding is not None:
+            return embedding
+        if self._db is None:
+            return self._disk_result(key, None)
+        return self._disk_result(key, await asyncio.to_thread(self._db_get, key))
+
+    def set(self, text: str, embedding: List[float]):
+        """Сохраняет эмбеддинг запроса (на диск — в фоне)"""
+        if self.max_size <= 0:
+            return
+        key = self.key_for(text)
+        with self._lock:
+            self._remember(key, embedding)
+        if self._writer is not None:
+            self._writer.submit(self._db_set, key, embedding)
+
+    def flush(self):
+        """Дожидается записи на диск всего, что уже сохранено через set()"""
+        if self._writer is not None:
+            self._writer.submit(lambda: None).result()
+
+    def missing(self, texts: List[str]) -> List[str]:
+        """Запросы (по одному на ключ), эмбеддингов которых нет в кэше"""
+        result, seen = [], set()
+        for text in texts:
+            key = self.key_for(text)
+            if key in seen or not key:
+                continue
+            seen.add(key)
+            with self._lock:
+                cached = key in self._entries
+            if not cached:
+                cached = self._db_get(key) is not None
+            if not cached:
+                result.append(text)
+        return result
+
+    async def amissing(self, texts: List[str]) -> List[str]:
+        """Асинхронный missing: с SQLite проверка идет в отдельном потоке"""
+        if self._db is None:
+            return self.missing(texts)
+        return await asyncio.to_thread(self.missing, texts)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий и промахов"""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def _memory_get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return embedding
+
+    def _disk_result(self, key: str, embedding: Optional[List[float]]) -> Optional[List[float]]:
+        """Итог поиска после промаха в памяти: найденное на диске поднимается в память"""
+        with self._lock:
+            if embedding is not None:
+                self._remember(key, embedding)
+                self.disk_hits += 1
+                return embedding
+
+            self.misses += 1
+            return None
+
+    def _remember(self, key: str, embedding: List[float]):
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _open_db(self, db_path: str):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings "
+            "(model TEXT NOT NULL, key TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, key))"
+        )
+        self._db.commit()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-cache")
+
+    def _db_get(self, key: str) -> Optional[List[float]]:
+        import numpy as np
+
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT vector FROM query_embeddings WHERE model = ? AND key = ?",
+                (self.model, key)
+            ).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def _db_set(self, key: str, embedding: List[float]):
+        """Запись на диск (в потоке записи); ошибка не теряет запись в памяти"""
+        import numpy as np
+
+        vector = np.asarray(embedding, dtype=np.float32).tobytes()
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO query_embeddings (model, key, vector) VALUES (?, ?, ?)",
+                    (self.model, key, vector)
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️  Кэш эмбеддингов: ошибка записи на диск: {e}")
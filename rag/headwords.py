@@ -0,0 +1,78 @@
+"""
+Точный индекс заголовочных слов словаря Elenya
+"""
+from typing import Callable, Dict, Iterable, List, Optional
+from rag.normalize import exact_key, lookup_key
+from rag.parser import DictionaryEntry
+
+
+class HeadwordIndex:
+    """
+    In-memory индекс "нормализованное слово → словарные статьи"
+
+    Ключи строятся из обеих сторон статьи (Elenya и русский перевод, включая
+    варианты через "/"), поэтому однословные запросы в любом направлении
+    находятся без обращения к API эмбеддингов.
+
+    Ключей два вида: со стеммингом (lookup — поиск контекста для LLM, находит
+    и другие формы слова) и без него (lookup_exact — для ответов без LLM,
+    где склейка разных слов по общей основе недопустима).
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, List[DictionaryEntry]] = {}
+        self._exact: Dict[str, List[DictionaryEntry]] = {}
+        # Версия словаря (хэш PDF), из которого построен индекс
+        self.version: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def rebuild(self, entries: Iterable[DictionaryEntry], version: Optional[str] = None):
+        """Перестраивает индекс по словарным статьям"""
+        index: Dict[str, List[DictionaryEntry]] = {}
+        exact: Dict[str, List[DictionaryEntry]] = {}
+        for entry in entries:
+            for target, key_func in ((index, lookup_key), (exact, exact_key)):
+                for key in self._keys_for(entry, key_func):
+                    bucket = target.setdefault(key, [])
+                    if entry not in bucket:
+                        bucket.append(entry)
+
+        # Подменяем словари целиком, чтобы параллельные поиски не видели полуготовый индекс
+        self._entries, self._exact = index, exact
+        self.version = version
+
+    def entries(self) -> List[DictionaryEntry]:
+        """Все статьи индекса (каждая один раз)"""
+        unique: List[DictionaryEntry] = []
+        for bucket in self._entries.values():
+            for entry in bucket:
+                if entry not in unique:
+                    unique.append(entry)
+        return unique
+
+    def lookup(self, query: str) -> List[DictionaryEntry]:
+        """Статьи, совпавшие с запросом по основе слов (или пустой список)"""
+        key = lookup_key(query)
+        if not key:
+            return []
+        return list(self._entries.get(key, []))
+
+    def lookup_exact(self, query: str) -> List[DictionaryEntry]:
+        """Статьи, совпавшие с запросом дословно, без стемминга (или пустой список)"""
+        key = exact_key(query)
+        if not key:
+            return []
+        return list(self._exact.get(key, []))
+
+    @staticmethod
+    def _keys_for(entry: DictionaryEntry, key_func: Callable[[str], str]) -> List[str]:
+        """Ключи статьи: слово на Elenya, полный перевод и его варианты"""
+        variants = [entry.headword, entry.translation] + entry.translation.split("/")
+        keys = []
+        for variant in variants:
+            key = key_func(variant)
+            if key and key not in keys:
+                keys.append(key)
+        return keys
@@ -0,0 +1,169 @@
+"""
+Лексический поиск по словарю Elenya (BM25)
+"""
+import math
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+from rag.normalize import is_cyrillic, normalize_text, stem_russian
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+
+# Параметры BM25
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Слова Elenya дополнительно режутся на символьные n-граммы: у эмбеддингов
+# OpenAI для выдуманных слов нет семантики, а n-граммы находят и формы с
+# опечатками или другим окончанием
+NGRAM_SIZE = 3
+NGRAM_WEIGHT = 0.5
+NGRAM_PREFIX = "#"
+
+
+def words(text: str) -> List[str]:
+    """Нормализованные слова текста"""
+    return [word for word in (part.strip("-'") for part in normalize_text(text).split(" ")) if word]
+
+
+def ngrams(word: str) -> List[str]:
+    """Символьные n-граммы слова (с метками начала и конца)"""
+    padded = f"^{word}$"
+    return [NGRAM_PREFIX + padded[start:start + NGRAM_SIZE] for start in range(len(padded) - NGRAM_SIZE + 1)]
+
+
+def tokenize(text: str) -> List[Tuple[str, float]]:
+    """
+    Токены текста с весами
+
+    Русские слова приводятся к основе, слова Elenya дают сам токен и его
+    n-граммы (с пониженным весом).
+    """
+    tokens = []
+    for word in words(text):
+        if is_cyrillic(word):
+            tokens.append((stem_russian(word), 1.0))
+            continue
+        tokens.append((word, 1.0))
+        tokens += [(gram, NGRAM_WEIGHT) for gram in ngrams(word)]
+    return tokens
+
+
+@dataclass
+class LexicalMatch:
+    """Результат лексического поиска"""
+    document: "Document"
+    score: float  # BM25, для ранжирования
+    # 0..1: доля веса запроса, найденная в документе, или доля n-грамм
+    # лучше всего совпавшего слова Elenya (что больше)
+    relevance: float
+
+
+class LexicalIndex:
+    """
+    BM25-индекс по словарным статьям и фрагментам текста
+
+    Строится при загрузке словаря из тех же документов, что и векторный
+    индекс, и работает полностью локально.
+    """
+
+    def __init__(self):
+        self._documents: List["Document"] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._lengths: List[int] = []
+        self._average_length = 0.0
+        # Версия словаря (хэш PDF), из которого построен индекс
+        self.version: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def rebuild(self, documents: Iterable["Document"], version: Optional[str] = None):
+        """Перестраивает индекс (одинаковые тексты индексируются один раз)"""
+        unique: Dict[str, "Document"] = {}
+        for doc in documents:
+            unique.setdefault(doc.page_content, doc)
+
+        indexed = list(unique.values())
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = []
+        for position, doc in enumerate(indexed):
+            counts = Counter(token for token, _ in tokenize(doc.page_content))
+            lengths.append(sum(counts.values()))
+            for token, count in counts.items():
+                postings.setdefault(token, []).append((position, count))
+
+        # Подменяем все поля разом, чтобы параллельные поиски не видели полуготовый индекс
+        self._documents, self._postings, self._lengths = indexed, postings, lengths
+        self._average_length = sum(lengths) / len(lengths) if lengths else 0.0
+        self.version = version
+
+    def search(self, query: str, k: int = 3) -> List[LexicalMatch]:
+        """Top-k документов по BM25 (пустой список, если совпадений нет)"""
+        documents, postings, lengths = self._documents, self._postings, self._lengths
+        if not documents:
+            return []
+
+        weights: Dict[str, float] = {}
+        for token, weight in tokenize(query):
+            weights[token] = max(weights.get(token, 0.0), weight)
+
+        scores: Dict[int, float] = {}
+        matched: Dict[int, float] = {}
+        total_weight = 0.0
+        for token, weight in weights.items():
+            token_postings = postings.get(token, [])
+            idf = self._idf(len(token_postings), len(documents))
+            total_weight += weight * idf
+            for position, count in token_postings:
+                norm = 1 - BM25_B + BM25_B * lengths[position] / self._average_length
+                tf = count * (BM25_K1 + 1) / (count + BM25_K1 * norm)
+                scores[position] = scores.get(position, 0.0) + weight * idf * tf
+                matched[position] = matched.get(position, 0.0) + weight * idf
+
+        relevance = {
+            position: value / total_weight if total_weight else 0.0
+            for position, value in matched.items()
+        }
+        # Запрос из нескольких слов Elenya ("navi sera") ни одна статья не
+        # покрывает целиком, но каждое слово находится в своей статье
+        for word in words(query):
+            if is_cyrillic(word):
+                continue
+            word_relevance = self._word_relevance(word, postings, len(documents))
+            for position, value in word_relevance.items():
+                relevance[position] = max(relevance[position], value)
+
+        best = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [
+            LexicalMatch(
+                document=documents[position],
+                score=scores[position],
+                relevance=relevance[position]
+            )
+            for position in best
+        ]
+
+    def _word_relevance(
+        self,
+        word: str,
+        postings: Dict[str, List[Tuple[int, int]]],
+        total: int
+    ) -> Dict[int, float]:
+        """Доля n-грамм слова (с весами idf), найденная в каждом документе"""
+        matched: Dict[int, float] = {}
+        total_weight = 0.0
+        for gram in set(ngrams(word)):
+            gram_postings = postings.get(gram, [])
+            idf = self._idf(len(gram_postings), total)
+            total_weight += idf
+            for position, _ in gram_postings:
+                matched[position] = matched.get(position, 0.0) + idf
+        return {position: value / total_weight for position, value in matched.items()}
+
+    @staticmethod
+    def _idf(document_frequency: int, total: int) -> float:
+        # Неизвестный индексу токен получает максимальный вес: запрос с ним
+        # не может считаться полностью найденным
+        return math.log(1 + (total - document_frequency + 0.5) / (document_frequency + 0.5))
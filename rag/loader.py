@@ -1,48 +1,373 @@
 """
 Загрузка словаря Elenya в RAG систему
 """
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 import config
+from rag.headwords import HeadwordIndex
+from rag.lexical import LexicalIndex
+from rag.mmap_store import MmapVectorStore, read_store_header, write_vector_store
+from rag.parser import DictionaryEntry, parse_dictionary
+from utils.openai_client import get_async_http_client, get_http_client
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+
+@dataclass
+class IndexUpdateReport:
+    """Итог синхронизации индекса со словарем"""
+    added: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    rebuilt: bool = False
+
+    def __str__(self) -> str:
+        if self.rebuilt:
+            return f"индекс перестроен: {self.added} фрагментов"
+        return (
+            f"добавлено: {self.added}, удалено: {self.removed}, "
+            f"без изменений: {self.unchanged}"
+        )
 
 
 class DictionaryLoader:
     """Загрузчик словаря в векторную базу данных"""
-    
-    def __init__(self):
+
+    COLLECTION_NAME = "elenya_dictionary"
+    # Словарные статьи индексируются по одной; на чанки режется только
+    # остальной текст (грамматика, диалоги)
+    PARSER_VERSION = "entries-v1"
+    CHUNK_SIZE = 500
+    CHUNK_OVERLAP = 50
+
+    # Файл с ключами индекса внутри persist_directory
+    INDEX_META_FILE = "index_meta.json"
+
+    def __init__(
+        self,
+        persist_directory: Optional[str] = None,
+        vector_store_path: Optional[str] = None,
+        vector_store_dtype: str = "float16"
+    ):
+        # Тяжелые зависимости (langchain_openai, Chroma, pypdf) импортируются при
+        # первом использовании: импорт bot.py не ждет их загрузки
+        from langchain_openai import OpenAIEmbeddings
+
         self.embeddings = OpenAIEmbeddings(
-            openai_api_key=config.OPENAI_API_KEY
+            model=config.EMBEDDING_MODEL,
+            openai_api_key=config.OPENAI_API_KEY,
+            check_embedding_ctx_length=config.EMBEDDING_CHECK_CTX_LENGTH,
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client()
         )
+        self.persist_directory = persist_directory or config.CHROMA_PERSIST_DIR
+        # Если задан путь, после каждой загрузки индекс выгружается в файл для mmap
+        self.vector_store_path = vector_store_path
+        self.vector_store_dtype = vector_store_dtype
         self.vectorstore = None
-        
+        self.dictionary_version = None
+        # Точный и лексический индексы строятся из PDF при каждой загрузке (без эмбеддингов)
+        self.headword_index = HeadwordIndex()
+        self.lexical_index = LexicalIndex()
+        # Итог последней загрузки (для /reload)
+        self.last_report: Optional[IndexUpdateReport] = None
+
     def load_dictionary(self):
-        """Загружает словарь из PDF и создает векторное хранилище"""
-        # Загружаем PDF
-        loader = PyPDFLoader(config.DICTIONARY_PATH)
-        documents = loader.load()
-        
-        # Разбиваем на чанки
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=500,
-            chunk_overlap=50,
-            length_function=len,
-        )
-        splits = text_splitter.split_documents(documents)
-        
+        """
+        Загружает словарь в векторное хранилище
+
+        Индекс на диске описывается двумя ключами: ключом настроек (парсер,
+        разбиение, модель эмбеддингов) и хэшем PDF. Если оба совпадают, индекс открывается
+        без единого вызова эмбеддингов. Если изменился только PDF, индекс
+        обновляется инкрементально. Иначе он строится заново.
+        """
+        settings_key = self._compute_settings_key()
+        pdf_hash = self._compute_pdf_hash()
+        meta = self._read_index_meta()
+
+        entries, documents = self._build_documents(self._load_pages())
+
+        if meta.get("settings_key") == settings_key:
+            self.vectorstore = self._open_vectorstore()
+
+            if meta.get("pdf_hash") == pdf_hash:
+                self._export_vector_store(settings_key, pdf_hash)
+                self._swap_indexes(entries, documents, pdf_hash)
+                count = len(self.vectorstore.get(include=[])["ids"])
+                self.last_report = IndexUpdateReport(unchanged=count)
+                print(f"✅ Словарь загружен из индекса: {count} фрагментов")
+                return self.vectorstore
+
+            report = self._sync_index(documents)
+            self._write_index_meta(settings_key, pdf_hash)
+            self._export_vector_store(settings_key, pdf_hash)
+            self._swap_indexes(entries, documents, pdf_hash)
+            self.last_report = report
+            print(f"✅ Словарь обновлен ({report})")
+            return self.vectorstore
+
+        print("🔄 Индекс словаря устарел или отсутствует, строим заново...")
+        chunks = self._chunks_by_id(documents)
+
+        # Старый индекс больше не нужен — удаляем его целиком
+        if os.path.exists(self.persist_directory):
+            shutil.rmtree(self.persist_directory)
+
         # Создаем векторное хранилище
+        from langchain_community.vectorstores import Chroma
+
         self.vectorstore = Chroma.from_documents(
-            documents=splits,
+            documents=list(chunks.values()),
+            ids=list(chunks.keys()),
             embedding=self.embeddings,
-            collection_name="elenya_dictionary"
+            collection_name=self.COLLECTION_NAME,
+            persist_directory=self.persist_directory
         )
-        
-        print(f"✅ Словарь загружен: {len(splits)} фрагментов")
+        self._write_index_meta(settings_key, pdf_hash)
+        self._export_vector_store(settings_key, pdf_hash)
+        self._swap_indexes(entries, documents, pdf_hash)
+        self.last_report = IndexUpdateReport(added=len(chunks), rebuilt=True)
+
+        print(f"✅ Словарь загружен: {len(chunks)} фрагментов")
         return self.vectorstore
-    
+
+    def _swap_indexes(self, entries: List[DictionaryEntry], documents: List["Document"], pdf_hash: str):
+        """
+        Переключает точный и лексический индексы на новую версию словаря
+
+        Вызывается последним, после выгрузки файла для mmap: по версии индекса
+        слов поиск переоткрывает файл, и к этому моменту он уже перезаписан.
+        """
+        self.lexical_index.rebuild(documents, version=pdf_hash)
+        self.headword_index.rebuild(entries, version=pdf_hash)
+        self.dictionary_version = pdf_hash
+
+    def open_vector_store(self) -> MmapVectorStore:
+        """
+        Открывает файл хранилища эмбеддингов (для воркеров с mmap)
+
+        Если файл соответствует текущим настройкам и PDF, он просто
+        отображается в память: Chroma не открывается, PDF не разбирается,
+        точный и лексический индексы строятся из содержимого файла. Иначе словарь
+        загружается обычным путем и файл перезаписывается; параллельные
+        воркеры ждут на файловой блокировке и используют готовый результат.
+        """
+        if not self.vector_store_path:
+            raise ValueError("Не задан путь к файлу хранилища эмбеддингов")
+
+        settings_key = self._compute_settings_key()
+        pdf_hash = self._compute_pdf_hash()
+
+        if not self._vector_store_is_current(settings_key, pdf_hash):
+            with self._build_lock():
+                if not self._vector_store_is_current(settings_key, pdf_hash):
+                    self.load_dictionary()
+
+        store = MmapVectorStore(self.vector_store_path)
+        self.headword_index.rebuild(store.entries(), version=store.version)
+        self.lexical_index.rebuild(store.documents, version=store.version)
+        self.dictionary_version = store.version
+        print(f"✅ Словарь открыт через mmap: {len(store)} фрагментов ({store.header['dtype']})")
+        return store
+
+    def reload_dictionary(self) -> IndexUpdateReport:
+        """
+        Перечитывает PDF и инкрементально обновляет уже открытый индекс
+
+        Эмбеддинги считаются только для новых и измененных фрагментов, удаленные
+        фрагменты убираются из коллекции. Бот при этом не перезапускается.
+        """
+        if self.vectorstore is None:
+            self.load_dictionary()
+            return self.last_report
+
+        pdf_hash = self._compute_pdf_hash()
+        if pdf_hash == self.dictionary_version:
+            count = len(self.vectorstore.get(include=[])["ids"])
+            return IndexUpdateReport(unchanged=count)
+
+        entries, documents = self._build_documents(self._load_pages())
+        report = self._sync_index(documents)
+        settings_key = self._compute_settings_key()
+        self._write_index_meta(settings_key, pdf_hash)
+        # Файл для mmap пишется до смены версии индекса слов: поиск переоткрывает
+        # его, как только увидит новую версию
+        self._export_vector_store(settings_key, pdf_hash)
+        self._swap_indexes(entries, documents, pdf_hash)
+        self.last_report = report
+
+        print(f"✅ Словарь обновлен ({report})")
+        return report
+
     def get_vectorstore(self):
         """Возвращает векторное хранилище"""
         if self.vectorstore is None:
             self.load_dictionary()
         return self.vectorstore
+
+    def _load_pages(self) -> List["Document"]:
+        """Читает страницы PDF-словаря"""
+        from langchain_community.document_loaders import PyPDFLoader
+
+        loader = PyPDFLoader(config.DICTIONARY_PATH)
+        return loader.load()
+
+    def _build_documents(
+        self,
+        pages: List["Document"]
+    ) -> Tuple[List[DictionaryEntry], List["Document"]]:
+        """
+        Превращает страницы словаря в документы для индексации
+
+        Returns:
+            Tuple: (словарные статьи, документы: по одному на статью + чанки
+            остального текста)
+        """
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        entries, text_blocks = parse_dictionary(pages)
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.CHUNK_SIZE,
+            chunk_overlap=self.CHUNK_OVERLAP,
+            length_function=len,
+        )
+        documents = [entry.to_document() for entry in entries]
+        documents += text_splitter.split_documents(text_blocks)
+        return entries, documents
+
+    def _chunks_by_id(self, documents: List["Document"]) -> Dict[str, "Document"]:
+        """
+        Присваивает документам id по хэшу их содержимого
+
+        Одинаковое содержимое всегда получает одинаковый id, поэтому при
+        изменении PDF неизмененные статьи совпадают с уже проиндексированными.
+        Номер страницы в хэш не входит: перенос статьи на другую страницу не
+        требует новых эмбеддингов. Дубликаты схлопываются в один документ.
+        """
+        chunks = {}
+        for doc in documents:
+            metadata = {key: value for key, value in doc.metadata.items() if key != "page"}
+            payload = json.dumps([doc.page_content, metadata], sort_keys=True, ensure_ascii=False)
+            chunk_id = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+            chunks.setdefault(chunk_id, doc)
+        return chunks
+
+    def _sync_index(self, splits: List["Document"]) -> IndexUpdateReport:
+        """Добавляет новые фрагменты и удаляет исчезнувшие из PDF"""
+        chunks = self._chunks_by_id(splits)
+        existing_ids = set(self.vectorstore.get(include=[])["ids"])
+
+        new_ids = [chunk_id for chunk_id in chunks if chunk_id not in existing_ids]
+        removed_ids = sorted(existing_ids - chunks.keys())
+
+        # Сначала добавляем, потом удаляем — чтобы поиск не видел "дыр"
+        if new_ids:
+            self.vectorstore.add_documents(
+                [chunks[chunk_id] for chunk_id in new_ids],
+                ids=new_ids
+            )
+        if removed_ids:
+            self.vectorstore.delete(ids=removed_ids)
+
+        return IndexUpdateReport(
+            added=len(new_ids),
+            removed=len(removed_ids),
+            unchanged=len(chunks) - len(new_ids)
+        )
+
+    def _open_vectorstore(self):
+        """Открывает сохраненное на диске векторное хранилище"""
+        from langchain_community.vectorstores import Chroma
+
+        return Chroma(
+            collection_name=self.COLLECTION_NAME,
+            embedding_function=self.embeddings,
+            persist_directory=self.persist_directory
+        )
+
+    def _compute_pdf_hash(self) -> str:
+        """Хэш содержимого PDF-словаря (он же версия словаря)"""
+        digest = hashlib.sha256()
+        with open(config.DICTIONARY_PATH, "rb") as pdf_file:
+            for block in iter(lambda: pdf_file.read(65536), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _compute_settings_key(self) -> str:
+        """Ключ настроек: парсер, разбиение на чанки, модель эмбеддингов"""
+        settings = {
+            "collection": self.COLLECTION_NAME,
+            "parser": self.PARSER_VERSION,
+            "chunk_size": self.CHUNK_SIZE,
+            "chunk_overlap": self.CHUNK_OVERLAP,
+            "embedding_model": config.EMBEDDING_MODEL,
+        }
+        payload = json.dumps(settings, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def _vector_store_is_current(self, settings_key: str, pdf_hash: str) -> bool:
+        """Совпадают ли ключи файла для mmap с текущими"""
+        header = read_store_header(self.vector_store_path) or {}
+        return (
+            header.get("settings_key") == settings_key
+            and header.get("pdf_hash") == pdf_hash
+            and header.get("dtype") == self.vector_store_dtype
+        )
+
+    def _export_vector_store(self, settings_key: str, pdf_hash: str):
+        """Выгружает эмбеддинги из Chroma в файл для mmap (если он устарел)"""
+        import numpy as np
+        from langchain_core.documents import Document
+
+        if not self.vector_store_path or self._vector_store_is_current(settings_key, pdf_hash):
+            return
+
+        data = self.vectorstore.get(include=["embeddings", "documents", "metadatas"])
+        documents = [
+            Document(page_content=text, metadata=metadata or {})
+            for text, metadata in zip(data["documents"], data["metadatas"])
+        ]
+        write_vector_store(
+            self.vector_store_path,
+            documents,
+            np.asarray(data["embeddings"], dtype=np.float32),
+            dtype=self.vector_store_dtype,
+            keys={"settings_key": settings_key, "pdf_hash": pdf_hash}
+        )
+        print(f"💾 Эмбеддинги выгружены для mmap: {self.vector_store_path}")
+
+    @contextmanager
+    def _build_lock(self):
+        """Межпроцессная блокировка на время сборки индекса"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.vector_store_path)), exist_ok=True)
+        with open(self.vector_store_path + ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.persist_directory, self.INDEX_META_FILE)
+
+    def _read_index_meta(self) -> dict:
+        """Читает ключи сохраненного индекса (пустой dict, если индекса нет)"""
+        try:
+            with open(self._meta_path(), "r", encoding="utf-8") as meta_file:
+                return json.load(meta_file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index_meta(self, settings_key: str, pdf_hash: str):
+        """Атомарно записывает ключи индекса рядом с данными Chroma"""
+        tmp_path = self._meta_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as meta_file:
+            json.dump({"settings_key": settings_key, "pdf_hash": pdf_hash}, meta_file)
+        os.replace(tmp_path, self._meta_path())
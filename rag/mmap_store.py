@@ -0,0 +1,220 @@
+"""
+Компактное хранилище эмбеддингов словаря в одном файле для mmap
+"""
+import json
+import mmap
+import os
+import struct
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from rag.parser import DictionaryEntry
+
+if TYPE_CHECKING:
+    import numpy as np
+    from langchain_core.documents import Document
+
+# Формат файла:
+#   [0, HEADER_SIZE)   MAGIC, длина заголовка (uint32 LE), JSON-заголовок
+#   vectors_offset     матрица count × dim (float16 или int8), по строке на документ
+#   scales_offset      масштабы строк (float32, только для int8)
+#   metadata_offset    JSON: [[page_content, metadata], ...]
+# Секции выровнены по ALIGNMENT, поэтому матрица читается из mmap без копирования.
+MAGIC = b"ELVS"
+FORMAT_VERSION = 1
+HEADER_SIZE = 4096
+ALIGNMENT = 64
+DTYPES = ("float16", "int8")
+
+# Сколько строк матрицы переводить во float32 за раз при поиске
+SEARCH_BLOCK_ROWS = 512
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def quantize(matrix: "np.ndarray", dtype: str) -> tuple["np.ndarray", Optional["np.ndarray"]]:
+    """
+    Нормирует строки и квантует их
+
+    Returns:
+        Tuple: (квантованная матрица, масштабы строк для int8 или None)
+    """
+    import numpy as np
+
+    if dtype not in DTYPES:
+        raise ValueError(f"Неизвестный тип хранилища эмбеддингов: {dtype}")
+
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix = matrix / norms
+
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+
+    # int8: у каждой строки свой масштаб, максимум по модулю переходит в 127
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(matrix / scales[:, None]).clip(-127, 127).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def write_vector_store(
+    path: str,
+    documents: List["Document"],
+    matrix: "np.ndarray",
+    dtype: str = "float16",
+    keys: Optional[Dict[str, Any]] = None
+):
+    """
+    Атомарно записывает документы и эмбеддинги в файл хранилища
+
+    Args:
+        keys: ключи версии (ключ настроек, хэш PDF), по ним читатели решают,
+            актуален ли файл
+    """
+    import numpy as np
+
+    count = len(documents)
+    if count:
+        vectors, scales = quantize(np.asarray(matrix).reshape(count, -1), dtype)
+    else:
+        vectors, scales = np.zeros((0, 0), dtype=dtype), None
+
+    metadata = json.dumps(
+        [[doc.page_content, doc.metadata] for doc in documents],
+        ensure_ascii=False
+    ).encode("utf-8")
+
+    vectors_offset = HEADER_SIZE
+    scales_offset = _align(vectors_offset + vectors.nbytes)
+    metadata_offset = _align(scales_offset + (scales.nbytes if scales is not None else 0))
+
+    header = dict(keys or {})
+    header.update({
+        "format": FORMAT_VERSION,
+        "dtype": dtype,
+        "count": count,
+        "dim": int(vectors.shape[1]),
+        "vectors_offset": vectors_offset,
+        "scales_offset": scales_offset if scales is not None else None,
+        "metadata_offset": metadata_offset,
+        "metadata_length": len(metadata),
+    })
+    header_bytes = json.dumps(header, sort_keys=True).encode("utf-8")
+    if len(header_bytes) + 8 > HEADER_SIZE:
+        raise ValueError("Заголовок хранилища эмбеддингов слишком большой")
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as store_file:
+        store_file.write(MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+        store_file.seek(vectors_offset)
+        store_file.write(vectors.tobytes())
+        if scales is not None:
+            store_file.seek(scales_offset)
+            store_file.write(scales.tobytes())
+        store_file.seek(metadata_offset)
+        store_file.write(metadata)
+        store_file.flush()
+        os.fsync(store_file.fileno())
+    # Уже открытые читателями mmap продолжают видеть старый файл до переоткрытия
+    os.replace(tmp_path, path)
+
+
+def read_store_header(path: str) -> Optional[Dict[str, Any]]:
+    """Читает только заголовок файла (None, если файла нет или он поврежден)"""
+    try:
+        with open(path, "rb") as store_file:
+            prefix = store_file.read(8)
+            if len(prefix) != 8 or prefix[:4] != MAGIC:
+                return None
+            (length,) = struct.unpack("<I", prefix[4:])
+            header = json.loads(store_file.read(length).decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+    if header.get("format") != FORMAT_VERSION:
+        return None
+    return header
+
+
+class MmapVectorStore:
+    """
+    Хранилище, открытое через mmap только на чтение
+
+    Матрица эмбеддингов — представление numpy поверх mmap без копирования:
+    все процессы, открывшие один файл, делят одни и те же страницы page cache.
+    В памяти процесса остаются только документы (тексты и метаданные).
+    """
+
+    def __init__(self, path: str):
+        import numpy as np
+        from langchain_core.documents import Document
+
+        self.path = path
+        self.header = read_store_header(path)
+        if self.header is None:
+            raise ValueError(f"Файл хранилища эмбеддингов не найден или поврежден: {path}")
+
+        with open(path, "rb") as store_file:
+            self._mmap = mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        count, dim = self.header["count"], self.header["dim"]
+        self.vectors = np.frombuffer(
+            self._mmap,
+            dtype=np.dtype(self.header["dtype"]),
+            count=count * dim,
+            offset=self.header["vectors_offset"]
+        ).reshape(count, dim)
+
+        self.scales = None
+        if self.header["scales_offset"] is not None:
+            self.scales = np.frombuffer(
+                self._mmap, dtype=np.float32, count=count, offset=self.header["scales_offset"]
+            )
+
+        start = self.header["metadata_offset"]
+        raw = self._mmap[start:start + self.header["metadata_length"]]
+        self.documents = [
+            Document(page_content=text, metadata=metadata or {})
+            for text, metadata in json.loads(raw.decode("utf-8"))
+        ]
+
+    def __len__(self) -> int:
+        return self.header["count"]
+
+    @property
+    def version(self) -> Optional[str]:
+        """Версия словаря (хэш PDF), из которой построен файл"""
+        return self.header.get("pdf_hash")
+
+    def entries(self) -> List[DictionaryEntry]:
+        """Словарные статьи (для точного индекса слов без разбора PDF)"""
+        return [
+            DictionaryEntry.from_metadata(doc.metadata)
+            for doc in self.documents
+            if "headword" in doc.metadata
+        ]
+
+    def similarities(self, queries: "np.ndarray") -> "np.ndarray":
+        """
+        Косинусная близость нормированных запросов ко всем документам
+
+        Матрица переводится во float32 блоками, чтобы не держать в памяти
+        процесса полную распакованную копию.
+        """
+        import numpy as np
+
+        count = len(self)
+        result = np.empty((queries.shape[0], count), dtype=np.float32)
+        for start in range(0, count, SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, count)
+            block = self.vectors[start:end].astype(np.float32)
+            dots = queries @ block.T
+            if self.scales is not None:
+                dots *= self.scales[start:end]
+            result[:, start:end] = dots
+        return result
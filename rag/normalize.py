@@ -0,0 +1,62 @@
+"""
+Нормализация текста запросов и словарных статей
+"""
+import re
+
+
+# Окончания русских слов, которые отбрасываются при упрощенном стемминге.
+# Порядок важен: сначала более длинные окончания.
+RUSSIAN_ENDINGS = (
+    "ьями", "иями", "ями", "ами", "ьев", "ого", "его", "ому", "ему", "ыми", "ими",
+    "ья", "ье", "ьи", "ью", "ов", "ев", "ей", "ий", "ый", "ой", "ая", "яя",
+    "ое", "ее", "ые", "ие", "ом", "ем", "ам", "ям", "ах", "ях", "ую", "юю",
+    "ть", "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+)
+MIN_STEM_LENGTH = 3
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s'-]+")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def is_cyrillic(text: str) -> bool:
+    """Есть ли в тексте кириллица"""
+    return any('\u0400' <= char <= '\u04FF' for char in text)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Приводит текст к каноническому виду
+
+    Нижний регистр, ё → е, без знаков препинания и лишних пробелов.
+    """
+    text = text.lower().replace("ё", "е")
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return _SPACES_RE.sub(" ", text).strip(" -'")
+
+
+def stem_russian(word: str) -> str:
+    """Отбрасывает типичное окончание русского слова (очень упрощенно)"""
+    if not is_cyrillic(word):
+        return word
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def lookup_key(text: str) -> str:
+    """
+    Ключ для поиска по словарю: нормализация + стемминг каждого слова
+
+    Стемминг грубый и склеивает разные слова ("другой" и "друг" → "друг"),
+    поэтому ключ годится только для поиска фрагментов и ранжирования (их
+    результат проверяет LLM). Для ответов без модели — exact_key.
+    """
+    words = normalize_text(text).split(" ")
+    return " ".join(stem_russian(word) for word in words if word)
+
+
+
+def exact_key(text: str) -> str:
+    """Ключ точного совпадения (без стемминга) — для ответов в обход LLM"""
+    return normalize_text(text)
@@ -0,0 +1,138 @@
+"""
+Разбор PDF-словаря Elenya на словарные статьи
+"""
+import re
+from dataclasses import dataclass, asdict
+from typing import TYPE_CHECKING, List, Tuple
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+
+# Строка словаря: "elen - звезда (сущ.)"
+ENTRY_LINE_RE = re.compile(r"^(?P<headword>[^•:]+?)\s+-\s+(?P<translation>.+)$")
+# Пометка в скобках в конце перевода: "(сущ.)", "(досл. ...)"
+TRAILING_NOTE_RE = re.compile(r"\s*\((?P<note>[^()]*)\)[\s.]*$")
+
+# Сокращения частей речи, которые встречаются в пометках
+PARTS_OF_SPEECH = {"сущ.", "гл.", "прил.", "нареч.", "мест.", "предл.", "част.", "межд.", "числ."}
+# Часть речи по умолчанию для разделов словаря
+SECTION_PARTS_OF_SPEECH = {"глагол": "гл.", "прилагательн": "прил."}
+# Подзаголовки, после которых идут фразы, а не отдельные слова
+PHRASE_HEADERS = {"фразы", "готовые фразы", "примеры"}
+
+
+@dataclass
+class DictionaryEntry:
+    """Словарная статья"""
+    headword: str
+    translation: str
+    part_of_speech: str = ""
+    notes: str = ""
+    section: str = ""
+    kind: str = "word"  # "word" или "phrase"
+    page: int = 0
+
+    def to_text(self) -> str:
+        """Компактная строка статьи для поиска и контекста LLM"""
+        text = f"{self.headword} - {self.translation}"
+        details = "; ".join(part for part in (self.part_of_speech, self.notes) if part)
+        if details:
+            text += f" ({details})"
+        return text
+
+    def to_document(self) -> "Document":
+        """Одна статья — один документ векторной базы, поля — в метаданных"""
+        from langchain_core.documents import Document
+
+        return Document(page_content=self.to_text(), metadata=asdict(self))
+
+    @classmethod
+    def from_metadata(cls, metadata: dict) -> "DictionaryEntry":
+        """Восстанавливает статью из метаданных документа"""
+        fields = {name: metadata[name] for name in cls.__dataclass_fields__ if name in metadata}
+        return cls(**fields)
+
+
+def parse_dictionary(pages: List["Document"]) -> Tuple[List[DictionaryEntry], List["Document"]]:
+    """
+    Разбирает страницы словаря
+
+    Returns:
+        Tuple: (словарные статьи, документы с остальным текстом — грамматика,
+        диалоги — по одному на раздел)
+    """
+    from langchain_core.documents import Document
+
+    entries = []
+    text_blocks = []
+
+    for page_number, page in enumerate(pages):
+        section = ""
+        kind = "word"
+        other_lines = []
+
+        for line in page.page_content.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+
+            # Первая строка страницы — название раздела
+            if not section:
+                section = line
+                other_lines.append(line)
+                continue
+
+            if line.lower() in PHRASE_HEADERS:
+                kind = "phrase"
+                continue
+
+            match = ENTRY_LINE_RE.match(line)
+            if not match:
+                other_lines.append(line)
+                continue
+
+            entries.append(_parse_entry(match, section, kind, page_number))
+
+        # Заголовок без содержимого в отдельный документ не выносим
+        if len(other_lines) > 1:
+            text_blocks.append(Document(
+                page_content="\n".join(other_lines),
+                metadata={"section": section, "kind": "text", "page": page_number}
+            ))
+
+    return entries, text_blocks
+
+
+def _parse_entry(match: re.Match, section: str, kind: str, page: int) -> DictionaryEntry:
+    """Строит статью из строки "слово - перевод (пометки)" """
+    translation = match.group("translation").strip()
+    part_of_speech = ""
+    notes = []
+
+    # Снимаем пометки в скобках с конца перевода
+    note_match = TRAILING_NOTE_RE.search(translation)
+    while note_match:
+        note = note_match.group("note").strip()
+        if note in PARTS_OF_SPEECH:
+            part_of_speech = note
+        else:
+            notes.insert(0, note)
+        translation = translation[:note_match.start()]
+        note_match = TRAILING_NOTE_RE.search(translation)
+
+    if not part_of_speech and kind == "word":
+        for marker, default in SECTION_PARTS_OF_SPEECH.items():
+            if marker in section.lower():
+                part_of_speech = default
+                break
+
+    return DictionaryEntry(
+        headword=match.group("headword").strip(),
+        translation=translation.strip(),
+        part_of_speech=part_of_speech,
+        notes="; ".join(notes),
+        section=section,
+        kind=kind,
+        page=page,
+    )
@@ -2,47 +2,279 @@
 Поиск в словаре Elenya через RAG
 """
 from typing import Optional, List
+import config
+from rag.backends import ChromaBackend, SearchResults
+from rag.embedding_cache import EmbeddingCache
+from rag.headwords import HeadwordIndex
+from rag.lexical import LexicalIndex, LexicalMatch
+from rag.parser import DictionaryEntry
+from services.concurrency import openai_limiter
+from services.metrics import metrics
 
 
 class DictionaryQuery:
     """Поиск слов и фраз в словаре"""
     
-    def __init__(self, vectorstore):
+    # Порог расстояния векторного поиска: дальше — нерелевантно
+    VECTOR_MAX_DISTANCE = 1.5
+    # Константа Reciprocal Rank Fusion: score = Σ 1 / (RRF_K + место в списке)
+    RRF_K = 60
+    
+    def __init__(
+        self,
+        vectorstore,
+        headword_index: Optional[HeadwordIndex] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        backend=None,
+        embeddings=None,
+        lexical_index: Optional[LexicalIndex] = None
+    ):
         self.vectorstore = vectorstore
+        self.headword_index = headword_index
+        self.embedding_cache = embedding_cache
+        # Бэкенд векторного поиска (ChromaBackend, NumpyBackend, MmapBackend); по умолчанию — Chroma
+        self.backend = backend or ChromaBackend(vectorstore)
+        # Модель эмбеддингов запросов; без Chroma (mmap) ее передают явно
+        self.embeddings = embeddings or vectorstore.embeddings
+        self.lexical_index = lexical_index
         
-    def search(self, query: str, k: int = 3) -> tuple[List[str], bool]:
+    def search(
+        self,
+        query: str,
+        k: int = 3,
+        embedding: Optional[List[float]] = None
+    ) -> tuple[List[str], bool]:
         """
         Ищет информацию по запросу в словаре
         
+        Сначала проверяется точный индекс слов, затем лексический (BM25):
+        оба без сетевых запросов. Если лексическое совпадение сильное,
+        эмбеддинг не считается; иначе результаты BM25 и векторного поиска
+        объединяются через Reciprocal Rank Fusion.
+        
         Args:
             query: Поисковый запрос (слово или фраза)
             k: Количество результатов
+            embedding: Уже посчитанный эмбеддинг запроса (чтобы не считать повторно)
             
         Returns:
             Tuple: (список найденных фрагментов, флаг "найдено в словаре")
         """
+        # Точное совпадение со словарной статьей
+        exact_matches = self.lookup_headwords(query)
+        if exact_matches:
+            return [entry.to_text() for entry in exact_matches[:k]], True
+        
+        lexical = self.search_lexical(query, k)
+        if self._is_strong(lexical):
+            return self._fuse([], lexical, k)
+        
         # Поиск по векторной базе
-        results = self.vectorstore.similarity_search_with_score(query, k=k)
+        if embedding is None:
+            embedding = self.embed_query(query)
+        return self._fuse(self._search_by_vector(embedding, k), lexical, k)
+    
+    async def asearch(
+        self,
+        query: str,
+        k: int = 3,
+        embedding: Optional[List[float]] = None
+    ) -> tuple[List[str], bool]:
+        """
+        Асинхронный вариант search: эмбеддинг запроса считается без блокировки event loop
+        
+        Args:
+            query: Поисковый запрос (слово или фраза)
+            k: Количество результатов
+            embedding: Уже посчитанный эмбеддинг запроса (чтобы не считать повторно)
+            
+        Returns:
+            Tuple: (список найденных фрагментов, флаг "найдено в словаре")
+        """
+        exact_matches = self.lookup_headwords(query)
+        if exact_matches:
+            return [entry.to_text() for entry in exact_matches[:k]], True
+        
+        lexical = self.search_lexical(query, k)
+        if self._is_strong(lexical):
+            return self._fuse([], lexical, k)
+        
+        if embedding is None:
+            embedding = await self.aembed_query(query)
+        return self._fuse(self._search_by_vector(embedding, k), lexical, k)
+    
+    def embed_query(self, query: str) -> List[float]:
+        """Эмбеддинг запроса: из кэша или через API эмбеддингов"""
+        if self.embedding_cache is not None:
+            cached = self.embedding_cache.get(query)
+            if cached is not None:
+                return cached
+        
+        with metrics.timer("embedding"):
+            embedding = self.embeddings.embed_query(query)
+        if self.embedding_cache is not None:
+            self.embedding_cache.set(query, embedding)
+        return embedding
+    
+    async def aembed_query(self, query: str) -> List[float]:
+        """Асинхронный эмбеддинг запроса: из кэша или через API эмбеддингов"""
+        if self.embedding_cache is not None:
+            cached = await self.embedding_cache.aget(query)
+            if cached is not None:
+                return cached
         
-        # Проверяем, есть ли релевантные результаты
-        # Если score слишком большой (> 1.5), считаем что результат не релевантен
-        relevant_results = []
-        found_in_dictionary = False
+        async with openai_limiter.slot():
+            with metrics.timer("embedding"):
+                embedding = await self.embeddings.aembed_query(query)
+        if self.embedding_cache is not None:
+            self.embedding_cache.set(query, embedding)
+        return embedding
+    
+    def prefetch_embeddings(self, queries: List[str]) -> int:
+        """
+        Заранее считает эмбеддинги запросов одним пакетным вызовом API
         
-        for doc, score in results:
-            if score < 1.5:  # порог релевантности
-                relevant_results.append(doc.page_content)
-                found_in_dictionary = True
+        Returns:
+            Сколько эмбеддингов было посчитано (уже закэшированные пропускаются)
+        """
+        if self.embedding_cache is None:
+            return 0
+        missing = self.embedding_cache.missing(queries)
+        if not missing:
+            return 0
         
-        return relevant_results, found_in_dictionary
+        embeddings = self.embeddings.embed_documents(missing)
+        for query, embedding in zip(missing, embeddings):
+            self.embedding_cache.set(query, embedding)
+        return len(missing)
+    
+    async def aprefetch_embeddings(self, queries: List[str]) -> int:
+        """Асинхронный вариант prefetch_embeddings"""
+        if self.embedding_cache is None:
+            return 0
+        missing = await self.embedding_cache.amissing(queries)
+        if not missing:
+            return 0
+        
+        async with openai_limiter.slot():
+            embeddings = await self.embeddings.aembed_documents(missing)
+        for query, embedding in zip(missing, embeddings):
+            self.embedding_cache.set(query, embedding)
+        return len(missing)
+    
+    def search_batch(self, queries: List[str], k: int = 3) -> List[tuple[List[str], bool]]:
+        """
+        Ищет несколько запросов сразу
+        
+        Эмбеддинги недостающих запросов считаются одним пакетным вызовом (если
+        включен кэш эмбеддингов), векторный поиск — одним вызовом бэкенда.
+        """
+        results: List[Optional[tuple[List[str], bool]]] = [None] * len(queries)
+        lexical = {}
+        pending = []
+        for position, query in enumerate(queries):
+            exact_matches = self.lookup_headwords(query)
+            if exact_matches:
+                results[position] = ([entry.to_text() for entry in exact_matches[:k]], True)
+                continue
+            lexical[position] = self.search_lexical(query, k)
+            if self._is_strong(lexical[position]):
+                results[position] = self._fuse([], lexical[position], k)
+            else:
+                pending.append(position)
+        
+        if pending:
+            self.prefetch_embeddings([queries[position] for position in pending])
+            embeddings = [self.embed_query(queries[position]) for position in pending]
+            self.backend.refresh(self.version)
+            with metrics.timer("vector_search", backend=self.backend.name):
+                batch = self.backend.search_batch(embeddings, k)
+            for position, scored in zip(pending, batch):
+                results[position] = self._fuse(scored, lexical[position], k)
+        
+        return results
+    
+    def search_lexical(self, query: str, k: int = 3) -> List[LexicalMatch]:
+        """Лексический поиск (BM25); пустой список, если индекса нет"""
+        if self.lexical_index is None:
+            return []
+        with metrics.timer("lexical_search"):
+            return self.lexical_index.search(query, k)
+    
+    def resolves_locally(self, query: str) -> bool:
+        """Найдется ли запрос без эмбеддинга (точное или сильное лексическое совпадение)"""
+        return bool(self.lookup_headwords(query)) or self._is_strong(self.search_lexical(query, 1))
+    
+    def _search_by_vector(self, embedding: List[float], k: int) -> SearchResults:
+        """Поиск по готовому эмбеддингу запроса (локально, без сети)"""
+        self.backend.refresh(self.version)
+        with metrics.timer("vector_search", backend=self.backend.name):
+            return self.backend.search(embedding, k)
+    
+    @staticmethod
+    def _is_strong(lexical: List[LexicalMatch]) -> bool:
+        return bool(lexical) and lexical[0].relevance >= config.LEXICAL_STRONG_RELEVANCE
+    
+    def _fuse(
+        self,
+        vector_results: SearchResults,
+        lexical: List[LexicalMatch],
+        k: int
+    ) -> tuple[List[str], bool]:
+        """
+        Объединяет векторные и лексические результаты (Reciprocal Rank Fusion)
+        
+        Порядок — по сумме 1 / (RRF_K + место) в обоих списках. Фрагмент
+        считается релевантным, если он достаточно близок по вектору (расстояние
+        < VECTOR_MAX_DISTANCE) или по BM25 (доля запроса ≥ LEXICAL_MIN_RELEVANCE).
+        """
+        fused = {}
+        relevant = set()
+        for rank, (doc, score) in enumerate(vector_results):
+            fused[doc.page_content] = fused.get(doc.page_content, 0.0) + 1 / (self.RRF_K + rank + 1)
+            if score < self.VECTOR_MAX_DISTANCE:
+                relevant.add(doc.page_content)
+        for rank, match in enumerate(lexical):
+            text = match.document.page_content
+            fused[text] = fused.get(text, 0.0) + 1 / (self.RRF_K + rank + 1)
+            if match.relevance >= config.LEXICAL_MIN_RELEVANCE:
+                relevant.add(text)
+        
+        ranked = sorted(fused, key=fused.get, reverse=True)
+        relevant_results = [text for text in ranked if text in relevant][:k]
+        return relevant_results, bool(relevant_results)
+    
+    @property
+    def version(self) -> str:
+        """Версия словаря (хэш PDF); меняется после /reload"""
+        if self.headword_index is None:
+            return ""
+        return self.headword_index.version or ""
+    
+    def lookup_headwords(self, query: str) -> List[DictionaryEntry]:
+        """Словарные статьи, совпавшие с запросом по основе слов (контекст для LLM)"""
+        if self.headword_index is None:
+            return []
+        return self.headword_index.lookup(query)
+    
+    def lookup_exact(self, query: str) -> List[DictionaryEntry]:
+        """
+        Словарные статьи, дословно совпавшие с запросом (без стемминга)
+        
+        Только для ответов без LLM: совпадение по основе ("другой" → "друг")
+        здесь не считается.
+        """
+        if self.headword_index is None:
+            return []
+        return self.headword_index.lookup_exact(query)
     
     def format_context(self, results: List[str]) -> str:
         """Форматирует найденные результаты в контекст для LLM"""
         if not results:
             return ""
         
+        # Статьи короткие — по одной на строку, без пустых строк между ними
         context = "Информация из словаря Elenya:\n\n"
-        for i, result in enumerate(results, 1):
-            context += f"{result}\n\n"
+        context += "\n".join(results)
         
         return context
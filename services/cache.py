@@ -0,0 +1,202 @@
+"""
+Кэш ответов: LRU в памяти с TTL и необязательным слоем в SQLite
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+
+class ResponseCache:
+    """
+    Ограниченный LRU-кэш с временем жизни записей
+
+    Значения — любые JSON-сериализуемые объекты. Если задан db_path, записи
+    дублируются в SQLite и переживают перезапуск: промах в памяти проверяется
+    на диске, найденная запись поднимается обратно в память. Диск — под
+    отдельной блокировкой (чтение памяти его не ждет), WAL с
+    synchronous=NORMAL: запись не делает fsync на каждый commit.
+
+    Запись на диск отложенная (write-behind): set() только ставит ее в
+    очередь одного фонового потока. Из асинхронного кода чтение — aget():
+    попадание в память отдается сразу, SQLite читается в отдельном потоке,
+    так что event loop диск не ждет.
+    """
+
+    # Как часто (в записях) чистить просроченные строки на диске
+    PRUNE_EVERY = 500
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        db_path: Optional[str] = None,
+        table: str = "responses"
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.table = table
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._writes = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if db_path:
+            self._open_db(db_path)
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Стабильный ключ из частей (текст, режим, контекст, версия...)"""
+        payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Возвращает значение или None, если записи нет или она просрочена"""
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None:
+            return value
+        return self._disk_result(key, self._db_get(key, now))
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """Асинхронный get: SQLite читается в отдельном потоке"""
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None:
+            return value
+        if self._db is None:
+            return self._disk_result(key, None)
+        return self._disk_result(key, await asyncio.to_thread(self._db_get, key, now))
+
+    def set(self, key: str, value: Any):
+        """Сохраняет значение в памяти и (если включено) ставит запись на диск в очередь"""
+        if self.max_size <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+        if self._writer is not None:
+            self._writer.submit(self._db_set, key, expires_at, value)
+
+    def flush(self):
+        """Дожидается записи на диск всего, что уже сохранено через set()"""
+        if self._writer is not None:
+            self._writer.submit(lambda: None).result()
+
+    def clear(self):
+        """Очищает кэш целиком (память и диск)"""
+        with self._lock:
+            self._entries.clear()
+        if self._writer is not None:
+            self._writer.submit(self._db_clear).result()
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий и промахов"""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def _memory_get(self, key: str, now: float) -> Optional[Any]:
+        """Значение из памяти (просроченная запись удаляется)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            return None
+
+    def _disk_result(self, key: str, row: Optional[tuple[float, Any]]) -> Optional[Any]:
+        """Итог поиска после промаха в памяти: найденное на диске поднимается в память"""
+        with self._lock:
+            if row is not None:
+                expires_at, value = row
+                self._remember(key, expires_at, value)
+                self.disk_hits += 1
+                return value
+
+            self.misses += 1
+            return None
+
+    def _remember(self, key: str, expires_at: float, value: Any):
+        """Кладет запись в память, вытесняя самые давние"""
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _open_db(self, db_path: str):
+        """Открывает (и при необходимости создает) SQLite-хранилище"""
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # В режиме WAL fsync только при checkpoint: при сбое питания можно
+        # потерять последние записи кэша, но не повредить базу
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} "
+            "(key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL)"
+        )
+        self._db.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+        self._db.commit()
+        # Один поток записи: записи ложатся на диск в порядке set()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"cache-{self.table}")
+
+    def _db_get(self, key: str, now: float) -> Optional[tuple[float, Any]]:
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute(
+                f"SELECT expires_at, value FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[0] <= now:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _db_set(self, key: str, expires_at: float, value: Any):
+        """Запись на диск (в потоке записи); ошибка не теряет запись в памяти"""
+        payload = json.dumps(value, ensure_ascii=False)
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, expires_at, value) VALUES (?, ?, ?)",
+                    (key, expires_at, payload)
+                )
+                self._writes += 1
+                if self._writes % self.PRUNE_EVERY == 0:
+                    self._db.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (expires_at - self.ttl,))
+                self._db.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️  Кэш {self.table}: ошибка записи на диск: {e}")
+
+    def _db_clear(self):
+        with self._db_lock:
+            self._db.execute(f"DELETE FROM {self.table}")
+            self._db.commit()
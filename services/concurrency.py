@@ -0,0 +1,160 @@
+"""
+Конкурентная обработка апдейтов и ограничение параллельных запросов к OpenAI
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Dict, Optional
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+import config
+from services.metrics import STAGE_SECONDS, metrics
+
+
+class WaitStats:
+    """Счетчики очереди: глубина, число обработанных, время ожидания"""
+
+    def __init__(self):
+        self.waiting = 0
+        self.active = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, wait: float):
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> Dict[str, float]:
+        started = self.completed + self.active
+        return {
+            "waiting": self.waiting,
+            "active": self.active,
+            "completed": self.completed,
+            "avg_wait": self.total_wait / started if started else 0.0,
+            "max_wait": self.max_wait,
+        }
+
+
+class ConcurrencyLimiter:
+    """Глобальный семафор на одновременные запросы к внешнему API"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit)
+        self._stats = WaitStats()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Занимает слот на время запроса (ждет, если все слоты заняты)"""
+        started = time.perf_counter()
+        self._stats.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._stats.waiting -= 1
+        wait = time.perf_counter() - started
+        self._stats.record_wait(wait)
+        metrics.observe(STAGE_SECONDS, wait, stage="openai_queue")
+
+        self._stats.active += 1
+        try:
+            yield
+        finally:
+            self._stats.active -= 1
+            self._stats.completed += 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, float]:
+        """Текущая глубина очереди и время ожидания слота"""
+        return self._stats.snapshot()
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Параллельная обработка апдейтов разных чатов
+
+    Апдейты одного чата выполняются строго по очереди (через asyncio.Lock на
+    чат, у которого FIFO-очередь ожидающих), а общее число одновременно
+    выполняемых апдейтов ограничено max_concurrent_updates.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        # Семафор базового класса захватывается ДО блокировки чата, поэтому
+        # апдейты, ждущие свой чат, занимали бы общие слоты. Делаем его
+        # фактически безлимитным и ограничиваем параллелизм сами — уже после
+        # того, как подошла очередь чата.
+        super().__init__(max_concurrent_updates=2 ** 31 - 1)
+        self.concurrency_limit = max_concurrent_updates
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+        self._chat_pending: Dict[int, int] = {}
+        self._stats = WaitStats()
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """Ждет очереди своего чата и свободного слота, затем обрабатывает апдейт"""
+        chat_id = self._chat_id(update)
+        started = time.perf_counter()
+        self._stats.waiting += 1
+        acquired = False
+
+        try:
+            async with self._chat_lock(chat_id):
+                await self._slots.acquire()
+                acquired = True
+                self._stats.waiting -= 1
+                self._stats.record_wait(time.perf_counter() - started)
+                self._stats.active += 1
+                try:
+                    await coroutine
+                finally:
+                    self._stats.active -= 1
+                    self._stats.completed += 1
+                    self._slots.release()
+        finally:
+            if not acquired:
+                self._stats.waiting -= 1
+                # Корутина так и не была запущена (отмена при остановке) —
+                # закрываем ее, чтобы не было предупреждения "never awaited"
+                if asyncio.iscoroutine(coroutine):
+                    coroutine.close()
+
+    async def initialize(self) -> None:
+        """Ресурсы не требуются"""
+
+    async def shutdown(self) -> None:
+        """Ресурсы не требуются"""
+
+    def stats(self) -> Dict[str, float]:
+        """Глубина очереди апдейтов и время ожидания обработки"""
+        stats = self._stats.snapshot()
+        stats["chats"] = len(self._chat_locks)
+        return stats
+
+    @asynccontextmanager
+    async def _chat_lock(self, chat_id: Optional[int]):
+        """Блокировка чата; удаляется, когда у чата не осталось апдейтов"""
+        if chat_id is None:
+            yield
+            return
+
+        lock = self._chat_locks.setdefault(chat_id, asyncio.Lock())
+        self._chat_pending[chat_id] = self._chat_pending.get(chat_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._chat_pending[chat_id] -= 1
+            if not self._chat_pending[chat_id]:
+                del self._chat_pending[chat_id]
+                del self._chat_locks[chat_id]
+
+    @staticmethod
+    def _chat_id(update: object) -> Optional[int]:
+        if isinstance(update, Update) and update.effective_chat:
+            return update.effective_chat.id
+        return None
+
+
+# Общий лимит одновременных запросов к OpenAI для всех сервисов
+openai_limiter = ConcurrencyLimiter(config.OPENAI_MAX_CONCURRENCY)
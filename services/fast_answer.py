@@ -0,0 +1,59 @@
+"""
+Ответ по шаблону прямо из словарной статьи, без запроса к LLM
+"""
+from typing import List, Optional
+from rag.parser import DictionaryEntry
+
+
+# Полные названия частей речи для строки "Пояснение"
+PART_OF_SPEECH_NAMES = {
+    "сущ.": "существительное",
+    "гл.": "глагол",
+    "прил.": "прилагательное",
+    "нареч.": "наречие",
+    "мест.": "местоимение",
+    "предл.": "предлог",
+    "част.": "частица",
+    "межд.": "междометие",
+    "числ.": "числительное",
+}
+
+
+def render_entries(entries: List[DictionaryEntry]) -> Optional[str]:
+    """
+    Ответ в формате системного промпта ("Elenya: / Перевод: / Пояснение:")
+
+    Шаблон подходит только для отдельных слов: если среди статей нет слов
+    (только фразы или ничего), возвращается None, и ответ по-прежнему
+    формирует LLM. Фразы, совпавшие вместе со словом ("Mera-dor." рядом с
+    "mera-dor"), пропускаются; несколько значений слова выводятся отдельными
+    блоками.
+    """
+    words = [entry for entry in entries if entry.kind == "word"]
+    if not words:
+        return None
+    return "\n\n".join(render_entry(entry) for entry in words)
+
+
+def render_entry(entry: DictionaryEntry) -> str:
+    """Блок ответа для одной словарной статьи"""
+    return (
+        f"Elenya: {entry.headword}\n"
+        f"Перевод: {entry.translation}\n"
+        f"Пояснение: {_explanation(entry)}"
+    )
+
+
+def _explanation(entry: DictionaryEntry) -> str:
+    parts = []
+    if entry.part_of_speech:
+        parts.append(PART_OF_SPEECH_NAMES.get(entry.part_of_speech, entry.part_of_speech))
+    if entry.notes:
+        parts.append(entry.notes)
+    if entry.section:
+        parts.append(f"раздел словаря «{entry.section}»")
+    if not parts:
+        return "Слово из словаря Elenya."
+
+    sentences = [part.rstrip(". ") for part in parts]
+    return ". ".join(sentence[:1].upper() + sentence[1:] for sentence in sentences) + "."
@@ -0,0 +1,148 @@
+"""
+Кэш результатов распознавания голоса и изображений
+"""
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+from services.cache import ResponseCache
+from services.singleflight import singleflight
+from utils.image_prep import perceptual_hash
+
+
+class MediaCache:
+    """
+    Кэш "медиафайл → результат Whisper / Vision"
+
+    Ищет результат в два шага:
+    1. по file_unique_id из Telegram — до скачивания файла (пересланные
+       сообщения сохраняют идентификатор);
+    2. по содержимому — после скачивания, но до запроса к API: для
+       изображений перцептивный хэш (совпадает с точностью до
+       IMAGE_HASH_DISTANCE бит — пересжатие меняет один-два бита), для
+       голоса sha256.
+
+    Одновременные запросы с одним file_unique_id (тот же файл переслали
+    несколько раз подряд) объединяются: файл скачивается и распознается один
+    раз. Записи хранятся в ResponseCache (LRU + TTL, опционально SQLite);
+    пустые результаты не кэшируются. Поиск близких хэшей — только по
+    изображениям из памяти, с диска находятся точные совпадения.
+    """
+
+    # Максимальное расстояние Хэмминга между dHash одной картинки
+    IMAGE_HASH_DISTANCE = 4
+
+    def __init__(self, max_size: int, ttl: float, db_path: Optional[str] = None):
+        self.max_size = max_size
+        self._cache = ResponseCache(max_size=max_size, ttl=ttl, db_path=db_path, table="media")
+        # dHash недавних изображений для поиска близких (перебором)
+        self._image_hashes: "OrderedDict[int, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.id_hits = 0
+        self.content_hits = 0
+        self.misses = 0
+
+    async def resolve(
+        self,
+        kind: str,
+        file_id: str,
+        download: Callable[[], Awaitable[bytes]],
+        compute: Callable[[bytes], Awaitable[Optional[str]]]
+    ) -> Optional[str]:
+        """
+        Результат для медиафайла: из кэша или через download() и compute(data)
+
+        Args:
+            kind: Тип файла ("voice" или "image")
+            file_id: file_unique_id из Telegram
+            download: Скачивает файл (вызывается только при промахе по file_id)
+            compute: Запрос к Whisper / Vision по содержимому файла (None или
+                пустой результат не кэшируется)
+        """
+        id_key = self._cache.make_key(kind, "id", file_id)
+        value = await self._cache.aget(id_key)
+        if value is not None:
+            self.id_hits += 1
+            return value
+
+        return await singleflight.do(
+            ("media", kind, file_id), lambda: self._fetch(kind, id_key, download, compute)
+        )
+
+    async def _fetch(
+        self,
+        kind: str,
+        id_key: str,
+        download: Callable[[], Awaitable[bytes]],
+        compute: Callable[[bytes], Awaitable[Optional[str]]]
+    ) -> Optional[str]:
+        """Скачивание, поиск по содержимому и запрос к API (выполняет ведущий)"""
+        data = await download()
+        if self.max_size <= 0:
+            # Кэш выключен: хэш содержимого некуда запоминать
+            self.misses += 1
+            return await compute(data)
+
+        # dHash декодирует изображение (Pillow) — в отдельном потоке, не в event loop
+        fingerprint = await asyncio.to_thread(self.fingerprint, kind, data)
+        value = await self._cache.aget(self._content_key(kind, self._nearest(fingerprint)))
+        if value is not None:
+            self.content_hits += 1
+            self._cache.set(id_key, value)
+            return value
+
+        self.misses += 1
+        value = await compute(data)
+        if value:
+            self._cache.set(id_key, value)
+            self._cache.set(self._content_key(kind, fingerprint), value)
+            self._remember(fingerprint)
+        return value
+
+    @staticmethod
+    def fingerprint(kind: str, data: bytes) -> str:
+        """Ключ по содержимому: перцептивный хэш изображения или sha256"""
+        if kind == "image":
+            image_hash = perceptual_hash(data)
+            if image_hash is not None:
+                return f"dhash:{image_hash}"
+        return f"sha256:{hashlib.sha256(data).hexdigest()}"
+
+    def _content_key(self, kind: str, fingerprint: str) -> str:
+        return self._cache.make_key(kind, "content", fingerprint)
+
+    def _nearest(self, fingerprint: str) -> str:
+        """Самый близкий из запомненных dHash (или сам fingerprint)"""
+        if not fingerprint.startswith("dhash:"):
+            return fingerprint
+        target = int(fingerprint[len("dhash:"):], 16)
+        with self._lock:
+            best, best_distance = target, self.IMAGE_HASH_DISTANCE + 1
+            for image_hash in self._image_hashes:
+                distance = bin(image_hash ^ target).count("1")
+                if distance < best_distance:
+                    best, best_distance = image_hash, distance
+        return f"dhash:{best:016x}"
+
+    def _remember(self, fingerprint: str):
+        if not fingerprint.startswith("dhash:"):
+            return
+        image_hash = int(fingerprint[len("dhash:"):], 16)
+        with self._lock:
+            self._image_hashes[image_hash] = None
+            self._image_hashes.move_to_end(image_hash)
+            while len(self._image_hashes) > self.max_size:
+                self._image_hashes.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Попадания по file_unique_id и по содержимому"""
+        lookups = self.id_hits + self.content_hits + self.misses
+        return {
+            "size": self._cache.stats()["size"],
+            "id_hits": self.id_hits,
+            "content_hits": self.content_hits,
+            "misses": self.misses,
+            "hit_rate": (self.id_hits + self.content_hits) / lookups if lookups else 0.0,
+        }
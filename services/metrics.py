@@ -0,0 +1,266 @@
+"""
+Метрики задержек по этапам обработки и счетчики в формате Prometheus
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+from telegram.request import HTTPXRequest
+
+
+# Границы бакетов гистограмм задержек (секунды)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Имена метрик и их описания (# HELP)
+STAGE_SECONDS = "elenya_stage_seconds"
+STAGE_ERRORS = "elenya_stage_errors_total"
+REQUEST_SECONDS = "elenya_request_seconds"
+OPENAI_TOKENS = "elenya_openai_tokens_total"
+OPENAI_AUDIO_SECONDS = "elenya_openai_audio_seconds_total"
+STARTUP_SECONDS = "elenya_startup_seconds"
+HELP = {
+    STAGE_SECONDS: "Длительность этапа обработки (скачивание, Whisper, Vision, эмбеддинг, поиск, LLM, Telegram)",
+    STAGE_ERRORS: "Этапы, завершившиеся исключением",
+    REQUEST_SECONDS: "Полное время обработки апдейта обработчиком",
+    OPENAI_TOKENS: "Токены OpenAI по данным usage из ответов",
+    OPENAI_AUDIO_SECONDS: "Секунды аудио, распознанные Whisper (usage)",
+    STARTUP_SECONDS: "Время от запуска процесса до этапа старта (импорт, polling, словарь, первый ответ)",
+}
+
+# Метод Bot API → этап
+TELEGRAM_STAGES = {
+    "sendMessage": "telegram_send",
+    "editMessageText": "telegram_edit",
+    "deleteMessage": "telegram_delete",
+    "getFile": "telegram_get_file",
+}
+
+# Метки текущего апдейта (обработчик, режим): видны во всех этапах его обработки
+_labels: ContextVar[Optional[Dict[str, str]]] = ContextVar("metrics_labels", default=None)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Гистограмма с фиксированными бакетами, отдельная на каждый набор меток"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # метки → [счетчики по бакетам..., сумма, количество]
+        self.series: Dict[LabelKey, list] = {}
+
+    def observe(self, labels: LabelKey, value: float):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[position] += 1
+        series[-2] += value
+        series[-1] += 1
+
+
+class MetricsRegistry:
+    """
+    Реестр гистограмм и счетчиков
+
+    Метки обработчика и режима берутся из контекста апдейта (instrument_handler,
+    tag), поэтому этапы в глубине кода (эмбеддинг, поиск, LLM) не передают их
+    явно. render() отдает все метрики в текстовом формате Prometheus.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+
+    def observe(self, name: str, value: float, **labels: str):
+        """Добавляет значение в гистограмму name"""
+        key = self._label_key(labels)
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(key, value)
+
+    def inc(self, name: str, value: float = 1, **labels: str):
+        """Увеличивает счетчик name"""
+        key = self._label_key(labels)
+        with self._lock:
+            counter = self._counters.setdefault(name, {})
+            counter[key] = counter.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: str):
+        """Устанавливает значение gauge (метки контекста апдейта не добавляются)"""
+        key = tuple(sorted((label, str(label_value)) for label, label_value in labels.items()))
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    @contextmanager
+    def timer(self, stage: str, **labels: str) -> Iterator[None]:
+        """Замеряет длительность этапа (и считает завершившиеся исключением)"""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc(STAGE_ERRORS, stage=stage, **labels)
+            raise
+        finally:
+            self.observe(STAGE_SECONDS, time.perf_counter() - started, stage=stage, **labels)
+
+    def record_usage(self, usage: Any, model: str, stage: str):
+        """Токены (или секунды аудио) из поля usage ответа OpenAI"""
+        if usage is None:
+            return
+        for kind in ("prompt_tokens", "completion_tokens", "input_tokens", "output_tokens"):
+            value = getattr(usage, kind, None)
+            if isinstance(value, int) and value:
+                self.inc(OPENAI_TOKENS, value, model=model, stage=stage, kind=kind.split("_")[0])
+        seconds = getattr(usage, "seconds", None)
+        if isinstance(seconds, (int, float)) and seconds:
+            self.inc(OPENAI_AUDIO_SECONDS, seconds, model=model, stage=stage)
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        lines = []
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                lines += self._header(name, "histogram")
+                for key, series in sorted(histogram.series.items()):
+                    for bound, count in zip(histogram.buckets, series):
+                        lines.append(f"{name}_bucket{self._format(key + (('le', repr(bound)),))} {count}")
+                    lines.append(f"{name}_bucket{self._format(key + (('le', '+Inf'),))} {series[-1]}")
+                    lines.append(f"{name}_sum{self._format(key)} {series[-2]}")
+                    lines.append(f"{name}_count{self._format(key)} {series[-1]}")
+            for name, counter in sorted(self._counters.items()):
+                lines += self._header(name, "counter")
+                for key, value in sorted(counter.items()):
+                    lines.append(f"{name}{self._format(key)} {value}")
+            for name, gauge in sorted(self._gauges.items()):
+                lines += self._header(name, "gauge")
+                for key, value in sorted(gauge.items()):
+                    lines.append(f"{name}{self._format(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _label_key(labels: Dict[str, str]) -> LabelKey:
+        """Метки контекста апдейта + явные метки, в стабильном порядке"""
+        merged = dict(_labels.get() or {})
+        merged.update(labels)
+        return tuple(sorted((name, str(value)) for name, value in merged.items()))
+
+    @staticmethod
+    def _header(name: str, metric_type: str) -> list:
+        return [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} {metric_type}"]
+
+    @staticmethod
+    def _format(key: LabelKey) -> str:
+        if not key:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in key) + "}"
+
+
+def _escape(value: str) -> str:
+    """Экранирование значения метки: \\, " и перевод строки"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class StartupTimer:
+    """
+    Время старта по этапам: от origin (начало bot.py) до первого наступления этапа
+
+    Этапы: imports, polling, dictionary_ready, first_response. Каждый
+    записывается один раз, печатается и попадает в /metrics и /stats.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def mark(self, phase: str):
+        if phase in self.phases:
+            return
+        seconds = time.perf_counter() - self.origin
+        self.phases[phase] = seconds
+        metrics.set_gauge(STARTUP_SECONDS, seconds, phase=phase)
+        print(f"⏱  Старт, {phase}: {seconds:.2f} с")
+
+    def stats(self) -> Dict[str, float]:
+        return dict(self.phases)
+
+
+# Общий реестр для всего бота
+metrics = MetricsRegistry()
+startup = StartupTimer()
+
+
+def tag(**labels: str):
+    """Добавляет метки (например, mode) ко всем метрикам текущего апдейта"""
+    _labels.set({**(_labels.get() or {}), **labels})
+
+
+def instrument_handler(handler: str) -> Callable:
+    """
+    Декоратор обработчика: метка handler для всех этапов внутри и полное время
+
+    Метки живут в контексте апдейта и сбрасываются при выходе, поэтому при
+    последовательной обработке они не переходят на следующий апдейт.
+    """
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = _labels.set({"handler": handler, "mode": ""})
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                metrics.observe(REQUEST_SECONDS, time.perf_counter() - started)
+                _labels.reset(token)
+                startup.mark("first_response")
+        return wrapper
+    return decorator
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """
+    HTTP-клиент Bot API с замером каждого запроса
+
+    Через него проходят sendMessage / editMessageText / deleteMessage и
+    скачивание файлов (этап download), поэтому обработчики не оборачивают
+    каждый вызов Telegram отдельно.
+    """
+
+    async def do_request(self, url: str, method: str, *args, **kwargs) -> Tuple[int, bytes]:
+        if "/file/bot" in url:
+            stage = "download"
+        else:
+            stage = TELEGRAM_STAGES.get(url.rsplit("/", 1)[-1], "telegram_api")
+        with metrics.timer(stage):
+            return await super().do_request(url, method, *args, **kwargs)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # не засоряем вывод бота запросами Prometheus
+
+
+def start_http_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Запускает эндпоинт /metrics в фоновом потоке"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
@@ -0,0 +1,161 @@
+"""
+Выбор модели OpenAI для перевода: быстрый уровень для простых запросов и переключение при сбоях
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import config
+
+
+@dataclass
+class ModelTier:
+    """Уровень модели и то, что о нем известно по последним запросам"""
+    name: str
+    model: str
+    # Скользящие средние (EWMA): задержка ответа (с) и доля ошибок
+    latency: Optional[float] = None
+    error_rate: float = 0.0
+    # До этого момента (time.monotonic) уровень выведен из ротации
+    blocked_until: float = 0.0
+
+    requests: int = 0
+    errors: int = 0
+    failovers: int = 0
+    seconds_total: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    def cost(self) -> Optional[float]:
+        """Стоимость по MODEL_PRICES, $ (None — цена модели неизвестна)"""
+        price = config.MODEL_PRICES.get(self.model)
+        if price is None:
+            return None
+        return (self.prompt_tokens * price[0] + self.completion_tokens * price[1]) / 1_000_000
+
+
+class ModelRouter:
+    """
+    Политика выбора модели для запроса к LLM
+
+    Короткий запрос (до FAST_MODEL_MAX_WORDS слов) с сильным совпадением в
+    словаре идет на быстрый уровень (OPENAI_FAST_MODEL): ответ почти целиком
+    задан словарной статьей. Фразы, промахи и свободный режим — на основной
+    (OPENAI_MODEL). Без OPENAI_FAST_MODEL (по умолчанию) есть только основной
+    уровень и все запросы идут к OPENAI_MODEL, как раньше.
+
+    По каждому уровню считаются EWMA задержки и доли ошибок. Уровень, у
+    которого одно из них превысило MODEL_MAX_LATENCY / MODEL_MAX_ERROR_RATE,
+    выводится из ротации на MODEL_COOLDOWN секунд, после чего получает
+    запросы снова (с обнуленной статистикой). Если запрос к уровню
+    завершился ошибкой, он повторяется на другом уровне.
+    """
+
+    FAST = "fast"
+    MAIN = "main"
+
+    def __init__(self, main_model: str = config.OPENAI_MODEL, fast_model: str = config.OPENAI_FAST_MODEL):
+        self.tiers: Dict[str, ModelTier] = {self.MAIN: ModelTier(self.MAIN, main_model)}
+        if fast_model and fast_model != main_model:
+            self.tiers[self.FAST] = ModelTier(self.FAST, fast_model)
+        self._lock = threading.Lock()
+
+    def is_short(self, text: str) -> bool:
+        """Подходит ли запрос по длине для быстрого уровня"""
+        return self.FAST in self.tiers and len(text.split()) <= config.FAST_MODEL_MAX_WORDS
+
+    def candidates(self, simple: bool) -> List[ModelTier]:
+        """
+        Уровни в порядке попыток
+
+        Args:
+            simple: Короткий запрос с сильным совпадением в словаре
+
+        Returns:
+            List: предпочтительный уровень и запасной; выведенные из ротации — в конце
+        """
+        preferred = self.FAST if simple and self.FAST in self.tiers else self.MAIN
+        order = [preferred] + [name for name in self.tiers if name != preferred]
+        now = time.monotonic()
+        with self._lock:
+            available = {name: self._available(self.tiers[name], now) for name in order}
+        return sorted((self.tiers[name] for name in order), key=lambda tier: not available[tier.name])
+
+    def record_success(self, tier: ModelTier, seconds: float, usage: Any = None):
+        """
+        Успешный ответ уровня
+
+        Args:
+            seconds: Задержка ответа (для потока — до первого фрагмента)
+            usage: Поле usage ответа OpenAI (токены для отчета о стоимости)
+        """
+        alpha = config.MODEL_EWMA_ALPHA
+        with self._lock:
+            tier.requests += 1
+            tier.seconds_total += seconds
+            tier.latency = seconds if tier.latency is None else alpha * seconds + (1 - alpha) * tier.latency
+            tier.error_rate *= 1 - alpha
+            tier.prompt_tokens += getattr(usage, "prompt_tokens", None) or 0
+            tier.completion_tokens += getattr(usage, "completion_tokens", None) or 0
+            self._check(tier)
+
+    def record_error(self, tier: ModelTier):
+        """Запрос к уровню завершился ошибкой"""
+        alpha = config.MODEL_EWMA_ALPHA
+        with self._lock:
+            tier.requests += 1
+            tier.errors += 1
+            tier.error_rate = alpha + (1 - alpha) * tier.error_rate
+            self._check(tier)
+
+    def record_failover(self, tier: ModelTier):
+        """Запрос повторяется на уровне tier после ошибки другого"""
+        with self._lock:
+            tier.failovers += 1
+        print(f"🔀 Переключение на модель {tier.model}")
+
+    def _check(self, tier: ModelTier):
+        """Выводит уровень из ротации, если он деградировал"""
+        if tier.blocked_until or len(self.tiers) < 2:
+            return
+        slow = tier.latency is not None and tier.latency > config.MODEL_MAX_LATENCY
+        if slow or tier.error_rate > config.MODEL_MAX_ERROR_RATE:
+            tier.blocked_until = time.monotonic() + config.MODEL_COOLDOWN
+            print(
+                f"⚠️  Модель {tier.model} выведена из ротации на {config.MODEL_COOLDOWN:.0f} с "
+                f"(задержка {tier.latency or 0:.1f} с, ошибок {tier.error_rate:.0%})"
+            )
+
+    @staticmethod
+    def _available(tier: ModelTier, now: float) -> bool:
+        if not tier.blocked_until:
+            return True
+        if now < tier.blocked_until:
+            return False
+        # Пауза прошла: уровень снова получает запросы, статистика — с нуля
+        tier.blocked_until = 0.0
+        tier.latency = None
+        tier.error_rate = 0.0
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Задержка, ошибки и стоимость по уровням"""
+        now = time.monotonic()
+        report = {}
+        with self._lock:
+            for name, tier in self.tiers.items():
+                report[name] = {
+                    "model": tier.model,
+                    "available": not tier.blocked_until or now >= tier.blocked_until,
+                    "requests": tier.requests,
+                    "errors": tier.errors,
+                    "failovers": tier.failovers,
+                    "ewma_latency_s": tier.latency,
+                    "ewma_error_rate": tier.error_rate,
+                    "avg_latency_s": tier.seconds_total / (tier.requests - tier.errors)
+                    if tier.requests > tier.errors else None,
+                    "prompt_tokens": tier.prompt_tokens,
+                    "completion_tokens": tier.completion_tokens,
+                    "cost_usd": tier.cost(),
+                }
+        return report
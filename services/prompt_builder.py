@@ -0,0 +1,221 @@
+"""
+Сборка промптов для LLM: статические системные промпты, контекст словаря в бюджете токенов
+"""
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+import config
+from rag.normalize import normalize_text
+
+if TYPE_CHECKING:
+    from tiktoken import Encoding
+
+
+BASE_PROMPT = """Ты — обучающий ассистент по эльфийскому языку Elenya.
+Твоя задача — помогать изучать эльфийский язык.
+
+ВАЖНО: Пользователи учат эльфийский язык!
+- Если пользователь пишет на русском → дай перевод на Elenya
+- Если пользователь пишет на Elenya → дай перевод на русский
+
+Формат ответа:
+
+Elenya: <слово на эльфийском>
+Перевод: <перевод на русский>
+Пояснение: <краткое пояснение о значении и использовании>
+
+Будь лаконичен, но полезен. Используй поэтичный стиль, отражающий природу эльфийского языка."""
+
+DICTIONARY_RULES = """
+
+ВАЖНО: Ты ДОЛЖЕН использовать информацию из словаря Elenya, если она предоставлена в контексте.
+Если слово найдено в словаре — используй только эту информацию.
+Если слово НЕ найдено в словаре — можешь использовать общие знания, но это будет указано отдельно."""
+
+# Системные промпты не зависят от запроса — собираются один раз
+SYSTEM_PROMPTS = {
+    False: BASE_PROMPT,
+    True: BASE_PROMPT + DICTIONARY_RULES,
+}
+
+# Оценка длины без токенизатора: символов на токен (для кириллицы — с запасом)
+CHARS_PER_TOKEN = 2.5
+
+# Перекрытие короче этого не считается повтором (совпадение по случайности)
+MIN_OVERLAP = 20
+
+_WORD_RE = re.compile(r"\w+")
+
+
+# Повторная попытка загрузить токенизатор после неудачи — не чаще чем раз в столько секунд
+ENCODING_RETRY_INTERVAL = 300.0
+
+_encoding: Optional["Encoding"] = None
+_next_attempt = 0.0
+_loading = threading.Lock()
+
+
+def load_encoding() -> Optional["Encoding"]:
+    """
+    Загружает токенизатор модели OPENAI_MODEL (tiktoken); блокирующий вызов
+
+    tiktoken импортируется здесь, а файл кодировки при первом использовании
+    скачивается из сети — поэтому вызывается только в отдельном потоке.
+    Неудача не запоминается навсегда: следующая попытка — через
+    ENCODING_RETRY_INTERVAL секунд, а до тех пор длина оценивается по
+    символам (CHARS_PER_TOKEN).
+    """
+    global _encoding, _next_attempt
+    if _encoding is not None or not _loading.acquire(blocking=False):
+        return _encoding
+    try:
+        import tiktoken
+        try:
+            _encoding = tiktoken.encoding_for_model(config.OPENAI_MODEL)
+        except KeyError:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        _next_attempt = time.monotonic() + ENCODING_RETRY_INTERVAL
+        print(f"⚠️  Токенизатор недоступен, длина контекста оценивается по символам: {e}")
+    finally:
+        _loading.release()
+    return _encoding
+
+
+def get_encoding() -> Optional["Encoding"]:
+    """
+    Загруженный токенизатор или None; не блокирует
+
+    Если токенизатор еще не загружен и пора пробовать, загрузка запускается
+    в фоновом потоке, а текущий вызов получает None (оценку по символам).
+    """
+    global _next_attempt
+    if _encoding is None and not _loading.locked() and time.monotonic() >= _next_attempt:
+        _next_attempt = time.monotonic() + ENCODING_RETRY_INTERVAL
+        threading.Thread(target=load_encoding, name="tiktoken", daemon=True).start()
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Число токенов в тексте (точно через tiktoken или оценка)"""
+    encoding = get_encoding()
+    if encoding is None:
+        return int(len(text) / CHARS_PER_TOKEN) + 1
+    return len(encoding.encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Обрезает текст до max_tokens токенов"""
+    encoding = get_encoding()
+    if encoding is None:
+        return text[:int(max_tokens * CHARS_PER_TOKEN)]
+    return encoding.decode(encoding.encode(text)[:max_tokens])
+
+
+def _overlap(left: str, right: str) -> int:
+    """Длина самого длинного конца left, с которого начинается right"""
+    for length in range(min(len(left), len(right)) - 1, MIN_OVERLAP - 1, -1):
+        if left.endswith(right[:length]):
+            return length
+    return 0
+
+
+def dedupe_chunks(chunks: List[str]) -> List[str]:
+    """
+    Убирает повторы между найденными фрагментами, сохраняя порядок по релевантности
+
+    Повтором считается только тот же текст с точностью до регистра,
+    пунктуации и пробелов (те же слова в том же порядке). Короткая статья ("лес - ..."),
+    входящая в длинный фрагмент, не отбрасывается: модели нужна именно ее
+    строка. Соседние чанки текста перекрываются на chunk_overlap символов —
+    общее начало или конец с уже взятым фрагментом вырезается.
+    """
+    kept: List[str] = []
+    seen = set()
+    for chunk in chunks:
+        chunk = chunk.strip()
+        key = " ".join(_WORD_RE.findall(normalize_text(chunk)))
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        for other in kept:
+            chunk = chunk[_overlap(other, chunk):]
+            cut = _overlap(chunk, other)
+            if cut:
+                chunk = chunk[:-cut]
+        chunk = chunk.strip()
+        if chunk:
+            kept.append(chunk)
+    return kept
+
+
+class PromptBuilder:
+    """
+    Сообщения для chat completion
+
+    Системные промпты — готовые строки (SYSTEM_PROMPTS). Контекст из словаря
+    очищается от повторов (dedupe_chunks) и укладывается в PROMPT_CONTEXT_TOKENS: фрагменты
+    берутся по порядку релевантности целиком, пока помещаются; первый,
+    если он один длиннее бюджета, обрезается. max_tokens ответа зависит от
+    того, одно слово переводится или фраза.
+    """
+
+    def __init__(self, context_tokens: int = config.PROMPT_CONTEXT_TOKENS):
+        self.context_tokens = context_tokens
+
+        self.contexts = 0
+        self.duplicate_chars = 0
+        self.dropped_chunks = 0
+        self.context_tokens_total = 0
+
+    @staticmethod
+    def system_prompt(use_dictionary: bool) -> str:
+        return SYSTEM_PROMPTS[bool(use_dictionary)]
+
+    def build_context(self, chunks: List[str], format_context: Callable[[List[str]], str]) -> str:
+        """
+        Контекст словаря для промпта в пределах бюджета токенов
+
+        Args:
+            chunks: Найденные фрагменты, по убыванию релевантности
+            format_context: Оформление фрагментов (заголовок и т.п.)
+        """
+        unique = dedupe_chunks(chunks)
+        self.duplicate_chars += sum(map(len, chunks)) - sum(map(len, unique))
+
+        selected: List[str] = []
+        used = count_tokens(format_context([""]))  # заголовок контекста
+        for chunk in unique:
+            tokens = count_tokens(chunk) + 1  # + перевод строки
+            if used + tokens > self.context_tokens:
+                head = truncate_tokens(chunk, max(0, self.context_tokens - used)) if not selected else ""
+                if head:
+                    selected.append(head)
+                break
+            selected.append(chunk)
+            used += tokens
+        self.dropped_chunks += len(unique) - len(selected)
+
+        context = format_context(selected) if selected else ""
+        self.contexts += 1
+        self.context_tokens_total += count_tokens(context)
+        return context
+
+    @staticmethod
+    def max_tokens(text: str) -> int:
+        """Лимит длины ответа: для одного слова ответ — три короткие строки"""
+        if len(text.split()) <= 1:
+            return config.MAX_TOKENS_WORD
+        return config.MAX_TOKENS_PHRASE
+
+    def stats(self) -> Dict[str, Any]:
+        """Средний размер контекста и сколько вырезано повторов и лишних фрагментов"""
+        return {
+            "context_token_budget": self.context_tokens,
+            "contexts": self.contexts,
+            "avg_context_tokens": self.context_tokens_total / self.contexts if self.contexts else 0.0,
+            "duplicate_chars_removed": self.duplicate_chars,
+            "chunks_dropped": self.dropped_chunks,
+            "tokenizer": "tiktoken" if _encoding is not None else "estimate",
+        }
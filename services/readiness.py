@@ -0,0 +1,89 @@
+"""
+Готовность словаря, который загружается в фоне после старта бота
+"""
+import asyncio
+from typing import Any, Awaitable, Dict, Optional, Tuple
+import config
+
+
+# Пояснения к ответу, данному без словаря в режиме словаря
+WARMUP_NOTE = "⏳ Словарь еще загружается — перевод дан без него."
+UNAVAILABLE_NOTE = "⚠️ Словарь недоступен — перевод дан без него."
+
+
+class DictionaryReadiness:
+    """
+    Флаг "словарь загружен"
+
+    Бот принимает сообщения сразу после старта, а индекс словаря строится
+    (или открывается) в фоне. Запросы в режиме словаря, пришедшие раньше,
+    обрабатываются по DICTIONARY_WARMUP_POLICY:
+    - "wait" — ждут загрузки до DICTIONARY_WARMUP_WAIT секунд, после чего
+      отвечаются без словаря;
+    - "free" — сразу отвечаются без словаря (как в свободном режиме).
+    "wait" по умолчанию только при параллельной обработке апдейтов: при
+    последовательной ожидание одного запроса задержало бы все чаты.
+    """
+
+    def __init__(self):
+        self._event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.error: Optional[BaseException] = None
+
+        self.waited = 0
+        self.degraded = 0
+
+    @property
+    def is_ready(self) -> bool:
+        return self._event.is_set()
+
+    def start(self, load: Awaitable[None]):
+        """Запускает фоновую загрузку (ссылка на задачу хранится, чтобы ее не собрал GC)"""
+        self._task = asyncio.get_running_loop().create_task(load)
+
+    def set_ready(self):
+        self._event.set()
+
+    def set_failed(self, error: BaseException):
+        """Загрузка не удалась: ожидающие запросы отпускаются без словаря"""
+        self.error = error
+        self._event.set()
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """Ждет окончания загрузки; True, если словарь готов"""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.is_ready and self.error is None
+
+    async def resolve_mode(self, use_dictionary: bool) -> Tuple[bool, Optional[str]]:
+        """
+        Режим, в котором можно ответить прямо сейчас
+
+        Returns:
+            Tuple: (использовать ли словарь, пояснение для пользователя или None)
+        """
+        if not use_dictionary or (self.is_ready and self.error is None):
+            return use_dictionary, None
+
+        if not self.is_ready and config.DICTIONARY_WARMUP_POLICY == "wait":
+            self.waited += 1
+            if await self.wait(config.DICTIONARY_WARMUP_WAIT):
+                return True, None
+
+        self.degraded += 1
+        return False, UNAVAILABLE_NOTE if self.error is not None else WARMUP_NOTE
+
+    def stats(self) -> Dict[str, Any]:
+        """Готов ли словарь и сколько запросов пришлось ждать или отвечать без него"""
+        return {
+            "ready": self.is_ready and self.error is None,
+            "failed": self.error is not None,
+            "waited": self.waited,
+            "degraded": self.degraded,
+        }
+
+
+# Общий флаг для handlers и bot.py
+dictionary_readiness = DictionaryReadiness()
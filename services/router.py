@@ -1,18 +1,71 @@
 """
 Роутер для маршрутизации запросов к OpenAI LLM
 """
-from openai import OpenAI
-from typing import Optional
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, AsyncIterator, List, Optional
 import config
+from rag.normalize import is_cyrillic, normalize_text
 from rag.query import DictionaryQuery
+from services.cache import ResponseCache
+from services.concurrency import openai_limiter
+from services.fast_answer import render_entries
+from services.metrics import STAGE_SECONDS, metrics
+from services.model_router import ModelRouter, ModelTier
+from services.mode_manager import ModeManager
+from services.prompt_builder import PromptBuilder
+from services.semantic_cache import SemanticCache
+from services.singleflight import FlightAborted, singleflight
+from services.translation_table import TranslationTable
+from utils.openai_client import LazyClient, get_async_openai_client, get_openai_client
+
+if TYPE_CHECKING:
+    from openai import OpenAI, AsyncOpenAI
+
+
+ERROR_ANSWER = "Произошла ошибка при обработке запроса."
+
+
+@dataclass
+class TranslationRequest:
+    """Параметры одного запроса на перевод и то, что о нем уже известно"""
+    text: str
+    use_dictionary: bool
+    context: Optional[str]
+    cache_key: str
+    semantic_scope: str
+    # Эмбеддинг запроса: считается один раз и переиспользуется для поиска в словаре
+    embedding: Optional[List[float]] = None
 
 
 class OpenAIRouter:
     """Роутер для обработки запросов через OpenAI"""
     
-    def __init__(self, dictionary_query: Optional[DictionaryQuery] = None):
-        self.client = OpenAI(api_key=config.OPENAI_API_KEY)
+    # Без явно переданных клиентов — общие (один пул соединений на весь бот);
+    # создаются при первом запросе, чтобы импорт SDK OpenAI не задерживал старт
+    client = LazyClient(get_openai_client)
+    async_client = LazyClient(get_async_openai_client)
+    
+    def __init__(
+        self,
+        dictionary_query: Optional[DictionaryQuery] = None,
+        response_cache: Optional[ResponseCache] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        translation_table: Optional[TranslationTable] = None,
+        client: Optional["OpenAI"] = None,
+        async_client: Optional["AsyncOpenAI"] = None,
+        models: Optional[ModelRouter] = None
+    ):
+        self.client = client
+        self.async_client = async_client
         self.dictionary_query = dictionary_query
+        self.response_cache = response_cache
+        self.semantic_cache = semantic_cache
+        self.translation_table = translation_table
+        self.prompts = PromptBuilder()
+        # Политика выбора модели; по умолчанию — из config (OPENAI_FAST_MODEL)
+        self.models = models or ModelRouter()
     
     def translate(
         self, 
@@ -31,65 +84,442 @@ class OpenAIRouter:
         Returns:
             Tuple: (ответ бота, найдено ли в словаре)
         """
-        found_in_dictionary = False
-        system_prompt = self._build_system_prompt(use_dictionary)
+        request = self._prepare_request(text, use_dictionary, context)
+        fast = self._fast_answer(request) or self._table_answer(request)
+        if fast:
+            return fast
+        cached = self._cached_answer(request)
+        if cached:
+            return cached
         
         # Если используем словарь, ищем в RAG
-        rag_context = ""
+        rag_context, found_in_dictionary = "", False
         if use_dictionary and self.dictionary_query:
-            search_results, found = self.dictionary_query.search(text, k=3)
-            found_in_dictionary = found
+            search_results, found_in_dictionary = self.dictionary_query.search(
+                text, k=3, embedding=request.embedding
+            )
+            rag_context = self._format_rag_context(search_results, found_in_dictionary)
+        
+        messages = self._build_messages(text, use_dictionary, rag_context, context)
+        
+        # Запрос к OpenAI (при ошибке — повтор на другой модели)
+        for attempt, tier in enumerate(self._model_tiers(request, found_in_dictionary)):
+            if attempt:
+                self.models.record_failover(tier)
+            try:
+                started = time.perf_counter()
+                response = self.client.chat.completions.create(
+                    model=tier.model,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=self.prompts.max_tokens(text)
+                )
+                
+                answer = response.choices[0].message.content.strip()
+            except Exception as e:
+                print(f"❌ Ошибка запроса к OpenAI ({tier.model}): {e}")
+                self.models.record_error(tier)
+                continue
             
-            if found:
-                rag_context = self.dictionary_query.format_context(search_results)
+            self.models.record_success(tier, time.perf_counter() - started, response.usage)
+            self._store_answer(request, answer, found_in_dictionary)
+            return answer, found_in_dictionary
         
-        # Формируем промпт для пользователя
-        user_prompt = self._build_user_prompt(text, rag_context, context)
+        return ERROR_ANSWER, False
+    
+    async def atranslate(
+        self, 
+        text: str, 
+        use_dictionary: bool = True,
+        context: Optional[str] = None
+    ) -> tuple[str, bool]:
+        """
+        Асинхронный вариант translate: не блокирует event loop на время запросов к OpenAI
         
-        # Запрос к OpenAI
-        try:
-            response = self.client.chat.completions.create(
-                model=config.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
+        Args:
+            text: Текст для перевода
+            use_dictionary: Использовать ли словарь
+            context: Дополнительный контекст (например, "это дерево" для изображения)
             
-            answer = response.choices[0].message.content.strip()
+        Returns:
+            Tuple: (ответ бота, найдено ли в словаре)
+        """
+        request = self._prepare_request(text, use_dictionary, context)
+        fast = self._fast_answer(request) or self._table_answer(request)
+        if fast:
+            return fast
+        cached = await self._aexact_cached_answer(request)
+        if cached:
+            return cached
+        
+        # Одинаковые запросы, пришедшие одновременно, ждут одного ведущего: он
+        # один считает эмбеддинг для семантического кэша и один вызывает LLM
+        return await singleflight.do(self._flight_key(request), lambda: self._aresolve(request))
+    
+    async def _aresolve(self, request: TranslationRequest) -> tuple[str, bool]:
+        """Семантический кэш, а при промахе — поиск в словаре и LLM (выполняет ведущий)"""
+        cached = await self._asemantic_answer(request)
+        if cached:
+            return cached
+        return await self._agenerate(request)
+    
+    async def _agenerate(self, request: TranslationRequest) -> tuple[str, bool]:
+        """Поиск в словаре и запрос к LLM (без кэшей)"""
+        rag_context, found_in_dictionary = await self._aretrieve(request)
+        messages = self._build_messages(request.text, request.use_dictionary, rag_context, request.context)
+        
+        for attempt, tier in enumerate(self._model_tiers(request, found_in_dictionary)):
+            if attempt:
+                self.models.record_failover(tier)
+            try:
+                async with openai_limiter.slot():
+                    started = time.perf_counter()
+                    with metrics.timer("llm", model=tier.model):
+                        response = await self.async_client.chat.completions.create(
+                            model=tier.model,
+                            messages=messages,
+                            temperature=0.7,
+                            max_tokens=self.prompts.max_tokens(request.text)
+                        )
+                    seconds = time.perf_counter() - started
+                metrics.record_usage(response.usage, tier.model, "llm")
+                
+                answer = response.choices[0].message.content.strip()
+            except Exception as e:
+                print(f"❌ Ошибка запроса к OpenAI ({tier.model}): {e}")
+                self.models.record_error(tier)
+                continue
+            
+            self.models.record_success(tier, seconds, response.usage)
+            self._store_answer(request, answer, found_in_dictionary)
             return answer, found_in_dictionary
+        
+        return ERROR_ANSWER, False
+    
+    async def astream_translate(
+        self, 
+        text: str, 
+        use_dictionary: bool = True,
+        context: Optional[str] = None
+    ) -> AsyncIterator[tuple[str, bool]]:
+        """
+        Потоковый вариант atranslate: отдает ответ по мере генерации
+        
+        Args:
+            text: Текст для перевода
+            use_dictionary: Использовать ли словарь
+            context: Дополнительный контекст (например, "это дерево" для изображения)
             
-        except Exception as e:
-            print(f"❌ Ошибка запроса к OpenAI: {e}")
-            return "Произошла ошибка при обработке запроса.", False
+        Yields:
+            Tuple: (накопленный на данный момент ответ, найдено ли в словаре).
+            Последний элемент — полный ответ, такой же, как вернул бы atranslate.
+        """
+        request = self._prepare_request(text, use_dictionary, context)
+        cached = (
+            self._fast_answer(request)
+            or self._table_answer(request)
+            or await self._aexact_cached_answer(request)
+        )
+        if cached:
+            yield cached
+            return
+        
+        # Такой же запрос уже выполняется — ждем его полный ответ
+        flight = singleflight.join(self._flight_key(request))
+        if flight is not None:
+            try:
+                yield await singleflight.follow(flight)
+                return
+            except FlightAborted:
+                pass
+        
+        with singleflight.lead(self._flight_key(request)) as flight:
+            # Эмбеддинг для семантического кэша считает только ведущий
+            cached = await self._asemantic_answer(request)
+            if cached:
+                flight.set_result(cached)
+                yield cached
+                return
+            
+            rag_context, found_in_dictionary = await self._aretrieve(request)
+            messages = self._build_messages(text, use_dictionary, rag_context, context)
+            
+            answer, succeeded = "", False
+            for attempt, tier in enumerate(self._model_tiers(request, found_in_dictionary)):
+                if attempt:
+                    self.models.record_failover(tier)
+                pieces = self._stream_completion(tier, messages, text)
+                try:
+                    async for piece in pieces:
+                        answer += piece
+                        yield answer, found_in_dictionary
+                    succeeded = True
+                    break
+                except Exception as e:
+                    print(f"❌ Ошибка запроса к OpenAI ({tier.model}): {e}")
+                    # Часть ответа уже показана — другой моделью ее не продолжить
+                    if answer:
+                        break
+                finally:
+                    await pieces.aclose()
+            
+            if not succeeded:
+                flight.set_result((ERROR_ANSWER, False))
+                yield ERROR_ANSWER, False
+                return
+            
+            answer = answer.strip()
+            self._store_answer(request, answer, found_in_dictionary)
+            flight.set_result((answer, found_in_dictionary))
+            yield answer, found_in_dictionary
     
-    def _build_system_prompt(self, use_dictionary: bool) -> str:
-        """Строит системный промпт"""
-        base_prompt = """Ты — обучающий ассистент по эльфийскому языку Elenya.
-Твоя задача — помогать изучать эльфийский язык.
-
-ВАЖНО: Пользователи учат эльфийский язык!
-- Если пользователь пишет на русском → дай перевод на Elenya
-- Если пользователь пишет на Elenya → дай перевод на русский
-
-Формат ответа:
-
-Elenya: <слово на эльфийском>
-Перевод: <перевод на русский>
-Пояснение: <краткое пояснение о значении и использовании>
-
-Будь лаконичен, но полезен. Используй поэтичный стиль, отражающий природу эльфийского языка."""
+    async def _stream_completion(self, tier: ModelTier, messages: list[dict], text: str) -> AsyncIterator[str]:
+        """
+        Фрагменты потокового ответа модели tier
         
-        if use_dictionary:
-            base_prompt += """
-
-ВАЖНО: Ты ДОЛЖЕН использовать информацию из словаря Elenya, если она предоставлена в контексте.
-Если слово найдено в словаре — используй только эту информацию.
-Если слово НЕ найдено в словаре — можешь использовать общие знания, но это будет указано отдельно."""
+        Поток читает отдельная задача: она держит слот openai_limiter, только
+        пока читает ответ OpenAI, а вывод фрагментов в Telegram (вызывающий
+        код между итерациями) идет вне слота и не задерживает другие запросы.
+        Ошибка запроса пробрасывается вызывающему.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def produce():
+            try:
+                first_token, usage = None, None
+                async with openai_limiter.slot():
+                    with metrics.timer("llm_stream", model=tier.model):
+                        started = time.perf_counter()
+                        stream = await self.async_client.chat.completions.create(
+                            model=tier.model,
+                            messages=messages,
+                            temperature=0.7,
+                            max_tokens=self.prompts.max_tokens(text),
+                            stream=True,
+                            stream_options={"include_usage": True}
+                        )
+                        async for chunk in stream:
+                            if chunk.usage is not None:
+                                usage = chunk.usage
+                                metrics.record_usage(usage, tier.model, "llm")
+                            if not chunk.choices or not chunk.choices[0].delta.content:
+                                continue
+                            if first_token is None:
+                                first_token = time.perf_counter() - started
+                                metrics.observe(STAGE_SECONDS, first_token, stage="llm_first_token", model=tier.model)
+                            queue.put_nowait(chunk.choices[0].delta.content)
+                self.models.record_success(tier, first_token or time.perf_counter() - started, usage)
+            except Exception as e:
+                self.models.record_error(tier)
+                queue.put_nowait(e)
+            finally:
+                queue.put_nowait(None)
+        
+        task = asyncio.create_task(produce())
+        try:
+            while True:
+                piece = await queue.get()
+                if piece is None:
+                    return
+                if isinstance(piece, Exception):
+                    raise piece
+                yield piece
+        finally:
+            # Ответ больше не нужен (вызывающий прервал поток) — освобождаем слот
+            if not task.done():
+                task.cancel()
+    
+    def _prepare_request(
+        self,
+        text: str,
+        use_dictionary: bool,
+        context: Optional[str]
+    ) -> TranslationRequest:
+        """
+        Считает ключи кэшей для запроса
+        
+        Ключ точного кэша: нормализованный текст, режим, доп. контекст, версия
+        словаря. Область семантического кэша — то же без текста, плюс
+        направление перевода (русский / Elenya).
+        """
+        mode = ModeManager.DICTIONARY_MODE if use_dictionary else ModeManager.FREE_MODE
+        version = self.dictionary_query.version if use_dictionary and self.dictionary_query else ""
+        return TranslationRequest(
+            text=text,
+            use_dictionary=use_dictionary,
+            context=context,
+            cache_key=ResponseCache.make_key(normalize_text(text), mode, context or "", version),
+            semantic_scope=ResponseCache.make_key(mode, context or "", version, is_cyrillic(text)),
+        )
+    
+    @staticmethod
+    def _flight_key(request: TranslationRequest) -> tuple:
+        """Ключ объединения одинаковых запросов — тот же, что у кэша ответов"""
+        return ("translate", request.cache_key)
+    
+    def _model_tiers(self, request: TranslationRequest, found_in_dictionary: bool) -> List[ModelTier]:
+        """
+        Модели для запроса в порядке попыток
+        
+        Быстрая — только для короткого запроса в режиме словаря с точным или
+        сильным лексическим совпадением: ответ задан словарной статьей.
+        """
+        simple = (
+            request.use_dictionary
+            and found_in_dictionary
+            and self.models.is_short(request.text)
+            and self.dictionary_query.resolves_locally(request.text)
+        )
+        return self.models.candidates(simple)
+    
+    def _fast_answer(self, request: TranslationRequest) -> Optional[tuple[str, bool]]:
+        """
+        Ответ по шаблону из словарной статьи, без LLM (DICTIONARY_FAST_PATH)
+        
+        Только для режима словаря, без доп. контекста и при дословном (без
+        стемминга) совпадении с отдельными словами; другие формы слова, фразы
+        и промахи идут в LLM как обычно.
+        """
+        if not config.DICTIONARY_FAST_PATH or not request.use_dictionary or request.context:
+            return None
+        if self.dictionary_query is None:
+            return None
+        answer = render_entries(self.dictionary_query.lookup_exact(request.text))
+        if answer is None:
+            return None
+        return answer, True
+    
+    def _table_answer(self, request: TranslationRequest) -> Optional[tuple[str, bool]]:
+        """
+        Готовый ответ из таблицы переводов (build_translations.py)
+        
+        Таблица покрывает только режим словаря без доп. контекста и только ту
+        версию словаря, из которой собрана; после /reload с новым PDF она не
+        используется до пересборки.
+        """
+        table = self.translation_table
+        if table is None or not request.use_dictionary or request.context:
+            return None
+        if self.dictionary_query is None or table.version != self.dictionary_query.version:
+            return None
+        return table.get(request.text)
+    
+    def _cached_answer(self, request: TranslationRequest) -> Optional[tuple[str, bool]]:
+        """Ответ из точного или семантического кэша (или None)"""
+        cached = self._exact_cached_answer(request)
+        if cached or not self._needs_semantic_lookup(request):
+            return cached
+        
+        request.embedding = self.dictionary_query.embed_query(request.text)
+        return self._semantic_cached_answer(request)
+    
+    async def _asemantic_answer(self, request: TranslationRequest) -> Optional[tuple[str, bool]]:
+        """
+        Ответ из семантического кэша (или None); асинхронно
+        
+        Вызывается внутри объединения одинаковых запросов: точный кэш уже
+        проверен, а эмбеддинг считается один раз на группу.
+        """
+        if not self._needs_semantic_lookup(request):
+            return None
+        
+        request.embedding = await self.dictionary_query.aembed_query(request.text)
+        return self._semantic_cached_answer(request)
+    
+    def _exact_cached_answer(self, request: TranslationRequest) -> Optional[tuple[str, bool]]:
+        if self.response_cache is None:
+            return None
+        cached = self.response_cache.get(request.cache_key)
+        if cached is None:
+            return None
+        return cached["answer"], cached["found_in_dictionary"]
+    
+    async def _aexact_cached_answer(self, request: TranslationRequest) -> Optional[tuple[str, bool]]:
+        """Ответ из точного кэша; промах в памяти проверяется в SQLite вне event loop"""
+        if self.response_cache is None:
+            return None
+        cached = await self.response_cache.aget(request.cache_key)
+        if cached is None:
+            return None
+        return cached["answer"], cached["found_in_dictionary"]
+    
+    def _needs_semantic_lookup(self, request: TranslationRequest) -> bool:
+        """
+        Нужен ли семантический кэш
+        
+        Для эмбеддинга нужен словарь. В режиме словаря эмбеддинг затем
+        переиспользуется для поиска; в свободном он нужен только кэшу, поэтому
+        там — только с SEMANTIC_CACHE_FREE_MODE. Точное или сильное
+        лексическое совпадение со словарной статьей и так обходится без
+        эмбеддинга — не тратим на него сетевой запрос.
+        """
+        if self.semantic_cache is None or self.dictionary_query is None:
+            return False
+        if not request.use_dictionary and not config.SEMANTIC_CACHE_FREE_MODE:
+            return False
+        if request.use_dictionary and self.dictionary_query.resolves_locally(request.text):
+            return False
+        return True
+    
+    def _semantic_cached_answer(self, request: TranslationRequest) -> Optional[tuple[str, bool]]:
+        cached = self.semantic_cache.lookup(request.embedding, request.semantic_scope)
+        if cached is None:
+            return None
+        
+        # Поднимаем ответ в точный кэш: следующий такой же запрос обойдется без эмбеддинга
+        answer, found_in_dictionary = cached["answer"], cached["found_in_dictionary"]
+        if self.response_cache is not None:
+            self.response_cache.set(request.cache_key, cached)
+        return answer, found_in_dictionary
+    
+    def _store_answer(self, request: TranslationRequest, answer: str, found_in_dictionary: bool):
+        """Сохраняет успешный ответ в кэши"""
+        if not answer:
+            return
+        value = {"answer": answer, "found_in_dictionary": found_in_dictionary}
+        if self.response_cache is not None:
+            self.response_cache.set(request.cache_key, value)
+        if self.semantic_cache is not None and request.embedding is not None:
+            self.semantic_cache.store(request.embedding, request.semantic_scope, value)
+    
+    async def _aretrieve(self, request: TranslationRequest) -> tuple[str, bool]:
+        """Ищет текст в словаре: (контекст для промпта, найдено ли в словаре)"""
+        if not request.use_dictionary or not self.dictionary_query:
+            return "", False
+        
+        search_results, found_in_dictionary = await self.dictionary_query.asearch(
+            request.text, k=3, embedding=request.embedding
+        )
+        return self._format_rag_context(search_results, found_in_dictionary), found_in_dictionary
+    
+    def _format_rag_context(self, search_results: list[str], found: bool) -> str:
+        """
+        Контекст из словаря для промпта (пустой, если ничего не найдено)
         
-        return base_prompt
+        Без повторов между фрагментами и не длиннее PROMPT_CONTEXT_TOKENS.
+        """
+        if not found:
+            return ""
+        return self.prompts.build_context(search_results, self.dictionary_query.format_context)
+    
+    def _build_messages(
+        self,
+        text: str,
+        use_dictionary: bool,
+        rag_context: str,
+        additional_context: Optional[str]
+    ) -> list[dict]:
+        """Собирает сообщения для chat completion"""
+        system_prompt = self._build_system_prompt(use_dictionary)
+        user_prompt = self._build_user_prompt(text, rag_context, additional_context)
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def _build_system_prompt(self, use_dictionary: bool) -> str:
+        """Системный промпт (готовая строка, не собирается заново)"""
+        return self.prompts.system_prompt(use_dictionary)
     
     def _build_user_prompt(
         self, 
@@ -0,0 +1,96 @@
+"""
+Семантический кэш ответов: находит почти одинаковые запросы по эмбеддингам
+"""
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class SemanticCache:
+    """
+    Кэш "эмбеддинг запроса → ответ" с поиском по косинусной близости
+
+    Записи разделены по области (режим, доп. контекст, версия словаря,
+    направление перевода): ответ возвращается, только если в той же области
+    есть запрос с близостью не ниже threshold. Хранится не больше max_size
+    записей, при переполнении вытесняются самые старые.
+    """
+
+    def __init__(self, threshold: float, max_size: int):
+        self.threshold = threshold
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._vectors: Optional["np.ndarray"] = None
+        self._scopes: List[Optional[str]] = [None] * max_size
+        self._values: List[Any] = [None] * max_size
+        self._count = 0
+        self._next = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, embedding: List[float], scope: str) -> Optional[Any]:
+        """Возвращает ответ на самый близкий запрос той же области (или None)"""
+        import numpy as np
+
+        query = self._normalize(embedding)
+        with self._lock:
+            if self._vectors is None or not self._count or query.shape[0] != self._vectors.shape[1]:
+                self.misses += 1
+                return None
+
+            similarities = self._vectors[:self._count] @ query
+            mask = np.fromiter(
+                (item_scope == scope for item_scope in self._scopes[:self._count]),
+                dtype=bool,
+                count=self._count
+            )
+            similarities[~mask] = -1.0
+
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                self.hits += 1
+                return self._values[best]
+
+            self.misses += 1
+            return None
+
+    def store(self, embedding: List[float], scope: str, value: Any):
+        """Запоминает ответ для эмбеддинга запроса"""
+        import numpy as np
+
+        if self.max_size <= 0:
+            return
+        vector = self._normalize(embedding)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                # Первая запись (или сменилась размерность модели) — выделяем матрицу
+                self._vectors = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+                self._count = 0
+                self._next = 0
+
+            self._vectors[self._next] = vector
+            self._scopes[self._next] = scope
+            self._values[self._next] = value
+            self._next = (self._next + 1) % self.max_size
+            self._count = min(self._count + 1, self.max_size)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий и промахов"""
+        lookups = self.hits + self.misses
+        return {
+            "size": self._count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> "np.ndarray":
+        import numpy as np
+
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
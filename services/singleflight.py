@@ -0,0 +1,102 @@
+"""
+Объединение одинаковых одновременных запросов (single flight)
+"""
+import asyncio
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+class FlightAborted(Exception):
+    """Ведущий запрос прервался, не получив результата — считать нужно самим"""
+
+
+class SingleFlight:
+    """
+    Не дает одинаковым запросам выполняться параллельно
+
+    Первый запрос с данным ключом ("ведущий") выполняется, остальные,
+    пришедшие до его завершения, ждут и получают тот же результат (или то же
+    исключение). Если ведущий отменен, ожидающие выполняют запрос сами.
+    Результаты не запоминаются — этим занимаются кэши.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Выполняет func() или присоединяется к уже идущему запросу с тем же ключом"""
+        flight = self.join(key)
+        if flight is not None:
+            try:
+                return await self.follow(flight)
+            except FlightAborted:
+                pass
+
+        with self.lead(key) as flight:
+            result = await func()
+            flight.set_result(result)
+            return result
+
+    def join(self, key: Hashable) -> Optional[asyncio.Future]:
+        """Идущий запрос с этим ключом (или None)"""
+        return self._flights.get(key)
+
+    async def follow(self, flight: asyncio.Future) -> Any:
+        """
+        Ждет результат чужого запроса
+
+        Raises:
+            FlightAborted: ведущий запрос отменен
+        """
+        self.coalesced += 1
+        try:
+            # shield: отмена ожидающего не должна отменять общий запрос
+            return await asyncio.shield(flight)
+        except asyncio.CancelledError:
+            if flight.cancelled():
+                raise FlightAborted()
+            raise
+
+    @contextmanager
+    def lead(self, key: Hashable) -> Iterator[asyncio.Future]:
+        """
+        Регистрирует ведущий запрос
+
+        Внутри блока нужно вызвать flight.set_result(...). Исключение из блока
+        передается ожидающим; выход без результата (отмена, закрытый
+        генератор) отпускает их выполнять запрос самостоятельно.
+        """
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        self.calls += 1
+        try:
+            yield flight
+        except Exception as error:
+            if not flight.done():
+                flight.set_exception(error)
+                # Помечаем исключение полученным: ожидающих может и не быть
+                flight.exception()
+            raise
+        finally:
+            if not flight.done():
+                flight.cancel()
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Сколько запросов выполнено и сколько присоединилось к чужим"""
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._flights),
+        }
+
+
+# Общий экземпляр для всех сервисов; ключи включают имя сервиса
+singleflight = SingleFlight()
@@ -0,0 +1,86 @@
+"""
+Постепенный вывод ответа LLM в сообщение Telegram
+"""
+import asyncio
+import time
+from typing import AsyncIterator, Callable, Optional
+from telegram import Message
+from telegram.error import BadRequest, RetryAfter
+import config
+
+
+# Курсор в конце промежуточного текста, пока ответ еще генерируется
+STREAM_CURSOR = " ▌"
+
+
+async def stream_to_message(
+    message: Message,
+    stream: AsyncIterator[tuple[str, bool]],
+    render: Callable[[str, bool], str],
+    min_interval: Optional[float] = None
+) -> tuple[str, bool]:
+    """
+    Выводит ответ из stream в сообщение message правками по мере генерации
+
+    Правки идут не чаще раза в min_interval секунд (лимиты Telegram на
+    редактирование сообщений). Последняя правка содержит render(ответ, флаг)
+    без курсора — тот же текст, что и без стриминга; если он уже в
+    сообщении, повторной правки нет.
+
+    Args:
+        message: Сообщение, которое редактируется (например, "⏳ Ищу перевод...")
+        stream: Результат OpenAIRouter.astream_translate
+        render: Форматирует ответ в текст сообщения: render(ответ, найдено в словаре)
+        min_interval: Минимальный интервал между правками (секунды)
+
+    Returns:
+        Tuple: (полный ответ, найдено ли в словаре)
+    """
+    if min_interval is None:
+        min_interval = config.STREAM_EDIT_INTERVAL
+
+    answer, found_in_dictionary = "", False
+    sent: Optional[str] = None
+    next_edit_at = 0.0
+
+    async for item in stream:
+        # Промежуточная правка — только когда уже пришел следующий фрагмент:
+        # ответ одним куском (кэш, таблица переводов) выводится одной правкой
+        now = time.monotonic()
+        if answer.strip() and now >= next_edit_at:
+            next_edit_at = now + min_interval
+            text = render(answer, found_in_dictionary) + STREAM_CURSOR
+            try:
+                await message.edit_text(text)
+                sent = text
+            except RetryAfter as e:
+                # Telegram просит подождать — пропускаем промежуточные правки
+                next_edit_at = now + _seconds(e.retry_after)
+            except BadRequest:
+                # "Message is not modified" и т.п. — промежуточную правку можно потерять
+                pass
+        answer, found_in_dictionary = item
+
+    text = render(answer, found_in_dictionary)
+    if text != sent:
+        await _final_edit(message, text)
+    return answer, found_in_dictionary
+
+
+async def _final_edit(message: Message, text: str):
+    """Финальная правка: при RetryAfter ждем и повторяем один раз"""
+    try:
+        await message.edit_text(text)
+    except RetryAfter as e:
+        await asyncio.sleep(_seconds(e.retry_after))
+        await message.edit_text(text)
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            raise
+
+
+def _seconds(retry_after) -> float:
+    """retry_after бывает int или timedelta в зависимости от версии PTB"""
+    if hasattr(retry_after, "total_seconds"):
+        return retry_after.total_seconds()
+    return float(retry_after)
@@ -0,0 +1,100 @@
+"""
+Заранее посчитанные переводы всех слов словаря
+"""
+import gzip
+import json
+import os
+from typing import Any, Dict, Optional
+from rag.normalize import exact_key
+
+
+class TranslationTable:
+    """
+    Таблица "слово словаря → готовый ответ" для режима словаря
+
+    Строится офлайн (build_translations.py) тем же промптом, что и живые
+    запросы, и привязана к версии словаря (хэшу PDF): после смены словаря
+    таблица не используется, пока ее не пересоберут. Хранится одним файлом
+    gzip + JSON.
+
+    Ответ из таблицы обходит LLM и кэши, поэтому ключ — дословный текст
+    запроса (exact_key), без стемминга: иначе "тепло" и "тёплый" получили бы
+    один и тот же ответ.
+    """
+
+    # 2 — ключи без стемминга; таблицы версии 1 не читаются, их нужно пересобрать
+    FORMAT_VERSION = 2
+
+    def __init__(
+        self,
+        answers: Optional[Dict[str, list]] = None,
+        version: Optional[str] = None,
+        model: str = ""
+    ):
+        # Ключ — exact_key запроса, значение — [ответ, найдено в словаре]
+        self.answers: Dict[str, list] = answers or {}
+        self.version = version
+        self.model = model
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.answers)
+
+    @staticmethod
+    def key_for(text: str) -> str:
+        """Ключ запроса: нормализованный текст без стемминга"""
+        return exact_key(text)
+
+    def get(self, text: str) -> Optional[tuple[str, bool]]:
+        """Готовый ответ на запрос или None"""
+        value = self.answers.get(self.key_for(text))
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value[0], value[1]
+
+    def add(self, text: str, answer: str, found_in_dictionary: bool):
+        """Добавляет ответ (при сборке таблицы)"""
+        self.answers[self.key_for(text)] = [answer, found_in_dictionary]
+
+    def stats(self) -> Dict[str, Any]:
+        """Размер таблицы и счетчики попаданий"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.answers),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    @classmethod
+    def load(cls, path: str) -> Optional["TranslationTable"]:
+        """Читает таблицу с диска (None, если файла нет или он поврежден)"""
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as table_file:
+                data = json.load(table_file)
+        except (OSError, ValueError):
+            return None
+        if data.get("format") != cls.FORMAT_VERSION:
+            return None
+        return cls(data["answers"], data.get("version"), data.get("model", ""))
+
+    def save(self, path: str):
+        """Атомарно записывает таблицу на диск"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        data = {
+            "format": self.FORMAT_VERSION,
+            "version": self.version,
+            "model": self.model,
+            "answers": self.answers,
+        }
+        tmp_path = path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as table_file:
+            json.dump(data, table_file, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
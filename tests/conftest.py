@@ -0,0 +1,8 @@
+"""
+Общие настройки тестов: корень проекта в sys.path
+"""
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
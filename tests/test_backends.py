@@ -0,0 +1,76 @@
+"""
+Тесты бэкендов векторного поиска
+"""
+import pytest
+from rag.backends import NumpyBackend
+
+np = pytest.importorskip("numpy")
+Document = pytest.importorskip("langchain_core.documents").Document
+
+
+def make_documents(count):
+    return [Document(page_content=f"doc {index}", metadata={"index": index}) for index in range(count)]
+
+
+def test_matches_brute_force_squared_l2():
+    rng = np.random.default_rng(0)
+    matrix = rng.normal(size=(50, 8)).astype(np.float32)
+    backend = NumpyBackend(make_documents(50), matrix, version="v1")
+    query = rng.normal(size=8).astype(np.float32)
+
+    results = backend.search(query.tolist(), k=5)
+
+    # Chroma возвращает квадрат L2 между нормированными векторами
+    unit = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    expected = ((unit - query / np.linalg.norm(query)) ** 2).sum(axis=1)
+    best = np.argsort(expected)[:5]
+
+    assert [doc.metadata["index"] for doc, _ in results] == best.tolist()
+    assert [distance for _, distance in results] == pytest.approx(expected[best].tolist(), abs=1e-5)
+
+
+def test_batch_equals_single_queries():
+    rng = np.random.default_rng(1)
+    backend = NumpyBackend(make_documents(20), rng.normal(size=(20, 4)))
+    queries = rng.normal(size=(3, 4)).tolist()
+
+    batch = backend.search_batch(queries, k=3)
+
+    for query, results in zip(queries, batch):
+        assert [doc.metadata for doc, _ in results] == [doc.metadata for doc, _ in backend.search(query, k=3)]
+
+
+def test_k_larger_than_index_and_empty_index():
+    backend = NumpyBackend(make_documents(2), [[1.0, 0.0], [0.0, 1.0]])
+    results = backend.search([1.0, 0.0], k=10)
+
+    assert [doc.metadata["index"] for doc, _ in results] == [0, 1]
+    assert results[0][1] == pytest.approx(0.0)
+    assert results[1][1] == pytest.approx(2.0)
+
+    assert NumpyBackend([], np.zeros((0, 1))).search([1.0], k=3) == []
+
+
+class FakeVectorstore:
+    def __init__(self, texts, embeddings):
+        self.texts, self.embeddings = texts, embeddings
+
+    def get(self, include):
+        return {
+            "documents": self.texts,
+            "metadatas": [{"text": text} for text in self.texts],
+            "embeddings": self.embeddings,
+        }
+
+
+def test_refresh_reloads_only_on_new_version():
+    vectorstore = FakeVectorstore(["лес"], [[1.0, 0.0]])
+    backend = NumpyBackend.from_vectorstore(vectorstore, version="v1")
+
+    vectorstore.texts, vectorstore.embeddings = ["лес", "море"], [[1.0, 0.0], [0.0, 1.0]]
+    backend.refresh("v1")
+    assert len(backend.documents) == 1
+
+    backend.refresh("v2")
+    assert [doc.page_content for doc, _ in backend.search([0.0, 1.0], k=1)] == ["море"]
+    assert backend.version == "v2"
@@ -0,0 +1,70 @@
+"""
+Тесты кэша ответов (LRU + TTL + SQLite)
+"""
+import asyncio
+import time
+from services.cache import ResponseCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ResponseCache(max_size=2, ttl=100)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" — свежее "b"
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expires_entries():
+    cache = ResponseCache(max_size=10, ttl=0.01)
+    cache.set("a", {"answer": "x"})
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResponseCache(max_size=0, ttl=100)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_sqlite_round_trip(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(max_size=10, ttl=100, db_path=path)
+    value = {"answer": "Elenya: elen", "found_in_dictionary": True}
+    cache.set("звезда", value)
+    cache.flush()
+
+    reopened = ResponseCache(max_size=10, ttl=100, db_path=path)
+    assert reopened.get("звезда") == value
+    assert reopened.stats()["disk_hits"] == 1
+    # Найденное на диске поднято в память
+    assert reopened.get("звезда") == value
+    assert reopened.stats()["hits"] == 1
+
+
+def test_aget_reads_disk_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(max_size=10, ttl=100, db_path=path)
+    cache.set("a", 1)
+    cache.flush()
+    reopened = ResponseCache(max_size=10, ttl=100, db_path=path)
+
+    assert asyncio.run(reopened.aget("a")) == 1
+    assert asyncio.run(reopened.aget("missing")) is None
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_clear_removes_disk_entries(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(max_size=10, ttl=100, db_path=path)
+    cache.set("a", 1)
+    cache.clear()
+
+    assert ResponseCache(max_size=10, ttl=100, db_path=path).get("a") is None
@@ -0,0 +1,65 @@
+"""
+Тесты конкурентной обработки апдейтов и лимита запросов к OpenAI
+"""
+import asyncio
+from telegram import Update
+from services.concurrency import ChatOrderedUpdateProcessor, ConcurrencyLimiter
+
+
+def make_update(update_id: int, chat_id: int) -> Update:
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "text": "лес",
+        },
+    }, None)
+
+
+def test_updates_of_one_chat_run_in_order_under_global_cap():
+    processor = ChatOrderedUpdateProcessor(max_concurrent_updates=3)
+    log, active, peak = [], [0], [0]
+
+    async def work(update_id: int, chat_id: int):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        # Ранние апдейты дольше поздних: без очереди чата порядок бы сломался
+        await asyncio.sleep(0.02 - update_id * 0.0005)
+        active[0] -= 1
+        log.append((chat_id, update_id))
+
+    async def main():
+        await asyncio.gather(*(
+            processor.process_update(make_update(update_id, update_id % 4), work(update_id, update_id % 4))
+            for update_id in range(24)
+        ))
+
+    asyncio.run(main())
+
+    for chat_id in range(4):
+        sequence = [update_id for chat, update_id in log if chat == chat_id]
+        assert sequence == sorted(sequence)
+    assert peak[0] == 3
+    assert processor.stats()["completed"] == 24
+    assert processor.stats()["chats"] == 0
+
+
+def test_limiter_caps_concurrent_requests():
+    limiter = ConcurrencyLimiter(2)
+    active, peak = [0], [0]
+
+    async def request():
+        async with limiter.slot():
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.005)
+            active[0] -= 1
+
+    async def main():
+        await asyncio.gather(*(request() for _ in range(6)))
+
+    asyncio.run(main())
+    assert peak[0] == 2
+    assert limiter.stats()["completed"] == 6
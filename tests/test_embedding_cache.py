@@ -0,0 +1,46 @@
+"""
+Тесты кэша эмбеддингов запросов
+"""
+import asyncio
+from rag.embedding_cache import EmbeddingCache
+
+
+def test_key_is_normalized_text():
+    cache = EmbeddingCache("model", max_size=10)
+    cache.set("Лес!", [0.5, 1.0])
+
+    assert cache.get("лес") == [0.5, 1.0]
+    assert cache.missing(["ЛЕС", "море", "Море"]) == ["море"]
+
+
+def test_lru_eviction():
+    cache = EmbeddingCache("model", max_size=1)
+    cache.set("лес", [1.0])
+    cache.set("море", [2.0])
+
+    assert cache.get("лес") is None
+    assert cache.get("море") == [2.0]
+
+
+def test_sqlite_round_trip_per_model(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    cache = EmbeddingCache("model-a", max_size=10, db_path=path)
+    cache.set("небо", [0.25, 0.5])
+    cache.flush()
+
+    reopened = EmbeddingCache("model-a", max_size=10, db_path=path)
+    assert reopened.get("небо") == [0.25, 0.5]
+    assert reopened.stats()["disk_hits"] == 1
+    # Эмбеддинги другой модели не подходят
+    assert EmbeddingCache("model-b", max_size=10, db_path=path).get("небо") is None
+
+
+def test_async_reads_use_disk(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    cache = EmbeddingCache("model", max_size=10, db_path=path)
+    cache.set("небо", [0.25])
+    cache.flush()
+    reopened = EmbeddingCache("model", max_size=10, db_path=path)
+
+    assert asyncio.run(reopened.amissing(["небо", "река"])) == ["река"]
+    assert asyncio.run(reopened.aget("небо")) == [0.25]
@@ -0,0 +1,35 @@
+"""
+Тесты точного индекса заголовочных слов
+"""
+from rag.headwords import HeadwordIndex
+from rag.parser import DictionaryEntry
+
+
+FRIEND = DictionaryEntry("mellon", "друг", "сущ.")
+STAR = DictionaryEntry("elen", "звезда / светило", "сущ.")
+
+
+def make_index() -> HeadwordIndex:
+    index = HeadwordIndex()
+    index.rebuild([FRIEND, STAR], version="v1")
+    return index
+
+
+def test_lookup_both_directions():
+    index = make_index()
+    assert index.lookup_exact("Elen") == [STAR]
+    assert index.lookup_exact("звезда") == [STAR]
+    assert index.lookup_exact("светило") == [STAR]
+    assert index.version == "v1"
+
+
+def test_lookup_by_stem_finds_word_forms():
+    index = make_index()
+    assert index.lookup("звезды") == [STAR]
+
+
+def test_lookup_exact_rejects_stem_only_match():
+    index = make_index()
+    assert index.lookup("другой") == [FRIEND]
+    assert index.lookup_exact("другой") == []
+    assert index.lookup_exact("звезды") == []
@@ -0,0 +1,38 @@
+"""
+Тесты подготовки фото к Vision API
+"""
+import io
+from types import SimpleNamespace
+import pytest
+from utils.image_prep import largest_photo, prepare_image, select_photo
+
+PIL = pytest.importorskip("PIL.Image")
+
+
+def make_jpeg(width: int, height: int) -> bytes:
+    output = io.BytesIO()
+    PIL.new("RGB", (width, height), (120, 160, 90)).save(output, format="JPEG")
+    return output.getvalue()
+
+
+def size_of(data: bytes) -> tuple:
+    with PIL.open(io.BytesIO(data)) as image:
+        return image.size
+
+
+def test_prepare_image_downscales_long_side():
+    assert size_of(prepare_image(make_jpeg(1280, 960), 512)) == (512, 384)
+
+
+def test_prepare_image_keeps_small_image():
+    data = make_jpeg(320, 240)
+    assert prepare_image(data, 512) == data
+
+
+def test_select_photo_picks_smallest_sufficient():
+    sizes = [SimpleNamespace(width=90, height=67), SimpleNamespace(width=320, height=240),
+             SimpleNamespace(width=800, height=600), SimpleNamespace(width=1280, height=960)]
+
+    assert select_photo(sizes, 512).width == 800
+    assert select_photo(sizes, 2000).width == 1280
+    assert largest_photo(sizes).width == 1280
@@ -0,0 +1,108 @@
+"""
+Тесты лексического поиска (BM25 + n-граммы) и его слияния с векторным
+"""
+import pytest
+from rag.backends import NumpyBackend
+from rag.lexical import LexicalIndex, ngrams, tokenize
+from rag.parser import DictionaryEntry
+from rag.query import DictionaryQuery
+
+pytest.importorskip("langchain_core")
+
+
+ENTRIES = [
+    DictionaryEntry("elen", "звезда", "сущ.", section="Небо"),
+    DictionaryEntry("sila", "сиять", "гл.", section="Небо"),
+    DictionaryEntry("mellon", "друг", "сущ.", section="Люди"),
+    DictionaryEntry("nen", "вода", "сущ.", section="Природа"),
+]
+
+
+def make_index() -> LexicalIndex:
+    index = LexicalIndex()
+    index.rebuild([entry.to_document() for entry in ENTRIES], version="v1")
+    return index
+
+
+def headwords(matches):
+    return [match.document.metadata["headword"] for match in matches]
+
+
+def test_tokenize_stems_russian_and_splits_elenya_into_ngrams():
+    tokens = dict(tokenize("Звезды elen"))
+
+    assert tokens["elen"] == 1.0
+    assert all(tokens[gram] == 0.5 for gram in ngrams("elen"))
+    assert not any(token.startswith("звезды") for token in tokens)
+
+
+def test_exact_word_ranks_first():
+    matches = make_index().search("mellon", k=3)
+
+    assert headwords(matches)[0] == "mellon"
+    assert matches[0].relevance == pytest.approx(1.0)
+
+
+def test_russian_form_finds_entry_by_stem():
+    assert headwords(make_index().search("звезды", k=1)) == ["elen"]
+
+
+def test_typo_is_found_by_ngrams():
+    matches = make_index().search("melon", k=1)
+
+    assert headwords(matches) == ["mellon"]
+    assert 0.4 < matches[0].relevance < 1.0
+
+
+def test_phrase_of_several_elenya_words_finds_each_entry():
+    matches = make_index().search("elen sila", k=2)
+
+    assert set(headwords(matches)) == {"elen", "sila"}
+    assert all(match.relevance == pytest.approx(1.0) for match in matches)
+
+
+def test_unrelated_query_has_low_relevance():
+    matches = make_index().search("hello world", k=3)
+
+    assert all(match.relevance < 0.6 for match in matches)
+    assert LexicalIndex().search("elen") == []
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return [1.0, 0.0]
+
+
+def make_query(embeddings) -> DictionaryQuery:
+    documents = [entry.to_document() for entry in ENTRIES]
+    # По вектору ближе всех "nen", лексически он запросам не подходит
+    matrix = [[0.0, 1.0], [0.0, 1.0], [0.0, 1.0], [1.0, 0.0]]
+    return DictionaryQuery(
+        None,
+        embeddings=embeddings,
+        backend=NumpyBackend(documents, matrix, version="v1"),
+        lexical_index=make_index(),
+    )
+
+
+def test_strong_lexical_match_skips_embedding():
+    embeddings = CountingEmbeddings()
+    results, found = make_query(embeddings).search("mellon", k=2)
+
+    assert found and "mellon" in results[0]
+    assert embeddings.calls == 0
+
+
+def test_weak_lexical_match_is_fused_with_vector_results():
+    embeddings = CountingEmbeddings()
+    results, found = make_query(embeddings).search("melon", k=2)
+
+    assert embeddings.calls == 1
+    assert found
+    # n-граммы и вектор дают по релевантной статье, обе попадают в ответ
+    assert any("mellon" in text for text in results)
+    assert any("nen" in text for text in results)
@@ -0,0 +1,33 @@
+"""
+Смоук-тест нагрузочного теста: короткий прогон через python -m на заглушках API
+"""
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip("chromadb")
+pytest.importorskip("langchain_openai")
+pytest.importorskip("PIL")
+
+
+def test_short_run_has_no_error_replies(tmp_path):
+    report_path = tmp_path / "report.json"
+    env = dict(os.environ, TELEGRAM_TOKEN="x", OPENAI_API_KEY="sk-x")
+    result = subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks.load_test",
+            "--rate", "5", "--duration", "1", "--mix", "text=1,voice=1,photo=1",
+            "--json", str(report_path),
+        ],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, timeout=120
+    )
+
+    assert result.returncode == 0, result.stdout[-2000:] + result.stderr[-2000:]
+    report = json.loads(report_path.read_text())
+    assert report["updates"] == 5
+    assert report["error_replies"] == 0
+    assert report["dictionary"]["ready"]
@@ -0,0 +1,87 @@
+"""
+Тесты загрузки словаря в индекс: эмбеддинги — детерминированная заглушка без сети
+"""
+import os
+import pytest
+import config
+
+pytest.importorskip("chromadb")
+pytest.importorskip("langchain_community")
+pytestmark = [
+    pytest.mark.skipif(not os.path.exists(config.DICTIONARY_PATH), reason="нет PDF-словаря"),
+    pytest.mark.filterwarnings("ignore::DeprecationWarning"),
+    pytest.mark.filterwarnings("ignore::langchain_core._api.LangChainDeprecationWarning"),
+]
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from rag.loader import DictionaryLoader
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Считает тексты, отправленные "в API эмбеддингов" """
+
+    calls: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def make_loader(tmp_path):
+    embeddings = CountingEmbeddings(size=32)
+
+    def make(**kwargs) -> DictionaryLoader:
+        loader = DictionaryLoader(str(tmp_path / "chroma"), **kwargs)
+        loader.embeddings = embeddings
+        return loader
+
+    make.embeddings = embeddings
+    return make
+
+
+def test_reopening_index_does_not_reembed(make_loader):
+    first = make_loader()
+    first.load_dictionary()
+    embedded = make_loader.embeddings.calls
+    assert embedded > 0
+
+    second = make_loader()
+    second.load_dictionary()
+
+    assert make_loader.embeddings.calls == embedded
+    assert second.last_report.unchanged == embedded
+    assert second.dictionary_version == first.dictionary_version
+    assert second.headword_index.lookup_exact("elen")
+
+
+def test_sync_index_embeds_only_changed_chunks(make_loader):
+    loader = make_loader()
+    loader.load_dictionary()
+    _, documents = loader._build_documents(loader._load_pages())
+    before = make_loader.embeddings.calls
+
+    report = loader._sync_index(documents[:-2] + [Document(page_content="newword - новое")])
+
+    assert (report.added, report.removed) == (1, 2)
+    assert make_loader.embeddings.calls == before + 1
+
+    report = loader._sync_index(documents)
+    assert (report.added, report.removed) == (2, 1)
+
+
+def test_mmap_export_matches_index(make_loader, tmp_path):
+    from rag.mmap_store import MmapVectorStore
+
+    path = str(tmp_path / "vectors.bin")
+    loader = make_loader(vector_store_path=path)
+    loader.load_dictionary()
+    count = loader.last_report.added or loader.last_report.unchanged
+
+    store = MmapVectorStore(path)
+    assert len(store) == count
+
+    # Повторная загрузка при актуальном индексе: отчет о реальном состоянии
+    report = make_loader(vector_store_path=path).reload_dictionary()
+    assert (report.added, report.removed, report.unchanged) == (0, 0, count)
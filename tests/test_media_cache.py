@@ -0,0 +1,95 @@
+"""
+Тесты кэша результатов распознавания
+"""
+import asyncio
+import io
+import pytest
+from services.media_cache import MediaCache
+
+
+class Recorder:
+    """download / compute, которые считают вызовы"""
+
+    def __init__(self, data: bytes = b"voice-bytes", result: str = "привет"):
+        self.data = data
+        self.result = result
+        self.downloads = 0
+        self.computes = 0
+
+    async def download(self) -> bytes:
+        self.downloads += 1
+        await asyncio.sleep(0.01)
+        return self.data
+
+    async def compute(self, data: bytes) -> str:
+        self.computes += 1
+        await asyncio.sleep(0.01)
+        return self.result
+
+
+def test_concurrent_identical_uploads_download_once():
+    cache = MediaCache(max_size=10, ttl=100)
+    recorder = Recorder()
+
+    async def main():
+        return await asyncio.gather(
+            *(cache.resolve("voice", "file-1", recorder.download, recorder.compute) for _ in range(4))
+        )
+
+    assert asyncio.run(main()) == ["привет"] * 4
+    assert recorder.downloads == 1
+    assert recorder.computes == 1
+
+
+def test_repeat_by_id_skips_download_and_same_content_skips_compute():
+    cache = MediaCache(max_size=10, ttl=100)
+    recorder = Recorder()
+
+    asyncio.run(cache.resolve("voice", "file-1", recorder.download, recorder.compute))
+    asyncio.run(cache.resolve("voice", "file-1", recorder.download, recorder.compute))
+    assert (recorder.downloads, recorder.computes) == (1, 1)
+
+    # Тот же звук, загруженный заново (другой file_unique_id)
+    asyncio.run(cache.resolve("voice", "file-2", recorder.download, recorder.compute))
+    assert (recorder.downloads, recorder.computes) == (2, 1)
+    assert cache.stats()["content_hits"] == 1
+
+
+def test_empty_results_are_not_cached():
+    cache = MediaCache(max_size=10, ttl=100)
+    recorder = Recorder(result="")
+
+    asyncio.run(cache.resolve("voice", "file-1", recorder.download, recorder.compute))
+    asyncio.run(cache.resolve("voice", "file-1", recorder.download, recorder.compute))
+    assert recorder.computes == 2
+
+
+def test_disabled_cache_skips_fingerprint(monkeypatch):
+    cache = MediaCache(max_size=0, ttl=100)
+    recorder = Recorder()
+
+    def fail(kind, data):
+        raise AssertionError("fingerprint при выключенном кэше")
+
+    monkeypatch.setattr(cache, "fingerprint", fail)
+    assert asyncio.run(cache.resolve("image", "file-1", recorder.download, recorder.compute)) == "привет"
+    asyncio.run(cache.resolve("image", "file-1", recorder.download, recorder.compute))
+    assert recorder.computes == 2
+
+
+def test_near_duplicate_image_hits_by_content():
+    Image = pytest.importorskip("PIL.Image")
+    cache = MediaCache(max_size=10, ttl=100)
+
+    def jpeg(quality: int) -> bytes:
+        image = Image.linear_gradient("L").resize((320, 240)).convert("RGB")
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=quality)
+        return output.getvalue()
+
+    first, recompressed = Recorder(jpeg(95), "дерево"), Recorder(jpeg(60), "другое")
+    asyncio.run(cache.resolve("image", "file-1", first.download, first.compute))
+
+    # Пересжатая копия (другой file_unique_id) находится по dHash без запроса к Vision
+    assert asyncio.run(cache.resolve("image", "file-2", recompressed.download, recompressed.compute)) == "дерево"
+    assert recompressed.computes == 0
@@ -0,0 +1,65 @@
+"""
+Тесты отправки голоса и фото в OpenAI прямо из памяти
+"""
+import asyncio
+import base64
+import tempfile
+from types import SimpleNamespace
+from utils.stt import SpeechToText
+from utils.vision import VisionProcessor
+
+
+class FakeTranscriptions:
+    def __init__(self):
+        self.files = []
+
+    async def create(self, model, file, language):
+        self.files.append(file)
+        return SimpleNamespace(text="привет")
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.messages = []
+
+    async def create(self, model, messages, max_tokens):
+        self.messages.append(messages)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=" кот "))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=1),
+        )
+
+
+def no_temp_files(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("временный файл не нужен")
+
+    monkeypatch.setattr(tempfile, "NamedTemporaryFile", fail)
+    monkeypatch.setattr(tempfile, "mkstemp", fail)
+
+
+def test_stt_sends_bytes_as_named_file(monkeypatch):
+    no_temp_files(monkeypatch)
+    transcriptions = FakeTranscriptions()
+    stt = SpeechToText(async_client=SimpleNamespace(audio=SimpleNamespace(transcriptions=transcriptions)))
+
+    assert asyncio.run(stt.atranscribe(bytearray(b"OggS..."))) == "привет"
+    assert transcriptions.files == [("voice.ogg", b"OggS...")]
+
+
+def test_stt_still_reads_paths(tmp_path):
+    path = tmp_path / "note.ogg"
+    path.write_bytes(b"OggS")
+
+    assert SpeechToText._audio_file(str(path)) == ("note.ogg", b"OggS")
+
+
+def test_vision_encodes_bytes_in_data_url(monkeypatch):
+    no_temp_files(monkeypatch)
+    completions = FakeCompletions()
+    vision = VisionProcessor(async_client=SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+
+    assert asyncio.run(vision.aanalyze_image(b"\xff\xd8jpeg", detail="high")) == "кот"
+    image_url = completions.messages[0][0]["content"][1]["image_url"]
+    assert image_url["url"] == "data:image/jpeg;base64," + base64.b64encode(b"\xff\xd8jpeg").decode()
+    assert image_url["detail"] == "high"
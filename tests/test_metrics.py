@@ -0,0 +1,98 @@
+"""
+Тесты реестра метрик (гистограммы, счетчики, метки апдейта, /metrics)
+"""
+import asyncio
+import urllib.request
+from types import SimpleNamespace
+import pytest
+from services import metrics as metrics_module
+from services.metrics import (
+    OPENAI_TOKENS,
+    REQUEST_SECONDS,
+    STAGE_ERRORS,
+    STAGE_SECONDS,
+    MetricsRegistry,
+    StartupTimer,
+    instrument_handler,
+    start_http_server,
+    tag,
+)
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    registry.observe(STAGE_SECONDS, 0.02, stage="llm")
+    registry.observe(STAGE_SECONDS, 3.0, stage="llm")
+
+    text = registry.render()
+
+    assert f'{STAGE_SECONDS}_bucket{{stage="llm",le="0.01"}} 0' in text
+    assert f'{STAGE_SECONDS}_bucket{{stage="llm",le="0.025"}} 1' in text
+    assert f'{STAGE_SECONDS}_bucket{{stage="llm",le="5.0"}} 2' in text
+    assert f'{STAGE_SECONDS}_bucket{{stage="llm",le="+Inf"}} 2' in text
+    assert f'{STAGE_SECONDS}_count{{stage="llm"}} 2' in text
+    assert f"# TYPE {STAGE_SECONDS} histogram" in text
+
+
+def test_timer_counts_errors_and_still_observes():
+    registry = MetricsRegistry()
+    with pytest.raises(RuntimeError):
+        with registry.timer("vision", detail="low"):
+            raise RuntimeError("boom")
+
+    text = registry.render()
+
+    assert f'{STAGE_ERRORS}{{detail="low",stage="vision"}} 1' in text
+    assert f'{STAGE_SECONDS}_count{{detail="low",stage="vision"}} 1' in text
+
+
+def test_record_usage_counts_tokens_by_kind():
+    registry = MetricsRegistry()
+    registry.record_usage(SimpleNamespace(prompt_tokens=10, completion_tokens=3), "gpt-4", "llm")
+    registry.record_usage(None, "gpt-4", "llm")
+
+    text = registry.render()
+
+    assert f'{OPENAI_TOKENS}{{kind="prompt",model="gpt-4",stage="llm"}} 10' in text
+    assert f'{OPENAI_TOKENS}{{kind="completion",model="gpt-4",stage="llm"}} 3' in text
+
+
+def test_handler_labels_reach_inner_stages_and_reset(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics_module, "metrics", registry)
+    monkeypatch.setattr(metrics_module, "startup", StartupTimer())
+
+    @instrument_handler("text")
+    async def handler():
+        tag(mode="free")
+        with registry.timer("embedding"):
+            pass
+
+    asyncio.run(handler())
+    with registry.timer("outside"):
+        pass
+
+    text = registry.render()
+
+    assert f'{STAGE_SECONDS}_count{{handler="text",mode="free",stage="embedding"}} 1' in text
+    assert f'{STAGE_SECONDS}_count{{stage="outside"}} 1' in text
+    assert f'{REQUEST_SECONDS}_count{{handler="text",mode="free"}} 1' in text
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.inc("test_total", stage='a"b\n')
+
+    assert 'test_total{stage="a\\"b\\n"} 1' in registry.render()
+
+
+def test_http_endpoint_serves_metrics():
+    server = start_http_server(0)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert response.status == 200
+            assert "text/plain" in response.headers["Content-Type"]
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,65 @@
+"""
+Тесты файлового хранилища эмбеддингов (mmap)
+"""
+import pytest
+from rag.backends import MmapBackend, NumpyBackend
+from rag.mmap_store import quantize, read_store_header, write_vector_store
+
+np = pytest.importorskip("numpy")
+Document = pytest.importorskip("langchain_core.documents").Document
+
+
+def make_documents(count):
+    return [Document(page_content=f"doc {index}", metadata={"index": index}) for index in range(count)]
+
+
+@pytest.mark.parametrize("dtype, tolerance", [("float16", 1e-3), ("int8", 1e-2)])
+def test_quantize_keeps_unit_rows(dtype, tolerance):
+    matrix = np.random.default_rng(0).normal(size=(10, 16))
+    vectors, scales = quantize(matrix, dtype)
+
+    restored = vectors.astype(np.float32)
+    if scales is not None:
+        restored *= scales[:, None]
+    unit = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+    assert np.abs(restored - unit).max() < tolerance
+    with pytest.raises(ValueError):
+        quantize(matrix, "float64")
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_round_trip_matches_numpy_backend(tmp_path, dtype):
+    rng = np.random.default_rng(1)
+    matrix = rng.normal(size=(600, 8)).astype(np.float32)
+    documents = make_documents(600)
+    path = str(tmp_path / "vectors.bin")
+    write_vector_store(path, documents, matrix, dtype=dtype, keys={"pdf_hash": "v1"})
+
+    backend = MmapBackend.open(path)
+    reference = NumpyBackend(documents, matrix)
+    query = rng.normal(size=8).tolist()
+
+    assert len(backend.store) == 600 and backend.version == "v1"
+    assert read_store_header(path)["dtype"] == dtype
+    # Поиск идет блоками по SEARCH_BLOCK_ROWS строк — 600 захватывает два блока
+    assert backend.search(query, k=1)[0][0].metadata == reference.search(query, k=1)[0][0].metadata
+    assert backend.search(query, k=1)[0][1] == pytest.approx(reference.search(query, k=1)[0][1], abs=0.02)
+
+
+def test_refresh_picks_up_rewritten_file(tmp_path):
+    path = str(tmp_path / "vectors.bin")
+    write_vector_store(path, make_documents(1), np.array([[1.0, 0.0]]), keys={"pdf_hash": "v1"})
+    backend = MmapBackend.open(path)
+
+    write_vector_store(path, make_documents(2), np.array([[1.0, 0.0], [0.0, 1.0]]), keys={"pdf_hash": "v2"})
+    backend.refresh("v3")
+    assert backend.version == "v1"
+
+    backend.refresh("v2")
+    assert backend.version == "v2"
+    assert backend.search([0.0, 1.0], k=1)[0][0].metadata == {"index": 1}
+
+
+def test_missing_file_header_is_none(tmp_path):
+    assert read_store_header(str(tmp_path / "missing.bin")) is None
@@ -0,0 +1,66 @@
+"""
+Тесты выбора модели: быстрый уровень, вывод из ротации и возврат после паузы
+"""
+from types import SimpleNamespace
+import config
+from services import model_router
+from services.model_router import ModelRouter
+
+
+def names(tiers):
+    return [tier.name for tier in tiers]
+
+
+def test_single_tier_without_fast_model():
+    router = ModelRouter("main-model", "")
+
+    assert names(router.candidates(simple=True)) == ["main"]
+    assert not router.is_short("да")
+
+
+def test_simple_requests_prefer_fast_tier():
+    router = ModelRouter("main-model", "fast-model")
+
+    assert names(router.candidates(simple=True)) == ["fast", "main"]
+    assert names(router.candidates(simple=False)) == ["main", "fast"]
+    assert router.is_short("два слова") and not router.is_short("три слова здесь")
+
+
+def test_errors_block_tier_until_cooldown(monkeypatch):
+    monkeypatch.setattr(config, "MODEL_MAX_ERROR_RATE", 0.3)
+    monkeypatch.setattr(config, "MODEL_COOLDOWN", 60)
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(model_router.time, "monotonic", lambda: clock.now)
+    router = ModelRouter("main-model", "fast-model")
+    fast = router.tiers["fast"]
+
+    router.record_error(fast)
+    assert names(router.candidates(simple=True)) == ["fast", "main"]  # 0.2 — еще ниже порога
+
+    router.record_error(fast)
+    assert names(router.candidates(simple=True)) == ["main", "fast"]
+
+    clock.now += 61
+    assert names(router.candidates(simple=True)) == ["fast", "main"]
+    assert fast.error_rate == 0.0 and fast.errors == 2
+
+
+def test_slow_tier_is_blocked(monkeypatch):
+    monkeypatch.setattr(config, "MODEL_MAX_LATENCY", 5)
+    router = ModelRouter("main-model", "fast-model")
+
+    router.record_success(router.tiers["main"], 30.0)
+
+    assert names(router.candidates(simple=False)) == ["fast", "main"]
+    assert not router.stats()["main"]["available"]
+
+
+def test_stats_count_tokens_and_cost(monkeypatch):
+    monkeypatch.setitem(config.MODEL_PRICES, "main-model", (1.0, 2.0))
+    router = ModelRouter("main-model", "")
+
+    router.record_success(router.tiers["main"], 1.5, SimpleNamespace(prompt_tokens=1000, completion_tokens=500))
+    stats = router.stats()["main"]
+
+    assert stats["requests"] == 1 and stats["avg_latency_s"] == 1.5
+    assert stats["cost_usd"] == (1000 * 1.0 + 500 * 2.0) / 1_000_000
@@ -0,0 +1,21 @@
+"""
+Тесты нормализации и ключей поиска
+"""
+from rag.normalize import exact_key, lookup_key, normalize_text
+
+
+def test_normalize_text():
+    assert normalize_text("  Ёлка, ЗВЕЗДА!  ") == "елка звезда"
+    assert normalize_text("Sela-lin?") == "sela-lin"
+
+
+def test_lookup_key_merges_word_forms():
+    assert lookup_key("звезды") == lookup_key("звезда")
+    # Стемминг склеивает и разные слова — поэтому ключ только для поиска
+    assert lookup_key("другой") == lookup_key("друг")
+
+
+def test_exact_key_keeps_words_apart():
+    assert exact_key("другой") != exact_key("друг")
+    assert exact_key("спокойный") != exact_key("спокойно")
+    assert exact_key("Тёплый") == exact_key("теплый")
@@ -0,0 +1,59 @@
+"""
+Тесты общих HTTP-клиентов OpenAI
+"""
+import asyncio
+import pytest
+import config
+from utils import openai_client
+from utils.openai_client import LazyClient, aclose_clients
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients():
+    asyncio.run(aclose_clients())
+    yield
+    asyncio.run(aclose_clients())
+
+
+def test_http_clients_are_shared_and_use_config_timeouts():
+    client = openai_client.get_http_client()
+    async_client = openai_client.get_async_http_client()
+
+    assert openai_client.get_http_client() is client
+    assert openai_client.get_async_http_client() is async_client
+    assert client.timeout.connect == config.OPENAI_CONNECT_TIMEOUT
+    assert client.timeout.read == config.OPENAI_READ_TIMEOUT
+    assert async_client.timeout.pool == config.OPENAI_CONNECT_TIMEOUT
+
+
+def test_openai_clients_share_the_http_pool():
+    pytest.importorskip("openai")
+    client = openai_client.get_async_openai_client()
+
+    assert openai_client.get_async_openai_client() is client
+    assert client._client is openai_client.get_async_http_client()
+    assert openai_client.get_openai_client()._client is openai_client.get_http_client()
+
+
+def test_aclose_closes_and_resets_clients():
+    client = openai_client.get_async_http_client()
+    asyncio.run(aclose_clients())
+
+    assert client.is_closed
+    assert openai_client.get_async_http_client() is not client
+
+
+class Service:
+    client = LazyClient(lambda: object())
+
+    def __init__(self, client=None):
+        self.client = client
+
+
+def test_lazy_client_created_on_first_access():
+    explicit = object()
+    service = Service()
+
+    assert "_client" in service.__dict__ and service.__dict__["_client"] is None
+    assert service.client is service.client
+    assert Service(explicit).client is explicit
@@ -0,0 +1,62 @@
+"""
+Тесты разбора PDF-словаря на словарные статьи
+"""
+import os
+import pytest
+import config
+from rag.parser import DictionaryEntry, parse_dictionary
+
+Document = pytest.importorskip("langchain_core.documents").Document
+
+
+def test_parse_page_into_entries_and_text():
+    page = Document(page_content="\n".join([
+        "Действия (глаголы)",
+        "vare - идти",
+        "mera-dor - спасибо (досл. \"благое дарение\")",
+        "Фразы",
+        "Elen sila. - Звезда светит.",
+        "Глаголы не спрягаются по лицам.",
+    ]))
+
+    entries, text_blocks = parse_dictionary([page])
+
+    assert entries == [
+        DictionaryEntry("vare", "идти", "гл.", "", "Действия (глаголы)", "word", 0),
+        DictionaryEntry("mera-dor", "спасибо", "гл.", 'досл. "благое дарение"', "Действия (глаголы)", "word", 0),
+        DictionaryEntry("Elen sila.", "Звезда светит.", "", "", "Действия (глаголы)", "phrase", 0),
+    ]
+    assert [block.page_content for block in text_blocks] == [
+        "Действия (глаголы)\nГлаголы не спрягаются по лицам."
+    ]
+
+
+def test_entry_round_trips_through_document():
+    entry = DictionaryEntry("elen", "звезда", "сущ.", section="Природа и небеса")
+    document = entry.to_document()
+
+    assert document.page_content == "elen - звезда (сущ.)"
+    assert DictionaryEntry.from_metadata(document.metadata) == entry
+
+
+@pytest.mark.skipif(not os.path.exists(config.DICTIONARY_PATH), reason="нет PDF-словаря")
+def test_bundled_dictionary():
+    loaders = pytest.importorskip("langchain_community.document_loaders")
+    pages = loaders.PyPDFLoader(config.DICTIONARY_PATH).load()
+
+    entries, text_blocks = parse_dictionary(pages)
+
+    assert len(entries) == 137
+    assert sum(entry.kind == "word" for entry in entries) == 111
+    assert sum(entry.kind == "phrase" for entry in entries) == 26
+    assert len(text_blocks) == 3
+
+    by_headword = {}
+    for entry in entries:
+        by_headword.setdefault(entry.headword, []).append(entry)
+    assert by_headword["elen"][0].translation == "звезда"
+    assert by_headword["elen"][0].section == "Природа и небеса"
+    assert by_headword["vare"][0].part_of_speech == "гл."
+    assert by_headword["mera-dor"][0].notes == 'досл. "благое дарение"'
+    # Одно слово Elenya в двух значениях — две статьи
+    assert [entry.translation for entry in by_headword["mora"]] == ["море", "глубокий"]
@@ -0,0 +1,35 @@
+"""
+Тесты сборки промпта
+"""
+from services.prompt_builder import PromptBuilder, dedupe_chunks
+
+
+def test_dedupe_drops_exact_repeats_only():
+    chunks = ["лес - taur (сущ.)", "Лес — taur (сущ.)!", "Раздел «Природа»: лес - taur (сущ.), река - sirion"]
+
+    # Повтор с другим регистром и пунктуацией убран, а короткая статья внутри
+    # длинного фрагмента осталась
+    assert dedupe_chunks(chunks) == ["лес - taur (сущ.)", chunks[2]]
+
+
+def test_dedupe_trims_chunk_overlap():
+    overlap = "общая часть соседних чанков текста"
+    first = "Начало грамматики. " + overlap
+    second = overlap + " и продолжение."
+
+    assert dedupe_chunks([first, second]) == [first, "и продолжение."]
+
+
+def test_context_fits_token_budget():
+    builder = PromptBuilder(context_tokens=30)
+    chunks = ["лес - taur", "x" * 500]
+
+    context = builder.build_context(chunks, lambda selected: "Словарь:\n" + "\n".join(selected))
+
+    assert "лес - taur" in context
+    assert "x" * 500 not in context
+    assert builder.stats()["chunks_dropped"] == 1
+
+
+def test_max_tokens_by_query_length():
+    assert PromptBuilder.max_tokens("звезда") < PromptBuilder.max_tokens("где находится лес")
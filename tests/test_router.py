@@ -0,0 +1,172 @@
+"""
+Тесты OpenAIRouter без сети: клиент OpenAI и эмбеддинги — заглушки
+"""
+import asyncio
+from types import SimpleNamespace
+import config
+from rag.backends import NumpyBackend
+from rag.headwords import HeadwordIndex
+from rag.parser import DictionaryEntry
+from rag.query import DictionaryQuery
+from services.model_router import ModelRouter
+from services.router import ERROR_ANSWER, OpenAIRouter
+from services.semantic_cache import SemanticCache
+
+
+FRIEND = DictionaryEntry("mellon", "друг", "сущ.", section="Люди")
+LLM_ANSWER = "Ответ LLM"
+# "дерево" и "деревья" почти совпадают (близость ≈ 0.999), "река" — далеко
+VECTORS = {
+    "дерево": [1.0, 0.0, 0.0],
+    "деревья": [0.99, 0.05, 0.0],
+    "река": [0.0, 1.0, 0.0],
+}
+
+
+class FakeCompletions:
+    """chat.completions: отвечает LLM_ANSWER и запоминает модели вызовов (модели из failing — ошибка)"""
+
+    def __init__(self, failing=()):
+        self.calls = []
+        self.failing = set(failing)
+
+    async def create(self, model, messages, **kwargs):
+        self.calls.append(model)
+        if model in self.failing:
+            raise ConnectionError(f"{model} недоступна")
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=LLM_ANSWER))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5),
+        )
+
+
+class FakeEmbeddings:
+    """Эмбеддинги по таблице "текст → вектор" """
+
+    def __init__(self, vectors=None):
+        self.vectors = vectors or {}
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return self.vectors.get(text, [0.0, 0.0, 1.0])
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+def make_router(**kwargs) -> OpenAIRouter:
+    index = HeadwordIndex()
+    index.rebuild([FRIEND], version="v1")
+    embeddings = kwargs.pop("embeddings", FakeEmbeddings())
+    # Векторный поиск по одной статье, далекой от всех запросов тестов
+    backend = NumpyBackend([FRIEND.to_document()], [[0.0, 0.0, 1.0]], version="v1")
+    query = DictionaryQuery(None, index, embeddings=embeddings, backend=backend)
+    completions = FakeCompletions(kwargs.pop("failing", ()))
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return OpenAIRouter(query, async_client=client, **kwargs)
+
+
+def test_fast_path_answers_exact_headword(monkeypatch):
+    monkeypatch.setattr(config, "DICTIONARY_FAST_PATH", True)
+    router = make_router()
+
+    answer, found = asyncio.run(router.atranslate("Друг"))
+
+    assert found
+    assert answer.startswith("Elenya: mellon\nПеревод: друг")
+    assert router.async_client.chat.completions.calls == []
+
+
+def test_fast_path_rejects_stem_only_match(monkeypatch):
+    monkeypatch.setattr(config, "DICTIONARY_FAST_PATH", True)
+    router = make_router()
+
+    answer, _ = asyncio.run(router.atranslate("другой"))
+
+    # "другой" и "друг" совпадают только по основе: отвечает LLM, а не шаблон статьи "друг"
+    assert answer == LLM_ANSWER
+    assert len(router.async_client.chat.completions.calls) == 1
+
+
+def test_semantic_cache_serves_near_duplicates_only():
+    router = make_router(
+        embeddings=FakeEmbeddings(VECTORS),
+        semantic_cache=SemanticCache(threshold=0.97, max_size=10),
+    )
+    calls = router.async_client.chat.completions.calls
+
+    asyncio.run(router.atranslate("дерево"))
+    assert len(calls) == 1
+
+    assert asyncio.run(router.atranslate("деревья")) == (LLM_ANSWER, False)
+    assert len(calls) == 1  # почти такой же запрос — из семантического кэша
+
+    asyncio.run(router.atranslate("река"))
+    assert len(calls) == 2  # другой запрос — к LLM
+    assert router.semantic_cache.stats()["hits"] == 1
+
+
+def test_free_mode_skips_embedding_by_default(monkeypatch):
+    monkeypatch.setattr(config, "SEMANTIC_CACHE_FREE_MODE", False)
+    embeddings = FakeEmbeddings(VECTORS)
+    router = make_router(embeddings=embeddings, semantic_cache=SemanticCache(threshold=0.97, max_size=10))
+
+    asyncio.run(router.atranslate("дерево", use_dictionary=False))
+    asyncio.run(router.atranslate("деревья", use_dictionary=False))
+
+    assert embeddings.calls == 0
+    assert len(router.async_client.chat.completions.calls) == 2
+
+
+def test_free_mode_semantic_cache_behind_flag(monkeypatch):
+    monkeypatch.setattr(config, "SEMANTIC_CACHE_FREE_MODE", True)
+    router = make_router(
+        embeddings=FakeEmbeddings(VECTORS),
+        semantic_cache=SemanticCache(threshold=0.97, max_size=10),
+    )
+
+    asyncio.run(router.atranslate("дерево", use_dictionary=False))
+    asyncio.run(router.atranslate("деревья", use_dictionary=False))
+
+    assert len(router.async_client.chat.completions.calls) == 1
+
+
+class NoSyncClient:
+    """Синхронный клиент, которого асинхронный путь касаться не должен"""
+
+    def __getattr__(self, name):
+        raise AssertionError(f"синхронный клиент OpenAI в асинхронном пути: {name}")
+
+
+def test_async_translate_uses_only_async_client():
+    router = make_router()
+    router.client = NoSyncClient()
+
+    assert asyncio.run(router.atranslate("дерево"))[0] == LLM_ANSWER
+    assert asyncio.run(router.atranslate("река", use_dictionary=False))[0] == LLM_ANSWER
+
+
+def test_failover_to_main_model_after_error(monkeypatch):
+    monkeypatch.setattr(config, "MODEL_MAX_ERROR_RATE", 0.1)
+    router = make_router(models=ModelRouter("main-model", "fast-model"), failing={"fast-model"})
+    calls = router.async_client.chat.completions.calls
+
+    # Короткий запрос с точной статьей идет на быструю модель, после ее ошибки — на основную
+    assert asyncio.run(router.atranslate("друг")) == (LLM_ANSWER, True)
+    assert calls == ["fast-model", "main-model"]
+
+    stats = router.models.stats()
+    assert stats["fast"]["errors"] == 1 and not stats["fast"]["available"]
+    assert stats["main"]["failovers"] == 1
+
+    # Быстрая модель выведена из ротации: следующий запрос сразу идет на основную
+    asyncio.run(router.atranslate("mellon"))
+    assert calls[2:] == ["main-model"]
+
+
+def test_error_answer_when_every_model_fails():
+    router = make_router(models=ModelRouter("main-model", "fast-model"), failing={"fast-model", "main-model"})
+
+    assert asyncio.run(router.atranslate("река")) == (ERROR_ANSWER, False)
+    assert router.async_client.chat.completions.calls == ["main-model", "fast-model"]
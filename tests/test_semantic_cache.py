@@ -0,0 +1,24 @@
+"""
+Тесты семантического кэша
+"""
+from services.semantic_cache import SemanticCache
+
+
+def test_lookup_by_similarity_within_scope():
+    cache = SemanticCache(threshold=0.97, max_size=10)
+    cache.store([1.0, 0.0], "dictionary", "ответ")
+
+    assert cache.lookup([0.99, 0.05], "dictionary") == "ответ"
+    assert cache.lookup([0.0, 1.0], "dictionary") is None
+    # Та же близость, но другая область (режим, контекст, версия словаря)
+    assert cache.lookup([0.99, 0.05], "free") is None
+
+
+def test_oldest_entries_are_replaced():
+    cache = SemanticCache(threshold=0.97, max_size=2)
+    cache.store([1.0, 0.0, 0.0], "s", "a")
+    cache.store([0.0, 1.0, 0.0], "s", "b")
+    cache.store([0.0, 0.0, 1.0], "s", "c")
+
+    assert cache.lookup([1.0, 0.0, 0.0], "s") is None
+    assert cache.lookup([0.0, 0.0, 1.0], "s") == "c"
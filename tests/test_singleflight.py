@@ -0,0 +1,80 @@
+"""
+Тесты объединения одинаковых одновременных запросов
+"""
+import asyncio
+import pytest
+from services.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    async def main():
+        return await asyncio.gather(
+            *(flights.do("key", lambda: work(1)) for _ in range(5)),
+            flights.do("other", lambda: work(2)),
+        )
+
+    assert asyncio.run(main()) == [1, 1, 1, 1, 1, 2]
+    assert calls == [1, 2]
+    assert flights.stats() == {"calls": 2, "coalesced": 4, "in_flight": 0}
+
+
+def test_error_is_shared_with_followers():
+    flights = SingleFlight()
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*(flights.do("key", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert [type(result) for result in results] == [ValueError] * 3
+    assert calls == [1]
+
+
+def test_followers_run_themselves_when_leader_is_cancelled():
+    flights = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        leader = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "done"
+    assert len(calls) == 2
+
+
+def test_sequential_calls_are_not_cached():
+    flights = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        return [await flights.do("key", work), await flights.do("key", work)]
+
+    assert asyncio.run(main()) == [1, 2]
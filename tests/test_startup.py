@@ -0,0 +1,65 @@
+"""
+Тесты быстрого старта: ленивые импорты и фоновая загрузка словаря
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import config
+from services.readiness import UNAVAILABLE_NOTE, WARMUP_NOTE, DictionaryReadiness
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("numpy", "langchain_core", "langchain_openai", "openai", "chromadb", "pypdf")
+
+
+def test_importing_bot_skips_heavy_modules():
+    code = (
+        "import sys, bot; "
+        f"print('loaded:', ','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"
+    )
+    env = dict(os.environ, TELEGRAM_TOKEN="x", OPENAI_API_KEY="sk-x")
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=PROJECT_ROOT, env=env,
+        capture_output=True, text=True, timeout=60
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines()[-1] == "loaded: "
+
+
+def test_free_policy_answers_without_dictionary(monkeypatch):
+    monkeypatch.setattr(config, "DICTIONARY_WARMUP_POLICY", "free")
+    readiness = DictionaryReadiness()
+
+    assert asyncio.run(readiness.resolve_mode(True)) == (False, WARMUP_NOTE)
+    assert asyncio.run(readiness.resolve_mode(False)) == (False, None)
+    assert readiness.stats()["degraded"] == 1
+
+
+def test_wait_policy_waits_for_background_load(monkeypatch):
+    monkeypatch.setattr(config, "DICTIONARY_WARMUP_POLICY", "wait")
+    monkeypatch.setattr(config, "DICTIONARY_WARMUP_WAIT", 5)
+
+    async def scenario():
+        readiness = DictionaryReadiness()
+
+        async def load():
+            await asyncio.sleep(0.01)
+            readiness.set_ready()
+
+        readiness.start(load())
+        return await readiness.resolve_mode(True), readiness.stats()
+
+    mode, stats = asyncio.run(scenario())
+
+    assert mode == (True, None)
+    assert stats == {"ready": True, "failed": False, "waited": 1, "degraded": 0}
+
+
+def test_failed_load_degrades_to_free_answers(monkeypatch):
+    monkeypatch.setattr(config, "DICTIONARY_WARMUP_POLICY", "wait")
+    readiness = DictionaryReadiness()
+    readiness.set_failed(RuntimeError("PDF не найден"))
+
+    assert asyncio.run(readiness.resolve_mode(True)) == (False, UNAVAILABLE_NOTE)
+    assert readiness.stats()["failed"]
@@ -0,0 +1,51 @@
+"""
+Тесты вывода ответа правками сообщения
+"""
+import asyncio
+from telegram.error import BadRequest
+from services.streaming import STREAM_CURSOR, stream_to_message
+
+
+class FakeMessage:
+    """Сообщение Telegram: запоминает правки, одинаковый текст — BadRequest, как в Bot API"""
+
+    def __init__(self):
+        self.edits = []
+
+    async def edit_text(self, text):
+        if self.edits and self.edits[-1] == text:
+            raise BadRequest("Message is not modified")
+        self.edits.append(text)
+
+
+async def chunks(parts, delay=0.0):
+    answer = ""
+    for part in parts:
+        answer += part
+        await asyncio.sleep(delay)
+        yield answer, True
+
+
+def render(answer, found_in_dictionary):
+    return answer if found_in_dictionary else answer + " (не найдено)"
+
+
+def test_single_piece_answer_is_one_edit():
+    message = FakeMessage()
+
+    result = asyncio.run(stream_to_message(message, chunks(["Elenya: elen"]), render, min_interval=0))
+
+    assert result == ("Elenya: elen", True)
+    assert message.edits == ["Elenya: elen"]
+
+
+def test_edits_are_throttled_and_final_has_no_cursor():
+    message = FakeMessage()
+    parts = [f"слово{i} " for i in range(20)]
+
+    answer, _ = asyncio.run(stream_to_message(message, chunks(parts, delay=0.005), render, min_interval=0.03))
+
+    intermediate = message.edits[:-1]
+    assert 1 <= len(intermediate) < 10
+    assert all(text.endswith(STREAM_CURSOR) for text in intermediate)
+    assert message.edits[-1] == answer == "".join(parts)
@@ -0,0 +1,37 @@
+"""
+Тесты таблицы переводов
+"""
+import gzip
+import json
+from services.translation_table import TranslationTable
+
+
+def test_word_forms_do_not_share_an_answer():
+    table = TranslationTable(version="v1")
+    table.add("тепло", "ответ: тепло", True)
+    table.add("тёплый", "ответ: тёплый", True)
+
+    assert table.get("Тепло!") == ("ответ: тепло", True)
+    assert table.get("теплый") == ("ответ: тёплый", True)
+    assert table.get("теплая") is None
+    assert table.stats()["hits"] == 2
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "table.json.gz")
+    table = TranslationTable(version="v1", model="gpt-test")
+    table.add("звезда", "Elenya: elen", True)
+    table.save(path)
+
+    loaded = TranslationTable.load(path)
+    assert loaded.version == "v1"
+    assert loaded.model == "gpt-test"
+    assert loaded.get("звезда") == ("Elenya: elen", True)
+
+
+def test_old_stemmed_format_is_ignored(tmp_path):
+    path = str(tmp_path / "table.json.gz")
+    with gzip.open(path, "wt", encoding="utf-8") as table_file:
+        json.dump({"format": 1, "version": "v1", "answers": {"тепл": ["ответ", True]}}, table_file)
+
+    assert TranslationTable.load(path) is None
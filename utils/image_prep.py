@@ -0,0 +1,76 @@
+"""
+Подготовка фото к Vision API: выбор размера, уменьшение, перекодирование
+"""
+import io
+from typing import Optional, Sequence
+from telegram import PhotoSize
+
+try:
+    from PIL import Image as PILImage
+except ImportError:  # Pillow необязателен: без него фото отправляется как есть
+    PILImage = None
+
+
+def select_photo(sizes: Sequence[PhotoSize], min_side: int) -> PhotoSize:
+    """
+    Самая маленькая версия фото, длинная сторона которой не меньше min_side
+
+    Telegram присылает несколько размеров одного фото (по возрастанию);
+    для названия объекта в 2-3 слова большое разрешение не нужно. Если
+    все версии меньше min_side, берется самая большая.
+    """
+    for size in sorted(sizes, key=lambda size: size.width * size.height):
+        if max(size.width, size.height) >= min_side:
+            return size
+    return max(sizes, key=lambda size: size.width * size.height)
+
+
+def largest_photo(sizes: Sequence[PhotoSize]) -> PhotoSize:
+    """Самая большая версия фото (для повторного запроса с детализацией high)"""
+    return max(sizes, key=lambda size: size.width * size.height)
+
+
+def prepare_image(data: bytes, max_side: int, quality: int = 85) -> bytes:
+    """
+    Уменьшает изображение до max_side по длинной стороне и перекодирует в JPEG
+
+    Возвращает исходные байты, если изображение и так не больше max_side,
+    Pillow не установлен или файл не удалось прочитать.
+    """
+    if PILImage is None:
+        return bytes(data)
+    try:
+        with PILImage.open(io.BytesIO(data)) as image:
+            if max(image.size) <= max_side:
+                return bytes(data)
+            image.thumbnail((max_side, max_side))
+            output = io.BytesIO()
+            image.convert("RGB").save(output, format="JPEG", quality=quality, optimize=True)
+            return output.getvalue()
+    except Exception as e:
+        print(f"⚠️  Не удалось уменьшить изображение: {e}")
+        return bytes(data)
+
+
+def perceptual_hash(data: bytes, size: int = 8) -> Optional[str]:
+    """
+    Разностный хэш (dHash) изображения: 64 бита в hex
+
+    Одинаков для одной и той же картинки после пересжатия или изменения
+    размера. None, если Pillow не установлен или файл не удалось прочитать.
+    """
+    if PILImage is None:
+        return None
+    try:
+        with PILImage.open(io.BytesIO(data)) as image:
+            image.draft("L", (size * 4, size * 4))  # JPEG: декодирование сразу в малом размере
+            pixels = image.convert("L").resize((size + 1, size)).tobytes()
+    except Exception:
+        return None
+    bits = 0
+    for row in range(size):
+        for column in range(size):
+            left = pixels[row * (size + 1) + column]
+            right = pixels[row * (size + 1) + column + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:0{size * size // 4}x}"
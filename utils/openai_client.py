@@ -0,0 +1,128 @@
+"""
+Общие HTTP-клиенты для всех запросов к OpenAI
+
+SDK OpenAI импортируется при создании первого клиента, а не при импорте
+модуля: его загрузка (~0.5 с) не задерживает старт бота.
+"""
+import importlib.util
+import threading
+from typing import TYPE_CHECKING, Callable, Optional
+import httpx
+import config
+
+if TYPE_CHECKING:
+    from openai import OpenAI, AsyncOpenAI
+
+
+_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+_client: Optional["OpenAI"] = None
+_async_client: Optional["AsyncOpenAI"] = None
+
+
+def http2_available() -> bool:
+    """HTTP/2 включается, только если установлен пакет h2 (pip install httpx[http2])"""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _timeout() -> httpx.Timeout:
+    # Явные таймауты вместо 10 минут по умолчанию в SDK: на установку
+    # соединения — коротко, на ответ — с запасом для потоков и Whisper
+    return httpx.Timeout(
+        config.OPENAI_READ_TIMEOUT,
+        connect=config.OPENAI_CONNECT_TIMEOUT,
+        pool=config.OPENAI_CONNECT_TIMEOUT
+    )
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=config.OPENAI_POOL_SIZE,
+        max_keepalive_connections=config.OPENAI_POOL_SIZE,
+        keepalive_expiry=config.OPENAI_KEEPALIVE_EXPIRY
+    )
+
+
+def get_http_client() -> httpx.Client:
+    """Синхронный httpx-клиент с общим пулом соединений"""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                timeout=_timeout(), limits=_limits(), http2=http2_available()
+            )
+        return _http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Асинхронный httpx-клиент с общим пулом соединений"""
+    global _async_http_client
+    with _lock:
+        if _async_http_client is None:
+            _async_http_client = httpx.AsyncClient(
+                timeout=_timeout(), limits=_limits(), http2=http2_available()
+            )
+        return _async_http_client
+
+
+def get_openai_client() -> "OpenAI":
+    """Общий синхронный клиент OpenAI"""
+    from openai import OpenAI
+
+    global _client
+    http_client = get_http_client()
+    with _lock:
+        if _client is None:
+            _client = OpenAI(api_key=config.OPENAI_API_KEY, http_client=http_client)
+        return _client
+
+
+def get_async_openai_client() -> "AsyncOpenAI":
+    """Общий асинхронный клиент OpenAI (router, Whisper, Vision, эмбеддинги)"""
+    from openai import AsyncOpenAI
+
+    global _async_client
+    http_client = get_async_http_client()
+    with _lock:
+        if _async_client is None:
+            _async_client = AsyncOpenAI(api_key=config.OPENAI_API_KEY, http_client=http_client)
+        return _async_client
+
+
+class LazyClient:
+    """
+    Атрибут сервиса с клиентом OpenAI, который создается при первом обращении
+
+    Если клиент не передан явно (атрибуту присвоен None), берется общий
+    из factory — в момент первого запроса, а не при создании сервиса.
+    """
+
+    def __init__(self, factory: Callable[[], object]):
+        self.factory = factory
+
+    def __set_name__(self, owner, name: str):
+        self.attribute = "_" + name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        client = instance.__dict__.get(self.attribute)
+        if client is None:
+            client = instance.__dict__[self.attribute] = self.factory()
+        return client
+
+    def __set__(self, instance, client):
+        instance.__dict__[self.attribute] = client
+
+
+async def aclose_clients():
+    """Закрывает соединения при остановке бота"""
+    global _http_client, _async_http_client, _client, _async_client
+    with _lock:
+        http_client, async_http_client = _http_client, _async_http_client
+        _http_client = _async_http_client = _client = _async_client = None
+    if async_http_client is not None:
+        await async_http_client.aclose()
+    if http_client is not None:
+        http_client.close()
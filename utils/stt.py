@@ -1,35 +1,109 @@
 """
 Speech-to-Text через OpenAI Whisper API
 """
-from openai import OpenAI
-import config
+import os
+from typing import TYPE_CHECKING, Optional, Union
+from services.concurrency import openai_limiter
+from services.metrics import metrics
+from services.singleflight import singleflight
+from utils.openai_client import LazyClient, get_async_openai_client, get_openai_client
+
+if TYPE_CHECKING:
+    from openai import OpenAI, AsyncOpenAI
+
+
+# Аудио: путь к файлу или его содержимое в памяти
+Audio = Union[str, bytes, bytearray]
 
 
 class SpeechToText:
     """Класс для распознавания речи из голосовых сообщений"""
     
-    def __init__(self):
-        self.client = OpenAI(api_key=config.OPENAI_API_KEY)
+    # Без явно переданных клиентов — общие (один пул соединений на весь бот);
+    # создаются при первом запросе, чтобы импорт SDK OpenAI не задерживал старт
+    client = LazyClient(get_openai_client)
+    async_client = LazyClient(get_async_openai_client)
     
-    def transcribe(self, audio_file_path: str, language: str = "ru") -> str:
+    def __init__(
+        self,
+        client: Optional["OpenAI"] = None,
+        async_client: Optional["AsyncOpenAI"] = None
+    ):
+        self.client = client
+        self.async_client = async_client
+    
+    def transcribe(self, audio: Audio, language: str = "ru") -> str:
         """
         Распознает речь из аудиофайла
         
         Args:
-            audio_file_path: Путь к аудиофайлу
+            audio: Путь к аудиофайлу или его содержимое (bytes)
             language: Язык распознавания (по умолчанию русский)
             
         Returns:
             Распознанный текст
         """
         try:
-            with open(audio_file_path, "rb") as audio_file:
-                transcript = self.client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    language=language
-                )
+            transcript = self.client.audio.transcriptions.create(
+                model="whisper-1",
+                file=self._audio_file(audio),
+                language=language
+            )
             return transcript.text
         except Exception as e:
             print(f"❌ Ошибка распознавания речи: {e}")
             return ""
+    
+    async def atranscribe(
+        self,
+        audio: Audio,
+        language: str = "ru",
+        key: Optional[str] = None
+    ) -> str:
+        """
+        Асинхронный вариант transcribe (через AsyncOpenAI)
+        
+        Args:
+            audio: Путь к аудиофайлу или его содержимое (bytes)
+            language: Язык распознавания (по умолчанию русский)
+            key: Идентификатор файла (file_unique_id в Telegram): одновременные
+                запросы с одним ключом выполняются одним вызовом API
+            
+        Returns:
+            Распознанный текст
+        """
+        if key is None:
+            return await self._atranscribe(audio, language)
+        return await singleflight.do(
+            ("stt", key, language), lambda: self._atranscribe(audio, language)
+        )
+    
+    async def _atranscribe(self, audio: Audio, language: str) -> str:
+        """Запрос к Whisper API (без объединения)"""
+        try:
+            audio_file = self._audio_file(audio)
+            async with openai_limiter.slot():
+                with metrics.timer("whisper"):
+                    transcript = await self.async_client.audio.transcriptions.create(
+                        model="whisper-1",
+                        file=audio_file,
+                        language=language
+                    )
+            metrics.record_usage(getattr(transcript, "usage", None), "whisper-1", "whisper")
+            return transcript.text
+        except Exception as e:
+            print(f"❌ Ошибка распознавания речи: {e}")
+            return ""
+    
+    @staticmethod
+    def _audio_file(audio: Audio, filename: str = "voice.ogg") -> tuple[str, bytes]:
+        """
+        Файл для API: (имя, содержимое)
+        
+        Имя нужно Whisper только для определения формата, поэтому данные из
+        памяти отправляются как есть, без записи на диск.
+        """
+        if isinstance(audio, (bytes, bytearray)):
+            return filename, bytes(audio)
+        with open(audio, "rb") as audio_file:
+            return os.path.basename(audio), audio_file.read()
@@ -1,52 +1,54 @@
 """
 Обработка изображений через OpenAI Vision API
 """
-from openai import OpenAI
 import base64
-import config
+from typing import TYPE_CHECKING, Optional, Union
+from services.concurrency import openai_limiter
+from services.metrics import metrics
+from services.singleflight import singleflight
+from utils.openai_client import LazyClient, get_async_openai_client, get_openai_client
+
+if TYPE_CHECKING:
+    from openai import OpenAI, AsyncOpenAI
+
+
+# Изображение: путь к файлу или его содержимое в памяти
+Image = Union[str, bytes, bytearray]
 
 
 class VisionProcessor:
     """Класс для анализа изображений и определения объектов"""
     
-    def __init__(self):
-        self.client = OpenAI(api_key=config.OPENAI_API_KEY)
+    # Без явно переданных клиентов — общие (один пул соединений на весь бот);
+    # создаются при первом запросе, чтобы импорт SDK OpenAI не задерживал старт
+    client = LazyClient(get_openai_client)
+    async_client = LazyClient(get_async_openai_client)
+    
+    def __init__(
+        self,
+        client: Optional["OpenAI"] = None,
+        async_client: Optional["AsyncOpenAI"] = None
+    ):
+        self.client = client
+        self.async_client = async_client
     
-    def analyze_image(self, image_path: str) -> str:
+    def analyze_image(self, image: Image, detail: str = "low") -> Optional[str]:
         """
         Анализирует изображение и определяет, что на нем изображено
         
         Args:
-            image_path: Путь к файлу изображения
+            image: Путь к файлу изображения или его содержимое (bytes)
+            detail: Детализация Vision API: "low", "high" или "auto"
             
         Returns:
-            Описание объекта на изображении (одним словом или короткой фразой)
+            Описание объекта на изображении (одним словом или короткой фразой);
+            пустая строка — модель ничего не распознала, None — ошибка запроса
         """
         try:
-            # Читаем и кодируем изображение
-            with open(image_path, "rb") as image_file:
-                image_data = base64.b64encode(image_file.read()).decode('utf-8')
-            
             # Отправляем запрос к Vision API
             response = self.client.chat.completions.create(
                 model="gpt-4-turbo",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": "Определи, что изображено на картинке. Ответь одним словом или короткой фразой (максимум 2-3 слова). Это должен быть конкретный объект, предмет, природное явление или существо."
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_data}"
-                                }
-                            }
-                        ]
-                    }
-                ],
+                messages=self._build_messages(image, detail),
                 max_tokens=50
             )
             
@@ -54,4 +56,74 @@ class VisionProcessor:
             
         except Exception as e:
             print(f"❌ Ошибка анализа изображения: {e}")
-            return ""
+            return None
+    
+    async def aanalyze_image(
+        self,
+        image: Image,
+        key: Optional[str] = None,
+        detail: str = "low"
+    ) -> Optional[str]:
+        """
+        Асинхронный вариант analyze_image (через AsyncOpenAI)
+        
+        Args:
+            image: Путь к файлу изображения или его содержимое (bytes)
+            detail: Детализация Vision API: "low", "high" или "auto"
+            key: Идентификатор изображения (file_unique_id в Telegram): одновременные
+                запросы с одним ключом выполняются одним вызовом API
+            
+        Returns:
+            Описание объекта на изображении (одним словом или короткой фразой);
+            пустая строка — модель ничего не распознала, None — ошибка запроса
+        """
+        if key is None:
+            return await self._aanalyze_image(image, detail)
+        return await singleflight.do(
+            ("vision", key, detail), lambda: self._aanalyze_image(image, detail)
+        )
+    
+    async def _aanalyze_image(self, image: Image, detail: str) -> Optional[str]:
+        """Запрос к Vision API (без объединения)"""
+        try:
+            messages = self._build_messages(image, detail)
+            async with openai_limiter.slot():
+                with metrics.timer("vision", detail=detail):
+                    response = await self.async_client.chat.completions.create(
+                        model="gpt-4-turbo",
+                        messages=messages,
+                        max_tokens=50
+                    )
+            metrics.record_usage(response.usage, "gpt-4-turbo", "vision")
+            
+            return response.choices[0].message.content.strip()
+            
+        except Exception as e:
+            print(f"❌ Ошибка анализа изображения: {e}")
+            return None
+    
+    def _build_messages(self, image: Image, detail: str) -> list[dict]:
+        """Собирает запрос к Vision API (изображение из памяти или с диска)"""
+        if isinstance(image, str):
+            with open(image, "rb") as image_file:
+                image = image_file.read()
+        image_data = base64.b64encode(image).decode('utf-8')
+        
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": "Определи, что изображено на картинке. Ответь одним словом или короткой фразой (максимум 2-3 слова). Это должен быть конкретный объект, предмет, природное явление или существо."
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{image_data}",
+                            "detail": detail
+                        }
+                    }
+                ]
+            }
+        ]